@@ -1,6 +1,8 @@
 from django.contrib import admin , messages
-from .models import  Resource, TransportFlow, supply_max_cap
-from .utils import run_supply_optimization, calculate_single_pair_flow
+from .models import  Resource, TransportFlow, supply_max_cap, DistrictRegion, District, PlanningJob
+from .jobs import enqueue_job
+from .network_cache import bump_network_version
+from .result_cache import bump_capacity_version, bump_inventory_version
 
 
 @admin.register(Resource)
@@ -10,12 +12,21 @@ class ResourceAdmin(admin.ModelAdmin):
     list_filter = ('priority_score',)
     actions = ['run_optimize'] 
 
+    # Saves bump the inventory version through the post_save signal
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_inventory_version()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_inventory_version()
+
     def run_optimize(self, request, queryset):
-        selected, total_value = run_supply_optimization()
-        selected_names = ", ".join([item.name for item in selected])
+        # Runs on the job pool instead of blocking this admin request
+        job = enqueue_job('optimize', {})
         self.message_user(
             request,
-            f"✅ Optimization complete. Total utility: {total_value}. Selected: {selected_names}"
+            f"✅ Optimization queued as job #{job.id}. Follow it under Planning jobs."
         )
     run_optimize.short_description = "Run Resource Optimization (Knapsack)"
 
@@ -24,9 +35,19 @@ class ResourceAdmin(admin.ModelAdmin):
 class TransportFlowAdmin(admin.ModelAdmin):
     # 'amount_sent' is no longer needed here, but you can keep it
     list_display = ("A", "to", "max_capacity", "amount_sent")
-    search_fields = ("A", "to")
+    list_select_related = ("A", "to")
+    search_fields = ("A__name", "to__name")
     actions = ["calculate_max_flow_for_selected"] # Changed this line
 
+    # Saves bump the network version through the post_save signal
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_network_version()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_network_version()
+
     def calculate_max_flow_for_selected(self, request, queryset):
         """
         Admin action to calculate max-flow for a single selected route.
@@ -37,18 +58,16 @@ class TransportFlowAdmin(admin.ModelAdmin):
             return
 
         selected_route = queryset.first()
-        source_node = selected_route.A
-        sink_node = selected_route.to
-
-        # 2. Call your new utility function
-        try:
-            total_flow = calculate_single_pair_flow(source_node, sink_node)
-            messages.success(
-                request, 
-                f"✅ Total Max Flow from '{source_node}' to '{sink_node}' is: {total_flow} units"
-            )
-        except Exception as e:
-            messages.error(request, f"❌ Error during calculation: {e}")
+        source_node = selected_route.A.name
+        sink_node = selected_route.to.name
+
+        # 2. Queue it on the job pool instead of blocking this admin request
+        job = enqueue_job('flow', {'source': source_node, 'sink': sink_node})
+        messages.success(
+            request,
+            f"✅ Max Flow from '{source_node}' to '{sink_node}' queued as job #{job.id}. "
+            f"Follow it under Planning jobs."
+        )
 
     calculate_max_flow_for_selected.short_description = "Calculate Max Flow (Source → Sink)"
 
@@ -57,4 +76,35 @@ class TransportFlowAdmin(admin.ModelAdmin):
 
 @admin.register(supply_max_cap)
 class SupplyMaxCapAdmin(admin.ModelAdmin):
-    list_display = ('id', 'capacity')
\ No newline at end of file
+    list_display = ('id', 'capacity')
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_capacity_version()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_capacity_version()
+
+
+@admin.register(DistrictRegion)
+class DistrictRegionAdmin(admin.ModelAdmin):
+    list_display = ("district", "region")
+    search_fields = ("district", "region")
+    list_filter = ("region",)
+
+
+@admin.register(District)
+class DistrictAdmin(admin.ModelAdmin):
+    list_display = ("id", "name")
+    search_fields = ("name",)
+
+
+@admin.register(PlanningJob)
+class PlanningJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "progress", "stage", "created_at", "finished_at")
+    list_filter = ("status", "kind")
+    readonly_fields = (
+        "kind", "params", "status", "progress", "stage", "result", "error", "worker",
+        "heartbeat_at", "created_at", "started_at", "finished_at"
+    )
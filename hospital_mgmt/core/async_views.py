@@ -0,0 +1,139 @@
+"""
+Async twins of the read and compute endpoints under /api/async/, for
+serving the API with an ASGI server (asgi.py, e.g. uvicorn or daphne).
+
+DRF APIViews run synchronously, so these are plain Django async views:
+database reads use the async ORM and never hold a worker thread, while
+the CPU-bound solves (calculate_max_flow, calculate_knapsack) run on a
+bounded thread pool so the event loop keeps answering status and CRUD
+requests during a long calculation.
+"""
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .concurrency import ComputeBusy
+from .models import Resource, TransportFlow
+from .serializers import MaxFlowInputSerializer, ResourceSerializer, TransportFlowSerializer
+from .views import calculate_knapsack, calculate_max_flow, knapsack_options
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_solver_executor():
+    """Process-wide thread pool for solves started by async views."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_SOLVER_WORKERS, thread_name_prefix='async-solver'
+            )
+        return _executor
+
+
+def _in_worker(fn, args):
+    # Pool threads outlive requests, so they manage their own connection
+    close_old_connections()
+    try:
+        return fn(*args)
+    finally:
+        connection.close()
+
+
+async def run_solver(fn, *args):
+    """Awaits fn(*args) run on the solver pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_solver_executor(), _in_worker, fn, args)
+
+
+def _busy(e):
+    return JsonResponse({'error': str(e.detail)}, status=503, headers={'Retry-After': str(e.wait)})
+
+
+def _result(data, code, headers):
+    return JsonResponse(data, status=code, headers=headers, safe=False)
+
+
+@require_GET
+async def async_status(request):
+    """GET /api/async/status/ (see SystemStatusView)"""
+    return JsonResponse({'data_exists': await TransportFlow.objects.aexists()})
+
+
+@require_GET
+async def async_flow_list(request):
+    """GET /api/async/flows/"""
+    queryset = TransportFlow.objects.select_related('A', 'to').order_by('id')
+    return JsonResponse([TransportFlowSerializer(flow).data async for flow in queryset], safe=False)
+
+
+@require_GET
+async def async_flow_detail(request, pk):
+    """GET /api/async/flows/<id>/"""
+    try:
+        flow = await TransportFlow.objects.select_related('A', 'to').aget(pk=pk)
+    except TransportFlow.DoesNotExist:
+        return JsonResponse({'detail': 'No TransportFlow matches the given query.'}, status=404)
+    return JsonResponse(TransportFlowSerializer(flow).data)
+
+
+@require_GET
+async def async_resource_list(request):
+    """GET /api/async/resources/"""
+    queryset = Resource.objects.order_by('id')
+    return JsonResponse([ResourceSerializer(resource).data async for resource in queryset], safe=False)
+
+
+@require_GET
+async def async_resource_detail(request, pk):
+    """GET /api/async/resources/<id>/"""
+    try:
+        resource = await Resource.objects.aget(pk=pk)
+    except Resource.DoesNotExist:
+        return JsonResponse({'detail': 'No Resource matches the given query.'}, status=404)
+    return JsonResponse(ResourceSerializer(resource).data)
+
+
+@csrf_exempt
+@require_POST
+async def async_calculate_flow(request):
+    """
+    POST /api/async/calculate-flow/
+    Same input, output, caching and 503 behaviour as /api/calculate-flow/.
+    """
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Request body must be JSON.'}, status=400)
+    serializer = MaxFlowInputSerializer(data=body)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    try:
+        return _result(*await run_solver(calculate_max_flow, serializer.validated_data))
+    except ComputeBusy as e:
+        return _busy(e)
+
+
+@require_GET
+async def async_calculate_knapsack(request):
+    """
+    GET /api/async/calculate-knapsack/
+    Same parameters, output, caching and 503 behaviour as /api/calculate-knapsack/.
+    """
+    params, error = knapsack_options(request.GET)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+
+    try:
+        return _result(*await run_solver(calculate_knapsack, params))
+    except ComputeBusy as e:
+        return _busy(e)
@@ -0,0 +1,159 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class ComputeBusy(APIException):
+    """
+    Every compute slot stayed taken for the whole wait. DRF turns it into
+    a 503 response with a Retry-After header (from 'wait').
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The server is busy with other calculations. Please retry shortly.'
+    default_code = 'compute_busy'
+
+    def __init__(self, wait, detail=None):
+        super().__init__(detail)
+        self.wait = wait
+
+
+class ComputeLimiter:
+    """
+    Caps how many heavy solves (max-flow, knapsack, ...) run at once in
+    this process, so they cannot take every worker thread away from the
+    cheap CRUD endpoints. A request waits up to 'timeout' seconds for a
+    free slot, then is rejected with ComputeBusy.
+    """
+    def __init__(self, max_active, timeout, retry_after):
+        self.max_active = max_active
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max_active)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ComputeBusy(self.retry_after)
+
+    def release(self):
+        self._slots.release()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextmanager
+    def slots(self, wanted):
+        """
+        Waits for one slot like slot(), then takes up to wanted - 1 more
+        that are free right now. Yields the number taken, for work that
+        fans out over several processes.
+        """
+        self.acquire()
+        taken = 1
+        while taken < wanted and self._slots.acquire(blocking=False):
+            taken += 1
+        try:
+            yield taken
+        finally:
+            for _ in range(taken):
+                self.release()
+
+    def streaming(self, iterable):
+        """
+        Takes a slot now and holds it until a streamed response built from
+        the returned iterable is closed (fully sent, or the client left).
+        """
+        self.acquire()
+        return _ReleasingIterable(iterable, self.release)
+
+
+class _ReleasingIterable:
+    # Django calls close() on streaming content once the response is done,
+    # even when iteration never started
+    def __init__(self, iterable, release):
+        self.iterable = iterable
+        self._release = release
+        self._released = False
+
+    def __iter__(self):
+        return iter(self.iterable)
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            close = getattr(self.iterable, 'close', None)
+            if close is not None:
+                close()
+            self._release()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent computations: the first caller for a
+    key runs it, callers arriving while it runs wait and get the same
+    result (or exception) instead of running it again.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        Returns:
+            value: What fn() returned
+            shared: True if the value came from another caller's run
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+single_flight = SingleFlight()
+
+
+def get_compute_limiter():
+    """Process-wide ComputeLimiter configured from settings."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = ComputeLimiter(
+                settings.COMPUTE_MAX_CONCURRENT,
+                settings.COMPUTE_QUEUE_TIMEOUT_SECONDS,
+                settings.COMPUTE_RETRY_AFTER_SECONDS
+            )
+        return _limiter
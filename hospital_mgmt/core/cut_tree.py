@@ -0,0 +1,100 @@
+import logging
+import threading
+
+from django.db import transaction
+
+from .maxflow import gomory_hu_tree
+from .models import GomoryHuTree
+from .network_cache import get_network
+
+logger = logging.getLogger(__name__)
+
+# Process-level copy of the tree for the current network version
+_lock = threading.Lock()
+_cached = {'version': None, 'tree': None}
+
+
+class CutTree:
+    """
+    Answers any-pair max-flow values with a min-edge query on the path of
+    a Gomory–Hu cut tree (see maxflow.gomory_hu_tree).
+    """
+    def __init__(self, network_version, nodes, parent, weight):
+        self.network_version = network_version
+        self.nodes = nodes
+        self.index = {name: i for i, name in enumerate(nodes)}
+        self.parent = parent
+        self.weight = weight
+
+        # Parents may come after their children, so depths are filled in
+        # from the root (node 0) down
+        children = [[] for _ in nodes]
+        for i in range(1, len(nodes)):
+            children[parent[i]].append(i)
+        self.depth = [0] * len(nodes)
+        stack = [0] if nodes else []
+        while stack:
+            u = stack.pop()
+            for v in children[u]:
+                self.depth[v] = self.depth[u] + 1
+                stack.append(v)
+
+    def max_flow(self, source, sink):
+        """
+        Returns (value, (u, v)) where (u, v) is the lightest tree edge on
+        the path; its weight is the max-flow value and removing it splits
+        the districts into the two sides of a minimum cut.
+        """
+        u = self.index[source]
+        v = self.index[sink]
+        best = None
+        edge = None
+        while u != v:
+            # Always climb from the deeper end
+            if self.depth[u] < self.depth[v]:
+                u, v = v, u
+            if best is None or self.weight[u] < best:
+                best = self.weight[u]
+                edge = (self.nodes[u], self.nodes[self.parent[u]])
+            u = self.parent[u]
+        return (best or 0), edge
+
+
+def build_cut_tree(version, network):
+    """
+    Runs the n - 1 max-flows and persists the result for 'version',
+    replacing trees of older versions.
+    """
+    logger.debug("Building Gomory-Hu tree for network version %s (%s nodes)", version, network.node_count)
+    parent, weight = gomory_hu_tree(network)
+    with transaction.atomic():
+        GomoryHuTree.objects.exclude(network_version=version).delete()
+        GomoryHuTree.objects.update_or_create(
+            network_version=version,
+            defaults={'nodes': network.names, 'parent': parent, 'weight': weight}
+        )
+    return CutTree(version, network.names, parent, weight)
+
+
+def get_cut_tree(build=True):
+    """
+    Returns the CutTree for the current network version: from memory, then
+    from the database, and only built (once per version) when neither has
+    it. With build=False a missing tree returns None instead.
+    """
+    version, network = get_network()
+    with _lock:
+        if _cached['version'] == version:
+            return _cached['tree']
+
+        stored = GomoryHuTree.objects.filter(network_version=version).first()
+        if stored is not None:
+            tree = CutTree(version, stored.nodes, stored.parent, stored.weight)
+        elif build:
+            tree = build_cut_tree(version, network)
+        else:
+            return None
+
+        _cached['version'] = version
+        _cached['tree'] = tree
+        return tree
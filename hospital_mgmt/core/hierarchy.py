@@ -0,0 +1,139 @@
+import time
+
+from .maxflow import get_engine
+from .network import FlowNetwork, NetworkBuilder
+
+
+def region_ids(network, regions):
+    """
+    Region id per node id. Districts missing from 'regions' are a region
+    of their own.
+
+    Returns:
+        region_of: List indexed by node id
+        region_names: List indexed by region id
+    """
+    ids = {}
+    region_of = []
+    for name in network.names:
+        region = regions.get(name, name)
+        if region not in ids:
+            ids[region] = len(ids)
+        region_of.append(ids[region])
+    return region_of, list(ids)
+
+
+def coarse_network(network, region_of, region_names):
+    """
+    The network with each region contracted to one node: routes inside a
+    region disappear (free movement), routes between regions are kept.
+    Any flow of the original is a flow of this one, so its max-flow is an
+    upper bound.
+    """
+    builder = NetworkBuilder()
+    for name in region_names:
+        builder.node(name)
+    for e in range(network.edge_count):
+        ru = region_of[network.edge_tail[e]]
+        rv = region_of[network.edge_head[e]]
+        if ru != rv:
+            builder.add_edge(
+                region_names[ru], region_names[rv], network.edge_cap[e],
+                undirected=bool(network.edge_undirected[e]), key=e
+            )
+    return builder.build()
+
+
+def restricted_flow(network, keep, source, sink, engine, preprocess=False):
+    """
+    Max-flow using only districts marked in 'keep', mapped back onto the
+    full network. It is a valid flow of the full network, so its value is
+    a lower bound and it can warm-start the exact solve.
+    """
+    tails, heads, caps, undirected, edges = [], [], [], bytearray(), []
+    for e in range(network.edge_count):
+        if keep[network.edge_tail[e]] and keep[network.edge_head[e]]:
+            tails.append(network.edge_tail[e])
+            heads.append(network.edge_head[e])
+            caps.append(network.edge_cap[e])
+            undirected.append(network.edge_undirected[e])
+            edges.append(e)
+    part = FlowNetwork(network.names, network.index, tails, heads, caps, undirected)
+    mf = get_engine(engine, part, preprocess=preprocess)
+    value = mf.mflow(source, sink)
+
+    flow = network.new_flow()
+    for i, e in enumerate(edges):
+        f = mf.flow[part.edge_arc[i]]
+        if f:
+            a = network.edge_arc[e]
+            flow[a] = f
+            flow[network.rev[a]] = -f
+    return value, flow
+
+
+def hierarchical_max_flow(network, regions, source, sink, engine, preprocess=False):
+    """
+    Coarse-to-fine max-flow, as a generator of two stages.
+
+    1. 'coarse': max-flow between the source and sink regions on the
+       region graph. Fast, and an upper bound on the real max-flow, with
+       a region-level routing.
+    2. 'refined': the exact max-flow. It first solves only inside the
+       regions the coarse flow passes through (a lower bound), then
+       augments that flow on the full network, which usually has little
+       left to find.
+
+    Yields:
+        ('coarse', dict) then ('refined', dict); the refined dict holds the
+        engine ('mf') with the final flow
+    """
+    started = time.perf_counter()
+    region_of, region_names = region_ids(network, regions)
+    s, t = network.index[source], network.index[sink]
+    rs, rt = region_of[s], region_of[t]
+
+    # 1. Coarse: region graph (skipped when both ends share a region)
+    active = None
+    if rs != rt:
+        coarse = coarse_network(network, region_of, region_names)
+        cf = get_engine(engine, coarse, preprocess=preprocess)
+        upper_bound = cf.mflow(region_names[rs], region_names[rt])
+        details = cf.get_flow()
+        active = {rs, rt}
+        for u, targets in details.items():
+            active.add(coarse.index[u])
+            active.update(coarse.index[v] for v in targets)
+        yield 'coarse', {
+            'upper_bound': upper_bound,
+            'source_region': region_names[rs],
+            'sink_region': region_names[rt],
+            'details': dict(details),
+            'regions': len(region_names),
+            'seconds': round(time.perf_counter() - started, 6),
+        }
+    else:
+        yield 'coarse', {
+            'upper_bound': None,
+            'source_region': region_names[rs],
+            'sink_region': region_names[rt],
+            'details': {},
+            'regions': len(region_names),
+            'seconds': round(time.perf_counter() - started, 6),
+        }
+
+    # 2. Refine inside the active regions, then finish on the full network
+    initial = None
+    lower_bound = None
+    if active is not None:
+        keep = bytearray(1 if region_of[u] in active else 0 for u in range(network.node_count))
+        lower_bound, initial = restricted_flow(network, keep, source, sink, engine, preprocess)
+    mf = get_engine(engine, network, preprocess=preprocess)
+    max_val = mf.mflow(source, sink, initial_flow=initial)
+    yield 'refined', {
+        'max_flow': max_val,
+        'lower_bound': lower_bound,
+        'active_regions': sorted(region_names[r] for r in active) if active is not None else None,
+        'mf': mf,
+        'seconds': round(time.perf_counter() - started, 6),
+    }
@@ -0,0 +1,215 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+from .maxflow import get_engine
+
+# Last solved flow per (source, sink, engine): network version, value and
+# the flow on each route that carries any, by route id. No network or flow
+# array is kept, so a stored state costs O(routes used), not a graph copy.
+MAX_STATES = 32
+_lock = threading.Lock()
+_states = OrderedDict()
+
+
+def _push_along_paths(network, flow, start, targets, amount):
+    """
+    Pushes up to 'amount' units from 'start' to any node marked in
+    'targets' along residual paths (BFS, shortest first).
+
+    Returns:
+        pushed: Units moved
+        reached: List of (target node, units) pairs
+    """
+    offsets, head, cap, rev = network.offsets, network.head, network.cap, network.rev
+    pushed = 0
+    reached = []
+    while pushed < amount:
+        parent_arc = {start: -1}
+        queue = deque([start])
+        end = None
+        while queue and end is None:
+            u = queue.popleft()
+            for a in range(offsets[u], offsets[u + 1]):
+                v = head[a]
+                if v not in parent_arc and cap[a] - flow[a] > 0:
+                    parent_arc[v] = a
+                    if targets[v]:
+                        end = v
+                        break
+                    queue.append(v)
+        if end is None:
+            break
+
+        d = amount - pushed
+        v = end
+        while v != start:
+            a = parent_arc[v]
+            d = min(d, cap[a] - flow[a])
+            v = head[rev[a]]
+        v = end
+        while v != start:
+            a = parent_arc[v]
+            flow[a] += d
+            flow[rev[a]] -= d
+            v = head[rev[a]]
+        pushed += d
+        reached.append((end, d))
+    return pushed, reached
+
+
+def _route_flows(network, flow):
+    """
+    { route id: (from name, to name, flow) } for every route carrying flow,
+    or None when such an edge has no route id to match it by later.
+    """
+    routes = {}
+    for e in range(network.edge_count):
+        f = flow[network.edge_arc[e]]
+        if not f:
+            continue
+        key = network.edge_key[e]
+        if key < 0:
+            return None
+        routes[key] = (network.names[network.edge_tail[e]], network.names[network.edge_head[e]], f)
+    return routes
+
+
+def _carry_over(routes, network):
+    """
+    Rebuilds a stored flow (see _route_flows) on the current network,
+    matched by route id. Returns None when a route that carried flow was
+    removed or re-pointed, because the old flow would then break
+    conservation in ways a capacity repair cannot describe. Removed idle
+    routes do not matter.
+    """
+    flow = network.new_flow()
+    matched = 0
+    for e in range(network.edge_count):
+        route = routes.get(network.edge_key[e])
+        if route is None:
+            continue    # New or idle route: starts empty
+        tail, head, f = route
+        if tail != network.names[network.edge_tail[e]] or head != network.names[network.edge_head[e]]:
+            return None
+        a = network.edge_arc[e]
+        flow[a] = f
+        flow[network.rev[a]] = -f
+        matched += 1
+
+    if matched != len(routes):
+        return None
+    return flow
+
+
+def _repair(network, flow, s, t):
+    """
+    Brings a carried-over flow back within the (possibly lowered)
+    capacities, touching only the flow paths through over-full routes.
+
+    For an arc x→y over capacity by d, the excess is taken off the arc,
+    leaving x with d units too many and y with d too few. The surplus at x
+    goes back towards the source, or straight to y along a flow path that
+    feeds both; whatever y still misses is taken back from the sink (or
+    from the source, for circulations through it). Every step only
+    shortens existing flow paths.
+
+    Returns the number of over-capacity routes that were repaired.
+    """
+    head, cap, rev = network.head, network.cap, network.rev
+    n = network.node_count
+    repaired = 0
+
+    for e in range(network.edge_count):
+        a = network.edge_arc[e]
+        if flow[a] < 0:
+            a = rev[a]
+        d = flow[a] - cap[a]
+        if d <= 0:
+            continue
+        repaired += 1
+        flow[a] -= d
+        flow[rev[a]] += d
+        x = head[rev[a]]
+        y = head[a]
+
+        missing = d
+        if x != s and x != t:
+            targets = bytearray(n)
+            targets[s] = 1
+            targets[t] = 1
+            if y != s and y != t:
+                targets[y] = 1
+            _, reached = _push_along_paths(network, flow, x, targets, d)
+            missing -= sum(units for node, units in reached if node == y)
+
+        if y != s and y != t:
+            targets = bytearray(n)
+            targets[y] = 1
+            for terminal in (t, s):
+                if missing > 0:
+                    pushed, _ = _push_along_paths(network, flow, terminal, targets, missing)
+                    missing -= pushed
+
+    return repaired
+
+
+def incremental_max_flow(version, network, source, sink, engine, preprocess=False):
+    """
+    Max-flow that reuses the last flow solved for the same source, sink and
+    engine.
+
+    - Same network version: the stored flow is returned as is.
+    - Capacities edited (routes added or capacities changed): the old flow
+      is carried over by route id, over-full routes are repaired, and the
+      engine only augments on top of it (warm start).
+    - Routes that carried flow removed or re-pointed, or nothing stored
+      yet: full solve
+      (on the reduced network when 'preprocess' is on).
+
+    Returns:
+        mf: Engine holding the final flow (get_flow() works as usual)
+        max_val: Max-flow value
+        stats: How much work was reused
+    """
+    key = (source, sink, engine)
+    started = time.perf_counter()
+    mf = get_engine(engine, network, preprocess=preprocess)
+    s = network.index[source]
+
+    with _lock:
+        state = _states.get(key)
+
+    stats = {'mode': 'cold', 'reused_flow': 0, 'repaired_routes': 0, 'augmented_flow': 0}
+    initial = None
+    stored = None
+    if state is not None and state['version'] == version:
+        # None if the version counter restarted (e.g. a flushed database)
+        # and this is another network
+        stored = _carry_over(state['routes'], network)
+    if stored is not None:
+        mf.flow = stored
+        max_val = state['value']
+        stats.update(mode='cached', reused_flow=max_val)
+    else:
+        if state is not None:
+            initial = _carry_over(state['routes'], network)
+        if initial is not None:
+            stats['repaired_routes'] = _repair(network, initial, s, network.index[sink])
+            stats['reused_flow'] = network.flow_value(initial, s)
+            stats['mode'] = 'warm'
+        max_val = mf.mflow(source, sink, initial_flow=initial)
+        stats['augmented_flow'] = max_val - stats['reused_flow']
+
+        routes = _route_flows(network, mf.flow)
+        with _lock:
+            if routes is None:
+                _states.pop(key, None)
+            else:
+                _states[key] = {'version': version, 'value': max_val, 'routes': routes}
+                _states.move_to_end(key)
+                while len(_states) > MAX_STATES:
+                    _states.popitem(last=False)
+
+    stats['solve_seconds'] = round(time.perf_counter() - started, 6)
+    return mf, max_val, stats
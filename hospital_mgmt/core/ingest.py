@@ -0,0 +1,227 @@
+import csv
+import io
+from collections import defaultdict
+from itertools import islice
+
+from django.db import transaction
+
+from .models import District, Resource, TransportFlow
+
+
+class _ChunkStream(io.RawIOBase):
+    """Read-only raw stream over an iterator of byte chunks."""
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+def iter_lines(uploaded_file, encoding='utf-8-sig'):
+    """
+    Text lines of an uploaded file, decoded incrementally chunk by chunk,
+    so only one chunk is ever held in memory. A UTF-8 BOM is dropped.
+    Lines end only at LF, CR or CRLF (kept, as the csv module expects),
+    also when a chunk boundary falls inside one of them or inside a
+    multi-byte character. Raises UnicodeDecodeError on undecodable input.
+    """
+    raw = io.BufferedReader(_ChunkStream(uploaded_file.chunks()))
+    yield from io.TextIOWrapper(raw, encoding=encoding, newline='')
+
+
+def iter_valid_rows(lines, parse_row, errors, max_errors=50):
+    """
+    Parses CSV lines (header skipped) into model instances one at a time.
+
+    Rows that 'parse_row' rejects with ValueError are counted in
+    errors['count'] and the first 'max_errors' are kept in errors['rows']
+    as { 'row': line number, 'error': message }. Blank rows are ignored.
+    """
+    reader = csv.reader(lines)
+    next(reader, None)
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            yield parse_row(row)
+        except ValueError as e:
+            errors['count'] += 1
+            if len(errors['rows']) < max_errors:
+                errors['rows'].append({'row': reader.line_num, 'error': str(e)})
+
+
+def _batches(items, size):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_route_row(row):
+    """Source, Destination, Capacity -> (source name, destination name, capacity)"""
+    if len(row) < 3:
+        raise ValueError("Expected 3 columns: Source, Destination, Capacity.")
+    source, destination = row[0].strip(), row[1].strip()
+    if not source or not destination:
+        raise ValueError("Source and Destination cannot be blank.")
+    return source, destination, int(row[2].strip())
+
+
+def parse_resource_row(row):
+    """Name, Volume, Priority, Quantity -> Resource"""
+    if len(row) < 4:
+        raise ValueError("Expected 4 columns: Name, Volume, Priority, Quantity.")
+    return Resource(
+        name=row[0].strip(),
+        volume=int(row[1].strip()),
+        priority_score=int(row[2].strip()),
+        quantity=int(row[3].strip())
+    )
+
+
+def add_routes(rows, batch_size=2000):
+    """
+    Saves (source, destination, capacity) rows as TransportFlow routes,
+    interning the district names to ids. A row for a route that already
+    exists adds to its capacity (parallel routes), all in one upsert
+    (bulk_create with update_conflicts on the (A, to) constraint).
+    """
+    ids = District.intern(name for a, to, _ in rows for name in (a, to))
+    capacity = defaultdict(int)
+    for a, to, c in rows:
+        capacity[(ids[a], ids[to])] += c
+
+    existing = TransportFlow.objects.filter(
+        A_id__in={a for a, _ in capacity}, to_id__in={to for _, to in capacity}
+    ).values_list('A_id', 'to_id', 'max_capacity')
+    for a, to, c in existing:
+        if (a, to) in capacity:
+            capacity[(a, to)] += c
+
+    TransportFlow.objects.bulk_create(
+        [TransportFlow(A_id=a, to_id=to, max_capacity=c) for (a, to), c in capacity.items()],
+        batch_size=batch_size,
+        update_conflicts=True, unique_fields=['A', 'to'], update_fields=['max_capacity']
+    )
+
+
+def ingest_csv(uploaded_file, model, parse_row, batch_size=2000, replace=False, max_errors=50,
+               on_success=None, save_batch=None):
+    """
+    Streams an uploaded CSV into 'model' in fixed-size bulk_create batches,
+    all inside one transaction. Memory stays flat whatever the file size.
+
+    Args:
+        parse_row: Callable(list of cells) -> unsaved model instance (or
+                   whatever 'save_batch' takes); raises ValueError for a bad row
+        replace: Delete all existing rows first. If the file turns out to
+                 have no valid rows, the transaction is rolled back and
+                 the old rows stay.
+        on_success: Called inside the transaction once rows were inserted
+                    (e.g. to bump a dataset version)
+        save_batch: Callable(list of parsed rows, batch_size) replacing the
+                    plain bulk_create (e.g. add_routes)
+
+    Returns:
+        created: Number of rows inserted
+        errors: { 'count': n, 'rows': [ first max_errors bad rows ] }
+    """
+    errors = {'count': 0, 'rows': []}
+    rows = iter_valid_rows(iter_lines(uploaded_file), parse_row, errors, max_errors)
+    created = 0
+    with transaction.atomic():
+        if replace:
+            model.objects.all().delete()
+        for batch in _batches(rows, batch_size):
+            if save_batch is not None:
+                save_batch(batch, batch_size)
+            else:
+                model.objects.bulk_create(batch, batch_size=batch_size)
+            created += len(batch)
+        if not created:
+            transaction.set_rollback(True)
+        elif on_success is not None:
+            on_success()
+    return created, errors
+
+
+def sync_routes_csv(uploaded_file, batch_size=2000, max_errors=50, on_change=None):
+    """
+    Differential route upload: makes TransportFlow match the file, keyed
+    on (A, to), touching only the rows that differ.
+
+    Rows of the file with the same (A, to) are one route with their
+    capacities summed (as the max-flow treats parallel routes). Existing
+    routes keep their id when only the capacity changes.
+
+    Args:
+        on_change: Called inside the transaction if anything changed
+
+    Returns:
+        changes: { 'created', 'updated', 'deleted', 'unchanged' } counts
+        errors: As for ingest_csv
+    """
+    errors = {'count': 0, 'rows': []}
+    by_name = defaultdict(int)
+    for a, to, capacity in iter_valid_rows(iter_lines(uploaded_file), parse_route_row, errors, max_errors):
+        by_name[(a, to)] += capacity
+
+    changes = {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    if not by_name:
+        return changes, errors
+
+    with transaction.atomic():
+        # 1. Intern the district names, then diff on ids against the table
+        ids = {}
+        names = {name for key in by_name for name in key}
+        for batch in _batches(names, batch_size):
+            ids.update(District.intern(batch))
+        desired = {(ids[a], ids[to]): capacity for (a, to), capacity in by_name.items()}
+        del by_name
+
+        seen = set()
+        updates = []
+        deletes = []
+        current = TransportFlow.objects.values_list('id', 'A_id', 'to_id', 'max_capacity')
+        for pk, a, to, capacity in current.iterator(chunk_size=batch_size):
+            key = (a, to)
+            if key not in desired:
+                deletes.append(pk)
+                continue
+            seen.add(key)
+            if capacity != desired[key]:
+                updates.append(TransportFlow(id=pk, max_capacity=desired[key]))
+            else:
+                changes['unchanged'] += 1
+        creates = (
+            TransportFlow(A_id=a, to_id=to, max_capacity=capacity)
+            for (a, to), capacity in desired.items() if (a, to) not in seen
+        )
+
+        # 2. Apply in batches
+        for batch in _batches(deletes, batch_size):
+            TransportFlow.objects.filter(id__in=batch).delete()
+        TransportFlow.objects.bulk_update(updates, ['max_capacity'], batch_size=batch_size)
+        for batch in _batches(creates, batch_size):
+            TransportFlow.objects.bulk_create(batch, batch_size=batch_size)
+            changes['created'] += len(batch)
+        changes['updated'] = len(updates)
+        changes['deleted'] = len(deletes)
+
+        if on_change is not None and (changes['created'] or changes['updated'] or changes['deleted']):
+            on_change()
+    return changes, errors
@@ -0,0 +1,220 @@
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .knapsack import allocate_multi_knapsack
+from .maxflow import get_engine
+from .models import PlanningJob, Resource, supply_max_cap
+from .network_cache import get_network
+from .utils import (
+    allocation_results, allocation_summary, calculate_single_pair_flow, run_supply_optimization,
+    save_supply_caps
+)
+
+WORKER_ID = f"{os.getpid()}@{socket.gethostname()}"
+
+logger = logging.getLogger(__name__)
+
+
+def _network_with(*names):
+    _, network = get_network()
+    for name in names:
+        if name not in network.index:
+            raise ValueError(f"District '{name}' not found.")
+    return network
+
+
+def run_plan(params, report):
+    """
+    Max-flow from source to sink (saving supply_max_cap), then the
+    knapsack allocation over the saved capacities. Inventory is untouched.
+    """
+    source, sink = params['source'], params['sink']
+    engine = params.get('engine') or settings.MAXFLOW_ENGINE
+
+    # 1. Max flow
+    report(0.0, 'max-flow')
+    network = _network_with(source, sink)
+    mf = get_engine(engine, network, preprocess=settings.FLOW_PREPROCESS)
+    max_val = mf.mflow(source, sink)
+    s = network.index[source]
+    save_supply_caps(
+        {source: {network.names[v]: f for u, v, f in network.net_flows(mf.flow) if u == s}}, [source]
+    )
+    result = {'flow': {
+        'max_flow': max_val,
+        'source': source,
+        'sink': sink,
+        'engine': engine,
+        'details': dict(network.flow_assignments(mf.flow))
+    }}
+
+    # 2. Knapsack over the capacities just saved
+    report(0.5, 'knapsack')
+    supply_nodes = list(supply_max_cap.objects.select_related('A', 'to'))
+    resources = list(Resource.objects.all())
+    if not supply_nodes or not resources:
+        result['allocations'] = {}
+        return result
+    strategy = params.get('strategy') or settings.KNAPSACK_ALLOCATION_STRATEGY
+    mode = params.get('mode') or 'exact'
+    time_budget_ms = params.get('time_budget_ms') or settings.KNAPSACK_TIME_BUDGET_MS
+    plan = allocate_multi_knapsack(
+        resources,
+        [(node.id, node.capacity) for node in supply_nodes],
+        strategy=strategy,
+        backend=params.get('backend') or settings.KNAPSACK_BACKEND,
+        memory_cap=settings.KNAPSACK_MEMORY_CAP_BYTES,
+        mode=mode,
+        epsilon=params.get('epsilon') or settings.KNAPSACK_APPROX_EPSILON,
+        deadline=time.monotonic() + time_budget_ms / 1000
+    )
+    result['allocations'] = allocation_results(supply_nodes, plan)
+    result['summary'] = allocation_summary(plan, strategy, mode)
+    return result
+
+
+def run_flow(params, report):
+    """Admin 'Calculate Max Flow': max-flow only, saving supply_max_cap."""
+    report(0.0, 'max-flow')
+    _network_with(params['source'], params['sink'])
+    return {'max_flow': calculate_single_pair_flow(params['source'], params['sink'], params.get('engine'))}
+
+
+def run_optimize(params, report):
+    """Admin 'Run Resource Optimization': allocates and removes the units from inventory."""
+    report(0.0, 'knapsack')
+    selected, total_value = run_supply_optimization()
+    return {
+        'total_priority': total_value,
+        'allocations': {
+            node: [{'name': item.name, 'quantity': count} for item, count in items]
+            for node, items in selected.items()
+        }
+    }
+
+
+JOB_RUNNERS = {
+    'plan': run_plan,
+    'flow': run_flow,
+    'optimize': run_optimize,
+}
+
+
+class JobPool:
+    """
+    Local worker threads executing PlanningJobs; no broker, the
+    PlanningJob table is the queue. A job is claimed with a conditional
+    UPDATE (queued -> running), so several processes may run a pool over
+    the same table without running a job twice.
+    """
+    def __init__(self, workers, heartbeat_seconds):
+        self.heartbeat_seconds = heartbeat_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='planning-job')
+        self._lock = threading.Lock()
+        self._running = set()
+        self._submitted = set()
+        threading.Thread(target=self._beat, name='planning-job-heartbeat', daemon=True).start()
+
+    def submit(self, job_id):
+        with self._lock:
+            if job_id in self._submitted:
+                return
+            self._submitted.add(job_id)
+        self._executor.submit(self._run, job_id)
+
+    def resume(self, stale_after):
+        """
+        Requeues running jobs whose process stopped sending heartbeats,
+        then submits every queued job. Returns the number submitted.
+        """
+        cutoff = timezone.now() - timedelta(seconds=stale_after)
+        PlanningJob.objects.filter(status=PlanningJob.RUNNING, heartbeat_at__lt=cutoff).update(
+            status=PlanningJob.QUEUED, stage='requeued', progress=0.0
+        )
+        queued = list(PlanningJob.objects.filter(status=PlanningJob.QUEUED).order_by('id').values_list('id', flat=True))
+        for job_id in queued:
+            self.submit(job_id)
+        return len(queued)
+
+    def _run(self, job_id):
+        try:
+            claimed = PlanningJob.objects.filter(id=job_id, status=PlanningJob.QUEUED).update(
+                status=PlanningJob.RUNNING, worker=WORKER_ID, started_at=timezone.now(),
+                heartbeat_at=timezone.now(), progress=0.0, stage=''
+            )
+            if not claimed:
+                # Already taken by another pool, or not queued any more
+                return
+            with self._lock:
+                self._running.add(job_id)
+            job = PlanningJob.objects.get(id=job_id)
+
+            def report(progress, stage):
+                PlanningJob.objects.filter(id=job_id).update(
+                    progress=round(progress, 3), stage=stage, heartbeat_at=timezone.now()
+                )
+
+            try:
+                result = JOB_RUNNERS[job.kind](job.params, report)
+            except Exception as e:
+                logger.exception("Planning job %s (%s) failed", job_id, job.kind)
+                PlanningJob.objects.filter(id=job_id).update(
+                    status=PlanningJob.FAILED, error=f"{type(e).__name__}: {e}", finished_at=timezone.now()
+                )
+            else:
+                PlanningJob.objects.filter(id=job_id).update(
+                    status=PlanningJob.SUCCEEDED, result=result, progress=1.0, stage='done',
+                    finished_at=timezone.now()
+                )
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+                self._submitted.discard(job_id)
+            connection.close()
+
+    def _beat(self):
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                running = list(self._running)
+            if running:
+                PlanningJob.objects.filter(id__in=running, status=PlanningJob.RUNNING).update(
+                    heartbeat_at=timezone.now()
+                )
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_job_pool():
+    """
+    Process-wide JobPool configured from settings. Starting it picks up
+    jobs left queued or interrupted by an earlier process.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = JobPool(settings.JOB_WORKERS, settings.JOB_HEARTBEAT_SECONDS)
+            _pool.resume(settings.JOB_STALE_SECONDS)
+        return _pool
+
+
+def enqueue_job(kind, params):
+    """
+    Stores a queued PlanningJob and hands it to the pool once the current
+    transaction (if any) commits.
+    """
+    pool = get_job_pool()
+    job = PlanningJob.objects.create(kind=kind, params=params)
+    transaction.on_commit(lambda: pool.submit(job.id))
+    return job
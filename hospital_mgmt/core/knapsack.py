@@ -1,51 +1,690 @@
-def solve_knapsack(resources, max_capacity):
+import time
+
+try:
+    import numpy as np
+except ImportError:  # The NumPy backend is optional
+    np = None
+
+KNAPSACK_BACKENDS = ('python', 'numpy')
+KNAPSACK_RECONSTRUCTIONS = ('auto', 'table', 'hirschberg')
+KNAPSACK_STRATEGIES = ('heuristic', 'exact')
+KNAPSACK_MODES = ('exact', 'approx')
+
+
+def _split_quantities(resources, quantities=None):
+    """
+    Binary splitting of bounded quantities.
+
+    A resource with quantity q is turned into bundles of 1, 2, 4, ... units
+    (plus a remainder bundle), so any count 0..q can be built from them while
+    only O(log q) bundles enter the DP.
+
+    Returns:
+        bundles: List of (resource_index, units) tuples
+    """
+    bundles = []
+    for idx, r in enumerate(resources):
+        if quantities is not None:
+            count = quantities[idx]
+        else:
+            count = r.quantity if r.quantity else 1
+
+        size = 1
+        while count > 0:
+            units = min(size, count)
+            bundles.append((idx, units))
+            count -= units
+            size *= 2
+    return bundles
+
+
+def _dp_python(resources, bundles, max_capacity, record=True, progress=None):
+    """
+    Pure Python DP over the bundles.
+
+    Returns the final DP row and a take/skip lookup: decided(b, cap) is true
+    when bundle b was taken at capacity 'cap'. With record=False only the
+    rolling row is kept and the lookup is None.
+
+    'progress' is called as progress(rows done, best value so far) after
+    each row; returning True stops there, leaving the DP of those rows.
+    """
+    dp = [0] * (max_capacity + 1)
+    decisions = []
+
+    for b, (idx, units) in enumerate(bundles):
+        r = resources[idx]
+        w = r.volume * units
+        v = r.priority_score * units
+        take = bytearray(max_capacity + 1) if record else None
+        decisions.append(take)
+
+        if 0 <= w <= max_capacity and v > 0:
+            # Walking capacities downwards lets us update the row in place
+            for cap in range(max_capacity, w - 1, -1):
+                candidate = dp[cap - w] + v
+                if candidate > dp[cap]:
+                    dp[cap] = candidate
+                    if record:
+                        take[cap] = 1
+
+        if progress is not None and progress(b + 1, dp[max_capacity]):
+            break
+
+    if not record:
+        return dp, None
+
+    def decided(b, cap):
+        return decisions[b][cap]
+
+    return dp, decided
+
+
+def _dp_numpy(resources, bundles, max_capacity, record=True, progress=None):
+    """
+    NumPy DP over the bundles.
+
+    Each bundle row is one vectorized np.maximum of the row against itself
+    shifted by the bundle's volume. Take/skip decisions are stored as a
+    packed bit matrix (one bit per bundle and capacity) unless record=False.
+    'progress' works as for _dp_python.
+    """
+    if np is None:
+        raise ImportError("The 'numpy' knapsack backend requires NumPy to be installed.")
+
+    dp = np.zeros(max_capacity + 1, dtype=np.int64)
+    row_bytes = (max_capacity + 8) // 8
+    bits = np.zeros((len(bundles) if record else 0, row_bytes), dtype=np.uint8)
+    take = np.zeros(max_capacity + 1, dtype=bool)
+
+    for b, (idx, units) in enumerate(bundles):
+        r = resources[idx]
+        w = r.volume * units
+        v = r.priority_score * units
+
+        if 0 <= w <= max_capacity and v > 0:
+            candidate = dp[:max_capacity + 1 - w] + v
+            if record:
+                take[:] = False
+                # Strict '>' keeps the same tie-breaking as the Python backend
+                np.greater(candidate, dp[w:], out=take[w:])
+                bits[b] = np.packbits(take)
+            np.maximum(dp[w:], candidate, out=dp[w:])
+
+        if progress is not None and progress(b + 1, dp[max_capacity]):
+            break
+
+    if not record:
+        return dp, None
+
+    def decided(b, cap):
+        return (bits[b, cap >> 3] >> (7 - (cap & 7))) & 1
+
+    return dp, decided
+
+
+def decision_table_bytes(n_bundles, max_capacity, backend='python'):
+    """
+    Size of the take/skip table the 'table' reconstruction would allocate.
+    """
+    if backend == 'numpy':
+        return n_bundles * ((max_capacity + 8) // 8)
+    return n_bundles * (max_capacity + 1)
+
+
+def _hirschberg(resources, bundles, max_capacity, backend, memory_cap, counts, progress=None):
+    """
+    Divide-and-conquer reconstruction keeping only O(C) rolling rows.
+
+    The bundles are split in half; one value row is computed for each half
+    and the capacity split 'c' maximizing front[c] + back[C - c] tells how
+    much room each half gets in an optimal solution. Each half is then solved
+    recursively. Blocks whose decision table fits in 'memory_cap' are solved
+    directly with the table. Adds the chosen units into 'counts'.
+    'progress' (rows, best) only follows the two top-level passes, and
+    cannot stop the search: returning True is ignored.
+    """
+    dp_fn = _dp_numpy if backend == 'numpy' else _dp_python
+
+    if len(bundles) <= 1 or decision_table_bytes(len(bundles), max_capacity, backend) <= memory_cap:
+        _, decided = dp_fn(resources, bundles, max_capacity)
+        remaining_cap = max_capacity
+        for b in range(len(bundles) - 1, -1, -1):
+            if decided(b, remaining_cap):
+                idx, units = bundles[b]
+                counts[idx] += units
+                remaining_cap -= resources[idx].volume * units
+        return
+
+    mid = len(bundles) // 2
+    front_progress = back_progress = None
+    if progress is not None:
+        # Each half alone is a feasible packing, so either best is a lower bound
+        def front_progress(rows, best):
+            progress(rows, best)
+
+        def back_progress(rows, best):
+            progress(mid + rows, max(best, front[max_capacity]))
+
+    front, _ = dp_fn(resources, bundles[:mid], max_capacity, record=False, progress=front_progress)
+    back, _ = dp_fn(resources, bundles[mid:], max_capacity, record=False, progress=back_progress)
+
+    if backend == 'numpy':
+        split = int(np.argmax(front + back[::-1]))
+    else:
+        best = -1
+        split = 0
+        for c in range(max_capacity + 1):
+            total = front[c] + back[max_capacity - c]
+            if total > best:
+                best = total
+                split = c
+    del front, back
+
+    _hirschberg(resources, bundles[:mid], split, backend, memory_cap, counts)
+    _hirschberg(resources, bundles[mid:], max_capacity - split, backend, memory_cap, counts)
+
+
+def solve_bounded_knapsack(resources, max_capacity, quantities=None, backend='python',
+                           reconstruction='auto', memory_cap=None, progress=None):
+    """
+    Bounded Knapsack on (resource, quantity) pairs.
+
+    Works on binary-split bundles instead of one copy per unit, and keeps a
+    single rolling DP row plus the take/skip decisions used by the backtrack.
+
+    Args:
+        resources: List of Resource objects (Django models)
+        max_capacity: Integer capacity limit
+        quantities: Optional list of available counts aligned with
+            'resources'. Defaults to each Resource's own quantity.
+        backend: 'python' or 'numpy' (vectorized rows, bit-packed decisions)
+        reconstruction: 'table' keeps the full decision table, 'hirschberg'
+            keeps only O(C) rolling rows and recovers the chosen set by
+            divide-and-conquer recomputation, 'auto' picks 'hirschberg'
+            when the table would exceed 'memory_cap'.
+        memory_cap: Byte limit for the decision table (None = unlimited)
+        progress: Called as progress(rows=..., total_rows=..., best=...)
+            after each DP row. Returning True stops the 'table' DP early
+            with the optimum over the bundles done so far (a valid, smaller
+            allocation); the 'hirschberg' reconstruction cannot stop.
+
+    Returns:
+        allocation: List of (Resource, count) tuples, in input order
+        total_value: Total priority score
+    """
+    if backend not in KNAPSACK_BACKENDS:
+        raise ValueError(f"Unknown knapsack backend '{backend}'. Choose from {KNAPSACK_BACKENDS}.")
+    if reconstruction not in KNAPSACK_RECONSTRUCTIONS:
+        raise ValueError(f"Unknown reconstruction '{reconstruction}'. Choose from {KNAPSACK_RECONSTRUCTIONS}.")
+
+    max_capacity = max(int(max_capacity), 0)
+    bundles = _split_quantities(resources, quantities)
+    counts = [0] * len(resources)
+    rows_done = [len(bundles)]
+    report = None
+    if progress is not None:
+        def report(rows, best):
+            rows_done[0] = rows
+            return progress(rows=rows, total_rows=len(bundles), best=int(best))
+
+    if reconstruction == 'auto':
+        table_bytes = decision_table_bytes(len(bundles), max_capacity, backend)
+        too_big = memory_cap is not None and table_bytes > memory_cap
+        reconstruction = 'hirschberg' if too_big else 'table'
+
+    if reconstruction == 'hirschberg':
+        # Blocks are solved with a table once they fit, so a cap of None
+        # still means "rolling rows all the way down"
+        _hirschberg(resources, bundles, max_capacity, backend, memory_cap or 0, counts, report)
+        allocation = [(r, c) for r, c in zip(resources, counts) if c > 0]
+        return allocation, sum(r.priority_score * c for r, c in allocation)
+
+    # 1. Build the DP (one row per bundle, 0/1 over bundles)
+    dp_fn = _dp_numpy if backend == 'numpy' else _dp_python
+    dp, decided = dp_fn(resources, bundles, max_capacity, progress=report)
+    total_value = int(dp[max_capacity])
+
+    # 2. Backtrack through the decisions to count units per resource (only
+    #    the rows done, if progress stopped the DP)
+    remaining_cap = max_capacity
+    for b in range(rows_done[0] - 1, -1, -1):
+        if decided(b, remaining_cap):
+            idx, units = bundles[b]
+            counts[idx] += units
+            remaining_cap -= resources[idx].volume * units
+
+    allocation = [(r, c) for r, c in zip(resources, counts) if c > 0]
+    return allocation, total_value
+
+
+def _fptas_pass(resources, bundles, max_capacity, epsilon, backend, deadline, memory_cap, progress=None):
+    """
+    One FPTAS run: values are scaled down by K = epsilon * vmax / n and a
+    min-volume DP is run over the scaled values.
+
+    Returns (counts, value), or None if the deadline passed mid-run, the
+    decision table would exceed 'memory_cap', or progress(rows done, total
+    rows) returned True.
+    """
+    usable = [
+        (idx, units) for idx, units in bundles
+        if 0 <= resources[idx].volume * units <= max_capacity and resources[idx].priority_score > 0
+    ]
+    if not usable:
+        return [0] * len(resources), 0
+
+    vmax = max(resources[idx].priority_score * units for idx, units in usable)
+    scale = max(epsilon * vmax / len(usable), 1)
+    scaled = [int(resources[idx].priority_score * units // scale) for idx, units in usable]
+    top = sum(scaled)
+    if memory_cap is not None and decision_table_bytes(len(usable), top, backend) > memory_cap:
+        return None
+    inf = max_capacity + 1
+
+    if backend == 'numpy':
+        if np is None:
+            raise ImportError("The 'numpy' knapsack backend requires NumPy to be installed.")
+        min_volume = np.full(top + 1, inf, dtype=np.int64)
+    else:
+        min_volume = [inf] * (top + 1)
+    min_volume[0] = 0
+    decisions = []
+
+    for row, ((idx, units), sv) in enumerate(zip(usable, scaled)):
+        if deadline is not None and time.monotonic() > deadline:
+            return None
+        if progress is not None and progress(row, len(usable)):
+            return None
+        w = resources[idx].volume * units
+        if backend == 'numpy':
+            candidate = min_volume[:top + 1 - sv] + w
+            take = np.zeros(top + 1, dtype=bool)
+            np.less(candidate, min_volume[sv:], out=take[sv:])
+            np.minimum(min_volume[sv:], candidate, out=min_volume[sv:])
+            decisions.append(np.packbits(take))
+        else:
+            take = bytearray(top + 1)
+            for val in range(top, sv - 1, -1):
+                candidate = min_volume[val - sv] + w
+                if candidate < min_volume[val]:
+                    min_volume[val] = candidate
+                    take[val] = 1
+            decisions.append(take)
+
+    if backend == 'numpy':
+        best = int(np.flatnonzero(min_volume <= max_capacity)[-1])
+    else:
+        best = max(val for val in range(top + 1) if min_volume[val] <= max_capacity)
+
+    counts = [0] * len(resources)
+    val = best
+    for b in range(len(usable) - 1, -1, -1):
+        row = decisions[b]
+        taken = (row[val >> 3] >> (7 - (val & 7))) & 1 if backend == 'numpy' else row[val]
+        if taken:
+            idx, units = usable[b]
+            counts[idx] += units
+            val -= scaled[b]
+
+    value = sum(r.priority_score * c for r, c in zip(resources, counts))
+    return counts, value
+
+
+def solve_approx_knapsack(resources, max_capacity, quantities=None, epsilon=0.1,
+                          deadline=None, backend='python', memory_cap=None, progress=None):
+    """
+    Anytime approximate Bounded Knapsack for very large capacities.
+
+    1. Greedy by value density gives an immediate answer; the fractional
+       (LP) relaxation gives an upper bound on the optimum.
+    2. FPTAS passes with a shrinking epsilon (0.5, 0.25, ... down to
+       'epsilon') each improve the answer, and a finished pass with epsilon e
+       proves the optimum is at most value / (1 - e).
+    The DP never depends on the capacity, only on n and epsilon.
+
+    Args:
+        resources: List of Resource objects (Django models)
+        max_capacity: Integer capacity limit
+        quantities: Optional list of available counts aligned with
+            'resources'. Defaults to each Resource's own quantity.
+        epsilon: Target relative error of the last FPTAS pass
+        deadline: time.monotonic() value after which the best allocation
+            found so far is returned (None = run every pass)
+        backend: 'python' or 'numpy'
+        memory_cap: Byte limit for one pass's decision table; passes that
+            would exceed it are skipped like passes cut by the deadline
+        progress: Called as progress(rows=..., total_rows=..., best=...)
+            during each pass; returning True stops like the deadline does
+
+    Returns:
+        A dict with
+            'allocation': List of (Resource, count) tuples, in input order
+            'total_value': Total priority score
+            'upper_bound': Proven upper bound on the optimum
+            'gap': upper_bound - total_value
+            'epsilon': Epsilon of the last finished FPTAS pass (None if none)
+            'complete': True when every pass finished within the limits
     """
-    0/1 Knapsack Algorithm with Item Expansion.
-    
+    if backend not in KNAPSACK_BACKENDS:
+        raise ValueError(f"Unknown knapsack backend '{backend}'. Choose from {KNAPSACK_BACKENDS}.")
+    if not 0 < epsilon < 1:
+        raise ValueError("epsilon must be between 0 and 1.")
+
+    max_capacity = max(int(max_capacity), 0)
+    if quantities is None:
+        quantities = [r.quantity if r.quantity else 1 for r in resources]
+
+    # 1. Greedy by density, plus the fractional bound
+    items = sorted(
+        (
+            (i, r.volume, r.priority_score, quantities[i])
+            for i, r in enumerate(resources)
+            if quantities[i] > 0 and r.priority_score > 0 and 0 <= r.volume <= max_capacity
+        ),
+        key=lambda item: -(item[2] / item[1]) if item[1] else float('-inf'),
+    )
+    upper_bound = _fractional_bound(items, 0, max_capacity)
+
+    best_counts = [0] * len(resources)
+    room = max_capacity
+    for i, w, v, units in items:
+        take = units if w == 0 else min(units, room // w)
+        best_counts[i] = take
+        room -= w * take
+    best_value = sum(r.priority_score * c for r, c in zip(resources, best_counts))
+
+    # A single resource can beat a greedy that got stuck early
+    for i, w, v, units in items:
+        single = v * (units if w == 0 else min(units, max_capacity // w))
+        if single > best_value:
+            best_counts = [0] * len(resources)
+            best_counts[i] = units if w == 0 else min(units, max_capacity // w)
+            best_value = single
+
+    # 2. FPTAS passes until the deadline
+    bundles = _split_quantities(resources, quantities)
+    done_epsilon = None
+    complete = True
+    schedule = []
+    e = 0.5
+    while e > epsilon:
+        schedule.append(e)
+        e /= 2
+    schedule.append(epsilon)
+
+    for e in schedule:
+        if best_value >= int(upper_bound):
+            break
+        report = None
+        if progress is not None:
+            def report(rows, total_rows, best=best_value):
+                return progress(rows=rows, total_rows=total_rows, best=best)
+        result = _fptas_pass(resources, bundles, max_capacity, e, backend, deadline, memory_cap, report)
+        if result is None:
+            complete = False
+            break
+        counts, value = result
+        done_epsilon = e
+        upper_bound = min(upper_bound, value / (1 - e))
+        if value > best_value:
+            best_counts, best_value = counts, value
+
+    allocation = [(r, c) for r, c in zip(resources, best_counts) if c > 0]
+    return {
+        'allocation': allocation,
+        'total_value': best_value,
+        'upper_bound': upper_bound,
+        'gap': max(upper_bound - best_value, 0),
+        'epsilon': done_epsilon,
+        'complete': complete,
+    }
+
+
+def solve_knapsack(resources, max_capacity, backend='python', memory_cap=None):
+    """
+    0/1 Knapsack Algorithm over every unit of every resource.
+
+    Kept for callers that expect one entry per selected unit; the work is
+    done by solve_bounded_knapsack.
+
     Args:
         resources: List of Resource objects (Django models)
         max_capacity: Integer capacity limit
-        
+        backend: 'python' or 'numpy'
+        memory_cap: Byte limit for the decision table before switching to
+            the rolling-row reconstruction (None = unlimited)
+
     Returns:
         selected_items: List of Resource objects chosen
         total_value: Total priority score
     """
-    # 1. Expand resources based on quantity
-    # If we have Item A with quantity 2, we create [Item A, Item A]
-    expanded_items = []
-    for r in resources:
-        count = r.quantity if r.quantity else 1
-        for _ in range(count):
-            # We simply append the resource 'count' times. 
-            # We do NOT modify r.volume here.
-            expanded_items.append(r)
-
-    n = len(expanded_items)
-    # DP Table: rows = items, cols = capacity 0 to max_capacity
-    dp = [[0 for _ in range(max_capacity + 1)] for _ in range(n + 1)]
-
-    # 2. Build DP Table
-    for i in range(1, n + 1):
-        item = expanded_items[i-1]
-        w = item.volume
-        v = item.priority_score
-        
-        for cap in range(1, max_capacity + 1):
-            if w <= cap:
-                # Max of: (value of this item + value of remaining space) OR (value without this item)
-                dp[i][cap] = max(v + dp[i-1][cap - w], dp[i-1][cap])
-            else:
-                dp[i][cap] = dp[i-1][cap]
-
-    # 3. Backtrack to find selected items
+    allocation, total_value = solve_bounded_knapsack(resources, max_capacity, backend=backend, memory_cap=memory_cap)
+
     selected_items = []
-    remaining_cap = max_capacity
-    
-    for i in range(n, 0, -1):
-        if dp[i][remaining_cap] != dp[i-1][remaining_cap]:
-            item = expanded_items[i-1]
-            selected_items.append(item)
-            remaining_cap -= item.volume
-
-    total_value = dp[n][max_capacity]
-    return selected_items, total_value
\ No newline at end of file
+    for r, count in allocation:
+        selected_items.extend([r] * count)
+    return selected_items, total_value
+
+
+def _fractional_bound(items, start, capacity):
+    """
+    LP (fractional) relaxation over items[start:], sorted by value density.
+
+    items: List of (resource_index, volume, value, units) tuples
+    """
+    bound = 0.0
+    for _, w, v, units in items[start:]:
+        if w == 0:
+            bound += v * units
+            continue
+        if capacity <= 0:
+            break
+        if w * units <= capacity:
+            bound += v * units
+            capacity -= w * units
+        else:
+            bound += v * capacity / w
+            capacity = 0
+    return bound
+
+
+def _branch_and_bound(items, capacities, incumbent_value, incumbent, node_limit, deadline=None, progress=None):
+    """
+    Exact multiple knapsack search over per-bin unit counts.
+
+    Items are visited in value-density order; for each item every way of
+    spreading its units over the bins is tried, most units first. Branches
+    whose fractional bound cannot beat the incumbent are pruned.
+
+    'progress' is called as progress(nodes, best value) every 1024 nodes;
+    returning True stops the search like the deadline does.
+
+    Returns:
+        best_value, best_assignment ({(resource_index, bin_index): units}),
+        finished (False if 'node_limit', 'deadline' or 'progress' stopped
+        the search before it completed)
+    """
+    best = {'value': incumbent_value, 'assignment': dict(incumbent)}
+    nodes = [0]
+    caps = list(capacities)
+    assignment = {}
+
+    def spread(j, b, units_left, value):
+        # Distribute the units of items[j] over bins b, b+1, ...
+        if b == len(caps):
+            return visit(j + 1, value)
+        idx, w, v, _ = items[j]
+        most = units_left if w == 0 else min(units_left, caps[b] // w)
+        for u in range(most, -1, -1):
+            if u:
+                caps[b] -= w * u
+                assignment[(idx, b)] = u
+            finished = spread(j, b + 1, units_left - u, value + v * u)
+            if u:
+                caps[b] += w * u
+                del assignment[(idx, b)]
+            if not finished:
+                return False
+        return True
+
+    def visit(j, value):
+        nodes[0] += 1
+        if nodes[0] > node_limit:
+            return False
+        if nodes[0] % 1024 == 0:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            if progress is not None and progress(nodes[0], best['value']):
+                return False
+        if value > best['value']:
+            best['value'] = value
+            best['assignment'] = dict(assignment)
+        if j == len(items):
+            return True
+        if value + _fractional_bound(items, j, sum(caps)) <= best['value']:
+            return True
+        return spread(j, 0, items[j][3], value)
+
+    finished = visit(0, 0)
+    return best['value'], best['assignment'], finished
+
+
+def allocate_multi_knapsack(resources, capacities, quantities=None, strategy='heuristic',
+                            backend='python', memory_cap=None, node_limit=200000,
+                            mode='exact', epsilon=0.1, deadline=None, progress=None):
+    """
+    Multiple Knapsack: shares one inventory between several destinations.
+
+    The pool is tracked as remaining units per resource, never as copies.
+
+    Args:
+        resources: List of Resource objects (Django models)
+        capacities: List of (key, capacity) tuples, one per destination
+        quantities: Optional list of available counts aligned with
+            'resources'. Defaults to each Resource's own quantity.
+        strategy: 'heuristic' fills destinations largest-first with the
+            bounded solver (independent of input order); 'exact' starts from
+            that solution and runs a branch-and-bound search, meant for small
+            instances (gives up after 'node_limit' search nodes).
+        backend, memory_cap: Passed on to the single-destination solver
+        mode: 'exact' solves each destination with solve_bounded_knapsack,
+            'approx' with solve_approx_knapsack ('epsilon', 'deadline')
+        deadline: time.monotonic() value; approx passes and the exact
+            search stop there and keep the best allocation found so far
+        progress: Called with keyword arguments stage ('dp', 'approx' or
+            'search'), destination, destinations, rows, total_rows (or
+            nodes, for 'search') and best (total value so far). Returning
+            True stops like the deadline: the current destination keeps
+            what it has, later ones get nothing, 'complete' is False.
+
+    Returns:
+        A dict with
+            'allocations': {key: [(Resource, count), ...]} for every key
+            'total_value': Total priority score over all destinations
+            'upper_bound': Fractional bound on the best possible total
+            'gap': upper_bound - total_value (0 when proven optimal)
+            'optimal': True when the result is proven optimal
+            'complete': False when the deadline cut the work short
+    """
+    if strategy not in KNAPSACK_STRATEGIES:
+        raise ValueError(f"Unknown allocation strategy '{strategy}'. Choose from {KNAPSACK_STRATEGIES}.")
+    if mode not in KNAPSACK_MODES:
+        raise ValueError(f"Unknown knapsack mode '{mode}'. Choose from {KNAPSACK_MODES}.")
+
+    if quantities is None:
+        quantities = [r.quantity if r.quantity else 1 for r in resources]
+    remaining = list(quantities)
+    capacities = [(key, max(int(cap), 0)) for key, cap in capacities]
+
+    # 1. Heuristic: largest destination first, so the result does not
+    #    depend on the order the rows were stored in
+    order = sorted(range(len(capacities)), key=lambda b: -capacities[b][1])
+    index = {id(r): i for i, r in enumerate(resources)}
+    assignment = {}
+    total_value = 0
+    complete = True
+    stopped = [False]
+    for position, b in enumerate(order):
+        if not any(remaining):
+            break
+        report = None
+        if progress is not None:
+            def report(rows, total_rows, best, done=total_value, destination=position + 1):
+                if progress(stage='approx' if mode == 'approx' else 'dp', destination=destination,
+                            destinations=len(order), rows=rows, total_rows=total_rows, best=done + best):
+                    stopped[0] = True
+                return stopped[0]
+        if mode == 'approx':
+            # Each destination gets an equal share of the time left
+            share = None
+            if deadline is not None:
+                now = time.monotonic()
+                share = now + max(deadline - now, 0) / (len(order) - position)
+            result = solve_approx_knapsack(
+                resources, capacities[b][1], remaining, epsilon=epsilon,
+                deadline=share, backend=backend, memory_cap=memory_cap, progress=report
+            )
+            selected, value = result['allocation'], result['total_value']
+            complete = complete and result['complete']
+        else:
+            selected, value = solve_bounded_knapsack(
+                resources, capacities[b][1], remaining, backend=backend, memory_cap=memory_cap,
+                progress=report
+            )
+        total_value += value
+        for r, count in selected:
+            i = index[id(r)]
+            remaining[i] -= count
+            assignment[(i, b)] = count
+        if stopped[0]:
+            complete = False
+            break
+
+    # Fractional bound on the pooled capacity is an upper bound for any
+    # split of the same inventory over the destinations
+    items = sorted(
+        (
+            (i, r.volume, r.priority_score, quantities[i])
+            for i, r in enumerate(resources)
+            if quantities[i] > 0 and r.priority_score > 0 and r.volume >= 0
+        ),
+        key=lambda item: -(item[2] / item[1]) if item[1] else float('-inf'),
+    )
+    upper_bound = _fractional_bound(items, 0, sum(cap for _, cap in capacities))
+    optimal = total_value >= int(upper_bound)
+
+    # 2. Exact: branch and bound seeded with the heuristic solution
+    if strategy == 'exact' and not optimal and not stopped[0]:
+        max_cap = max((cap for _, cap in capacities), default=0)
+        items = [item for item in items if item[1] <= max_cap]
+        search_progress = None
+        if progress is not None:
+            def search_progress(nodes, best):
+                stopped[0] = bool(progress(stage='search', nodes=nodes, best=best))
+                return stopped[0]
+        total_value, assignment, finished = _branch_and_bound(
+            items, [cap for _, cap in capacities], total_value, assignment, node_limit, deadline,
+            search_progress
+        )
+        if finished:
+            optimal = True
+            upper_bound = total_value
+        elif stopped[0] or (deadline is not None and time.monotonic() > deadline):
+            complete = False
+
+    allocations = {key: [] for key, _ in capacities}
+    for i, r in enumerate(resources):
+        for b, (key, _) in enumerate(capacities):
+            count = assignment.get((i, b), 0)
+            if count > 0:
+                allocations[key].append((r, count))
+
+    return {
+        'allocations': allocations,
+        'total_value': total_value,
+        'upper_bound': upper_bound,
+        'gap': max(upper_bound - total_value, 0),
+        'optimal': optimal,
+        'complete': complete,
+    }
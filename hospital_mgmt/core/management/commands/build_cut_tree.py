@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.cut_tree import build_cut_tree
+from core.network_cache import get_network
+
+
+class Command(BaseCommand):
+    help = "Builds and stores the Gomory-Hu tree for the current route network."
+
+    def handle(self, *args, **options):
+        version, network = get_network()
+        build_cut_tree(version, network)
+        self.stdout.write(self.style.SUCCESS(
+            f"Gomory-Hu tree stored for network version {version} ({network.node_count} nodes)."
+        ))
@@ -0,0 +1,22 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import get_job_pool
+
+
+class Command(BaseCommand):
+    help = "Runs a planning job worker: resumes pending jobs, then keeps polling for queued ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between polls for queued jobs.")
+
+    def handle(self, *args, **options):
+        pool = get_job_pool()
+        self.stdout.write(self.style.SUCCESS(f"Job worker started ({settings.JOB_WORKERS} threads)."))
+        while True:
+            time.sleep(options['interval'])
+            # Picks up jobs queued by other processes and requeues stale ones;
+            # a job already running here is not claimed twice
+            pool.resume(settings.JOB_STALE_SECONDS)
@@ -1,68 +1,511 @@
-from collections import deque, defaultdict
+from array import array
+from collections import deque
+from .network import NetworkBuilder
+from .preprocess import reduce_network
 
-class maxflow:
-    def __init__(self):
-        # Graph: {u: {v: capacity}}
-        self.graph = defaultdict(dict)
-        # Store flow for each edge
-        self.flow = defaultdict(dict)
+
+class _Engine:
+    """
+    Shared add_edge/mflow/get_flow interface of the max-flow engines.
+
+    Edges are collected by a NetworkBuilder and compiled to a CSR
+    FlowNetwork on the first mflow(); an already compiled network can be
+    passed in instead and is never modified, so it can be shared. Each
+    subclass implements solve(network, flow, s, t) on integer node ids; it
+    augments whatever valid flow it is given and returns the amount added.
+
+    'progress', if given, is called as progress(paths=..., flow=...) while
+    the solve runs (paths is None for push-relabel). If it returns True,
+    the augmenting-path engines stop and keep the valid flow found so far;
+    push-relabel only has a valid flow at the end and ignores it.
+    """
+    def __init__(self, network=None, preprocess=False, progress=None):
+        self.network = network
+        self.builder = None if network is not None else NetworkBuilder()
+        self.flow = None
+        self.preprocess = preprocess
+        self.progress = progress
 
     def add_edge(self, u, v, capacity):
-        self.graph[u][v] = capacity
-        self.graph[v].setdefault(u, 0)  # Add reverse edge with 0 capacity
-        self.flow[u][v] = 0
-        self.flow[v][u] = 0
-
-    # Renamed from 'bsf' to 'bfs' (Breadth First Search)
-    def bfs(self, source, sink, parent):
-        visited = set()
-        queue = deque([source])
-        visited.add(source)
-        parent.clear()
+        """Directed edge u→v."""
+        self._builder().add_edge(u, v, capacity)
 
-        while queue:
-            u = queue.popleft()
-            for v, cap in self.graph[u].items():
-                # Check residual capacity
-                if v not in visited and cap - self.flow[u][v] > 0:
-                    visited.add(v)
-                    parent[v] = u
-                    if v == sink:
-                        return True
-                    queue.append(v)
-        return False
+    def add_undirected_edge(self, u, v, capacity):
+        """Road usable in both directions, up to 'capacity' in total."""
+        self._builder().add_edge(u, v, capacity, undirected=True)
+
+    def _builder(self):
+        if self.builder is None:
+            raise RuntimeError("Engines created from a compiled network cannot take new edges.")
+        self.network = None
+        return self.builder
+
+    def compiled(self):
+        if self.network is None:
+            self.network = self.builder.build()
+        return self.network
 
-    def mflow(self, source, sink):
-        parent = {}
+    def mflow(self, source, sink, initial_flow=None):
+        """
+        Max-flow value from source to sink. A valid 'initial_flow' for the
+        same network is used as a warm start and only augmented; otherwise,
+        with 'preprocess' on, the engine runs on a reduced copy of the
+        network (see preprocess.reduce_network).
+        """
+        network = self.compiled()
+        self.flow = initial_flow if initial_flow is not None else network.new_flow()
+        if source not in network.index or sink not in network.index:
+            return 0
+        s = network.index[source]
+        t = network.index[sink]
+        if initial_flow is not None:
+            base = network.flow_value(self.flow, s)
+            progress = self.progress
+            if progress is not None:
+                # Report the total, not just what this solve adds
+                def progress(paths, flow, report=self.progress):
+                    return report(paths=paths, flow=base + flow)
+            return base + self.solve(network, self.flow, s, t, progress=progress)
+        if self.preprocess:
+            # Solve on the pruned/merged/contracted network, then map back
+            reduction = reduce_network(network, s, t)
+            reduced_flow = reduction.network.new_flow()
+            max_val = self.solve(
+                reduction.network, reduced_flow, reduction.source, reduction.sink, progress=self.progress
+            )
+            self.flow = reduction.expand(reduced_flow)
+            return max_val
+        return self.solve(network, self.flow, s, t, progress=self.progress)
+
+    def get_flow(self):
+        """
+        Returns a nested dict: { u: { v: flow_amount } }
+        Only includes edges with positive flow.
+        """
+        if self.flow is None:
+            return {}
+        return self.network.flow_assignments(self.flow)
+
+
+class maxflow(_Engine):
+    """
+    Edmonds–Karp: shortest augmenting paths found by BFS. O(VE²).
+    """
+    @staticmethod
+    def solve(network, flow, s, t, progress=None):
+        offsets, head, cap, rev = network.offsets, network.head, network.cap, network.rev
+        n = network.node_count
         max_flow = 0
+        paths = 0
+
+        while True:
+            # BFS over residual arcs, remembering the arc used to reach each node
+            parent_arc = [-1] * n
+            parent_arc[s] = -2
+            queue = deque([s])
+            while queue and parent_arc[t] == -1:
+                u = queue.popleft()
+                for a in range(offsets[u], offsets[u + 1]):
+                    v = head[a]
+                    if parent_arc[v] == -1 and cap[a] - flow[a] > 0:
+                        parent_arc[v] = a
+                        queue.append(v)
+            if parent_arc[t] == -1:
+                return max_flow
 
-        # Updated to call self.bfs
-        while self.bfs(source, sink, parent):
             path_flow = float('inf')
-            s = sink
-            while s != source:
-                path_flow = min(path_flow, self.graph[parent[s]][s] - self.flow[parent[s]][s])
-                s = parent[s]
-
-            v = sink
-            while v != source:
-                u = parent[v]
-                self.flow[u][v] += path_flow
-                self.flow[v][u] -= path_flow
-                v = u
+            v = t
+            while v != s:
+                a = parent_arc[v]
+                path_flow = min(path_flow, cap[a] - flow[a])
+                v = head[rev[a]]
+
+            v = t
+            while v != s:
+                a = parent_arc[v]
+                flow[a] += path_flow
+                flow[rev[a]] -= path_flow
+                v = head[rev[a]]
 
             max_flow += path_flow
+            paths += 1
+            if progress is not None and progress(paths=paths, flow=max_flow):
+                return max_flow
 
-        return max_flow
 
-    def get_flow(self):
+class Dinic(_Engine):
+    """
+    Dinic's algorithm: BFS level graph, then blocking flow by DFS.
+    O(V²E) in general, much faster than Edmonds–Karp on road networks.
+    """
+    @staticmethod
+    def _levels(network, flow, s, t):
+        offsets, head, cap = network.offsets, network.head, network.cap
+        level = [-1] * network.node_count
+        level[s] = 0
+        queue = deque([s])
+        while queue:
+            u = queue.popleft()
+            for a in range(offsets[u], offsets[u + 1]):
+                v = head[a]
+                if level[v] < 0 and cap[a] - flow[a] > 0:
+                    level[v] = level[u] + 1
+                    queue.append(v)
+        return level if level[t] >= 0 else None
+
+    @staticmethod
+    def _blocking_flow(network, flow, s, t, level, on_path=None):
         """
-        Returns a nested dict: { u: { v: flow_amount } }
-        Only includes edges with positive flow.
+        Returns the amount pushed, and whether 'on_path' (called with the
+        amount of each augmenting path) asked to stop.
         """
-        assignments = defaultdict(dict)
-        for u in self.flow:
-            for v, f in self.flow[u].items():
-                if f > 0:
-                    assignments[u][v] = f
-        return assignments
\ No newline at end of file
+        offsets, head, cap, rev = network.offsets, network.head, network.cap, network.rev
+        it = list(offsets[:-1])     # next arc to try, per node
+        stack = []                  # arcs on the current s→u path
+        u = s
+        pushed = 0
+
+        while True:
+            if u == t:
+                f = min(cap[a] - flow[a] for a in stack)
+                for a in stack:
+                    flow[a] += f
+                    flow[rev[a]] -= f
+                pushed += f
+                if on_path is not None and on_path(f):
+                    return pushed, True
+                # Retreat to the tail of the first saturated arc
+                k = next(i for i, a in enumerate(stack) if cap[a] - flow[a] == 0)
+                del stack[k:]
+                u = head[stack[-1]] if stack else s
+                continue
+
+            end = offsets[u + 1]
+            while it[u] < end:
+                a = it[u]
+                v = head[a]
+                if cap[a] - flow[a] > 0 and level[v] == level[u] + 1:
+                    stack.append(a)
+                    u = v
+                    break
+                it[u] += 1
+            else:
+                # Dead end: drop u from the level graph and step back
+                if u == s:
+                    return pushed, False
+                level[u] = -1
+                a = stack.pop()
+                u = head[rev[a]]
+                it[u] += 1
+
+    @classmethod
+    def solve(cls, network, flow, s, t, progress=None):
+        max_flow = 0
+        on_path = None
+        if progress is not None:
+            found = {'paths': 0, 'flow': 0}
+
+            def on_path(f):
+                found['paths'] += 1
+                found['flow'] += f
+                return progress(paths=found['paths'], flow=found['flow'])
+
+        level = cls._levels(network, flow, s, t)
+        while level is not None:
+            pushed, stopped = cls._blocking_flow(network, flow, s, t, level, on_path)
+            max_flow += pushed
+            if stopped:
+                break
+            level = cls._levels(network, flow, s, t)
+        return max_flow
+
+
+class PushRelabel(_Engine):
+    """
+    Highest-label push-relabel with the gap heuristic.
+
+    Nodes cut off from the sink by a gap are lifted above n at once and
+    return their excess to the source, so the result is a valid flow.
+    """
+    @staticmethod
+    def solve(network, flow, s, t, progress=None):
+        offsets, head, cap, rev = network.offsets, network.head, network.cap, network.rev
+        n = network.node_count
+        discharges = 0
+
+        height = [0] * n
+        excess = [0] * n
+        current = list(offsets[:-1])
+        count = [0] * (2 * n + 1)      # nodes per height, for gap detection
+        buckets = [[] for _ in range(2 * n + 1)]   # active nodes per height
+
+        height[s] = n
+        count[0] = n - 1
+        count[n] = 1
+
+        for a in range(offsets[s], offsets[s + 1]):
+            d = cap[a] - flow[a]
+            if d > 0:
+                v = head[a]
+                flow[a] += d
+                flow[rev[a]] -= d
+                excess[s] -= d
+                excess[v] += d
+                if v != s and v != t and excess[v] == d:
+                    buckets[0].append(v)
+
+        highest = 0
+        while highest >= 0:
+            if not buckets[highest]:
+                highest -= 1
+                continue
+            u = buckets[highest].pop()
+            end = offsets[u + 1]
+            discharges += 1
+            if progress is not None and discharges % 256 == 0:
+                # Flow reaching the sink so far (a preflow; not stoppable)
+                progress(paths=None, flow=excess[t])
+
+            # Discharge u
+            while excess[u] > 0:
+                if current[u] < end:
+                    a = current[u]
+                    v = head[a]
+                    r = cap[a] - flow[a]
+                    if r > 0 and height[u] == height[v] + 1:
+                        d = min(excess[u], r)
+                        flow[a] += d
+                        flow[rev[a]] -= d
+                        excess[u] -= d
+                        excess[v] += d
+                        if v != s and v != t and excess[v] == d:
+                            buckets[height[v]].append(v)
+                    else:
+                        current[u] += 1
+                    continue
+
+                # Relabel
+                old = height[u]
+                new = 2 * n
+                for a in range(offsets[u], end):
+                    if cap[a] - flow[a] > 0 and height[head[a]] + 1 < new:
+                        new = height[head[a]] + 1
+                count[old] -= 1
+                height[u] = new
+                count[new] += 1
+                current[u] = offsets[u]
+
+                if count[old] == 0 and old < n:
+                    # Gap: nothing between 'old' and n can reach the sink
+                    for w in range(n):
+                        h = height[w]
+                        if old < h < n:
+                            if w != u and w != t and excess[w] > 0:
+                                buckets[h].remove(w)
+                                buckets[n + 1].append(w)
+                            count[h] -= 1
+                            height[w] = n + 1
+                            count[n + 1] += 1
+                            current[w] = offsets[w]
+                    highest = max(highest, n + 1)
+
+            highest = max(highest, height[u] - 1)
+
+        return excess[t]
+
+
+def residual_reachable(network, flow, s):
+    """
+    Nodes reachable from s through arcs with residual capacity left.
+    After a max-flow this is the source side of a minimum cut.
+
+    Returns:
+        bytearray mask, 1 for reachable node ids
+    """
+    offsets, head, cap = network.offsets, network.head, network.cap
+    seen = bytearray(network.node_count)
+    seen[s] = 1
+    queue = deque([s])
+    while queue:
+        u = queue.popleft()
+        for a in range(offsets[u], offsets[u + 1]):
+            v = head[a]
+            if not seen[v] and cap[a] - flow[a] > 0:
+                seen[v] = 1
+                queue.append(v)
+    return seen
+
+
+def min_cut(network, flow, s):
+    """
+    Minimum cut of a max-flow, from one residual BFS.
+
+    Returns:
+        List of (edge id, tail, head) for every edge crossing from the
+        source side to the sink side; tail/head are oriented that way,
+        so an undirected road may be reported against its stored direction.
+    """
+    side = residual_reachable(network, flow, s)
+    cut = []
+    for e in range(network.edge_count):
+        u, v = network.edge_tail[e], network.edge_head[e]
+        if side[u] and not side[v]:
+            cut.append((e, u, v))
+        elif side[v] and not side[u] and network.edge_undirected[e]:
+            cut.append((e, v, u))
+    return cut
+
+
+def bottleneck_routes(network, flow, s, limit=None):
+    """
+    Ranks the routes of the minimum cut: these are the roads that limit
+    throughput, since every one of them is saturated and raising any of
+    them is the only way to raise the max-flow.
+
+    Routes are ordered by capacity (their share of the max-flow), largest
+    first; parallel roads between the same two districts are listed
+    separately.
+
+    Returns:
+        { 'capacity': cut capacity (= max-flow value),
+          'routes': [ { 'route_id', 'from', 'to', 'capacity', 'share' } ] }
+    """
+    cut = min_cut(network, flow, s)
+    total = sum(network.edge_cap[e] for e, _, _ in cut)
+    routes = []
+    for e, u, v in cut:
+        capacity = network.edge_cap[e]
+        routes.append({
+            'route_id': network.edge_key[e] if network.edge_key[e] >= 0 else None,
+            'from': network.names[u],
+            'to': network.names[v],
+            'capacity': capacity,
+            'share': round(capacity / total, 4) if total else 0.0,
+        })
+    routes.sort(key=lambda r: -r['capacity'])
+    if limit is not None:
+        routes = routes[:limit]
+    return {'capacity': total, 'routes': routes}
+
+
+def decompose_paths(network, flow, s, t):
+    """
+    Splits a flow into source→sink paths, largest amount first.
+
+    Follows positive-flow arcs from s, peeling off one path (or one cycle,
+    which carries nothing from s to t and is just cancelled) per walk. A
+    per-node arc pointer skips emptied arcs, so the total work is
+    O(E · number of paths). The given flow is not modified.
+
+    Returns:
+        List of (amount, [node ids from s to t])
+    """
+    offsets, head, rev = network.offsets, network.head, network.rev
+    left = array('q', flow)
+    pointer = list(offsets[:-1])
+    paths = []
+
+    def next_arc(u):
+        end = offsets[u + 1]
+        while pointer[u] < end and left[pointer[u]] <= 0:
+            pointer[u] += 1
+        return pointer[u] if pointer[u] < end else -1
+
+    while True:
+        nodes = [s]
+        arcs = []
+        position = {s: 0}
+        while nodes[-1] != t:
+            a = next_arc(nodes[-1])
+            if a < 0:
+                break
+            v = head[a]
+            if v in position:
+                # Cycle: cancel it and continue from where it started
+                k = position[v]
+                cycle = arcs[k:] + [a]
+                d = min(left[b] for b in cycle)
+                for b in cycle:
+                    left[b] -= d
+                    left[rev[b]] += d
+                for u in nodes[k + 1:]:
+                    del position[u]
+                del nodes[k + 1:]
+                del arcs[k:]
+                continue
+            position[v] = len(nodes)
+            nodes.append(v)
+            arcs.append(a)
+
+        if nodes[-1] != t:
+            break
+        d = min(left[b] for b in arcs)
+        for b in arcs:
+            left[b] -= d
+            left[rev[b]] += d
+        paths.append((d, nodes))
+
+    paths.sort(key=lambda p: -p[0])
+    return paths
+
+
+def gomory_hu_tree(network, solver=None):
+    """
+    Gusfield's algorithm: a Gomory–Hu cut tree of an undirected network
+    from n - 1 max-flow runs, without contracting the graph.
+
+    Node i (i > 0) hangs below parent[i] with edge weight weight[i]; node 0
+    is the root. The max-flow value between any two nodes is the smallest
+    weight on the tree path between them, and removing that edge splits
+    the nodes into the two sides of a minimum cut between them.
+
+    Args:
+        network: Compiled FlowNetwork (undirected edges)
+        solver: Engine class whose solve() is used (defaults to Dinic)
+
+    Returns:
+        parent, weight: Lists indexed by node id (parent[0] = -1)
+    """
+    solver = solver or Dinic
+    n = network.node_count
+    parent = [0] * n
+    weight = [0] * n
+    if n:
+        parent[0] = -1
+
+    for s in range(1, n):
+        t = parent[s]
+        flow = network.new_flow()
+        value = solver.solve(network, flow, s, t)
+        weight[s] = value
+        side = residual_reachable(network, flow, s)
+        # Nodes on s's side of the cut that hung below t move below s
+        for i in range(n):
+            if i != s and side[i] and parent[i] == t:
+                parent[i] = s
+        # If t's parent is on s's side too, s takes t's place in the tree
+        if parent[t] >= 0 and side[parent[t]]:
+            parent[s] = parent[t]
+            parent[t] = s
+            weight[s] = weight[t]
+            weight[t] = value
+
+    return parent, weight
+
+
+ENGINES = {
+    'edmonds_karp': maxflow,
+    'dinic': Dinic,
+    'push_relabel': PushRelabel,
+}
+
+
+def get_engine(name, network=None, preprocess=False, progress=None):
+    """
+    Returns a new max-flow engine by name (see ENGINES), empty or bound to
+    an already compiled FlowNetwork.
+    """
+    try:
+        return ENGINES[name](network, preprocess=preprocess, progress=progress)
+    except KeyError:
+        raise ValueError(f"Unknown max-flow engine '{name}'. Choose from {list(ENGINES)}.")
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_datasetversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GomoryHuTree',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('network_version', models.BigIntegerField(unique=True)),
+                ('nodes', models.JSONField()),
+                ('parent', models.JSONField()),
+                ('weight', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_gomoryhutree'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistrictRegion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('district', models.CharField(max_length=100, unique=True)),
+                ('region', models.CharField(db_index=True, max_length=100)),
+            ],
+        ),
+    ]
@@ -0,0 +1,138 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def intern_districts(apps, schema_editor):
+    """
+    Creates a District per distinct name, points the new foreign keys at
+    them and merges duplicate (A, to) routes (capacities summed into the
+    oldest row) so the unique constraint can be added.
+
+    Rows with a blank source or destination name are deleted: a shared
+    placeholder district would join unrelated routes into fake paths.
+    """
+    District = apps.get_model('core', 'District')
+    TransportFlow = apps.get_model('core', 'TransportFlow')
+    SupplyMaxCap = apps.get_model('core', 'supply_max_cap')
+
+    names = set()
+    for model in (TransportFlow, SupplyMaxCap):
+        blank = [
+            pk for pk, a, to in model.objects.values_list('id', 'A', 'to').iterator(chunk_size=2000)
+            if not a.strip() or not to.strip()
+        ]
+        model.objects.filter(id__in=blank).delete()
+        for a, to in model.objects.values_list('A', 'to').distinct():
+            names.add(a)
+            names.add(to)
+    District.objects.bulk_create([District(name=name) for name in sorted(names)])
+    ids = dict(District.objects.values_list('name', 'id'))
+
+    for model, amount in ((TransportFlow, 'max_capacity'), (SupplyMaxCap, 'capacity')):
+        kept = {}
+        updates = []
+        duplicates = []
+        for row in model.objects.order_by('id').iterator(chunk_size=2000):
+            key = (row.A, row.to)
+            if key in kept:
+                first = kept[key]
+                setattr(first, amount, getattr(first, amount) + getattr(row, amount))
+                duplicates.append(row.id)
+                continue
+            row.A_district_id = ids[row.A]
+            row.to_district_id = ids[row.to]
+            kept[key] = row
+            updates.append(row)
+        model.objects.bulk_update(updates, ['A_district', 'to_district', amount], batch_size=2000)
+        model.objects.filter(id__in=duplicates).delete()
+
+
+def restore_names(apps, schema_editor):
+    """
+    Reverse of intern_districts: copies the district names back into the
+    name columns. Merged duplicates and deleted blank rows stay as they are.
+    """
+    TransportFlow = apps.get_model('core', 'TransportFlow')
+    SupplyMaxCap = apps.get_model('core', 'supply_max_cap')
+    for model in (TransportFlow, SupplyMaxCap):
+        rows = list(model.objects.select_related('A_district', 'to_district'))
+        for row in rows:
+            row.A = row.A_district.name
+            row.to = row.to_district.name
+        model.objects.bulk_update(rows, ['A', 'to'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_districtregion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='District',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transportflow',
+            name='A_district',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.district'),
+        ),
+        migrations.AddField(
+            model_name='transportflow',
+            name='to_district',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.district'),
+        ),
+        migrations.AddField(
+            model_name='supply_max_cap',
+            name='A_district',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.district'),
+        ),
+        migrations.AddField(
+            model_name='supply_max_cap',
+            name='to_district',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.district'),
+        ),
+        # Nullable while both columns exist, so reversing can re-add the
+        # name columns to a populated table and fill them before NOT NULL
+        migrations.AlterField(model_name='transportflow', name='A', field=models.CharField(max_length=100, null=True)),
+        migrations.AlterField(model_name='transportflow', name='to', field=models.CharField(max_length=100, null=True)),
+        migrations.AlterField(model_name='supply_max_cap', name='A', field=models.CharField(max_length=100, null=True)),
+        migrations.AlterField(model_name='supply_max_cap', name='to', field=models.CharField(max_length=100, null=True)),
+        migrations.RunPython(intern_districts, restore_names),
+        migrations.RemoveField(model_name='transportflow', name='A'),
+        migrations.RemoveField(model_name='transportflow', name='to'),
+        migrations.RemoveField(model_name='supply_max_cap', name='A'),
+        migrations.RemoveField(model_name='supply_max_cap', name='to'),
+        migrations.RenameField(model_name='transportflow', old_name='A_district', new_name='A'),
+        migrations.RenameField(model_name='transportflow', old_name='to_district', new_name='to'),
+        migrations.RenameField(model_name='supply_max_cap', old_name='A_district', new_name='A'),
+        migrations.RenameField(model_name='supply_max_cap', old_name='to_district', new_name='to'),
+        migrations.AlterField(
+            model_name='transportflow',
+            name='A',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='routes_out', to='core.district'),
+        ),
+        migrations.AlterField(
+            model_name='transportflow',
+            name='to',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='routes_in', to='core.district'),
+        ),
+        migrations.AlterField(
+            model_name='supply_max_cap',
+            name='A',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='supply_caps_out', to='core.district'),
+        ),
+        migrations.AlterField(
+            model_name='supply_max_cap',
+            name='to',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='supply_caps_in', to='core.district'),
+        ),
+        migrations.AddConstraint(
+            model_name='transportflow',
+            constraint=models.UniqueConstraint(fields=('A', 'to'), name='unique_route'),
+        ),
+    ]
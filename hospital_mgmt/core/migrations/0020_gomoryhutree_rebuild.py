@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def drop_stored_trees(apps, schema_editor):
+    """
+    Trees stored before gomory_hu_tree built real cut trees only carry
+    the max-flow values; they are rebuilt on the next query.
+    """
+    apps.get_model('core', 'GomoryHuTree').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_planningjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_stored_trees, migrations.RunPython.noop),
+    ]
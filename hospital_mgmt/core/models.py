@@ -1,6 +1,7 @@
 from email.policy import default
 
 from django.db import models
+from django.db.models import F
 
 class Resource(models.Model):
     name = models.CharField(max_length=100)
@@ -10,15 +11,144 @@ class Resource(models.Model):
     def __str__(self):
         return self.name
 
+class District(models.Model):
+    """
+    One row per district name. Routes and capacities point here by
+    integer id, so names are stored and compared once.
+    """
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def intern(cls, names):
+        """
+        Returns { name: id } for the given names, creating missing districts.
+        Raises ValueError for a blank name.
+        """
+        names = set(names)
+        if any(not name.strip() for name in names):
+            raise ValueError("District names cannot be blank.")
+        ids = dict(cls.objects.filter(name__in=names).values_list('name', 'id'))
+        missing = names - ids.keys()
+        if missing:
+            cls.objects.bulk_create([cls(name=name) for name in missing], ignore_conflicts=True)
+            ids.update(cls.objects.filter(name__in=missing).values_list('name', 'id'))
+        return ids
+
 class TransportFlow(models.Model):
-    A = models.CharField(max_length=100)
-    to = models.CharField(max_length=100)
+    A = models.ForeignKey(District, on_delete=models.PROTECT, related_name='routes_out')
+    to = models.ForeignKey(District, on_delete=models.PROTECT, related_name='routes_in')
     max_capacity = models.IntegerField()
     amount_sent = models.IntegerField(null = True, blank = True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['A', 'to'], name='unique_route'),
+        ]
+
     def __str__(self):
         return f"{self.A} → {self.to}: {self.amount_sent} units"
 class supply_max_cap(models.Model):
-    A = models.CharField(max_length=100)
-    to = models.CharField(max_length=100)
-    capacity = models.IntegerField()
\ No newline at end of file
+    A = models.ForeignKey(District, on_delete=models.CASCADE, related_name='supply_caps_out')
+    to = models.ForeignKey(District, on_delete=models.CASCADE, related_name='supply_caps_in')
+    capacity = models.IntegerField()
+
+class DatasetVersion(models.Model):
+    """
+    Change counter per dataset (e.g. 'network'). Every write to the data
+    bumps it, so caches built from that data can tell when they are stale
+    with a single indexed lookup. Stored in the DB so all worker processes
+    agree on it.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    @classmethod
+    def current(cls, name):
+        return cls.objects.filter(name=name).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def lock(cls, name):
+        """
+        Locks the counter row until the current transaction ends, so
+        writers of one dataset (in any process) take turns.
+        """
+        cls.objects.get_or_create(name=name)
+        cls.objects.select_for_update().filter(name=name).first()
+
+    @classmethod
+    def bump(cls, name):
+        if not cls.objects.filter(name=name).update(version=F('version') + 1):
+            _, created = cls.objects.get_or_create(name=name, defaults={'version': 1})
+            if not created:
+                cls.objects.filter(name=name).update(version=F('version') + 1)
+
+
+class GomoryHuTree(models.Model):
+    """
+    Gomory-Hu cut tree of the route network for one network version.
+    'nodes' holds the district names; node i hangs below parent[i] with
+    weight[i] (see maxflow.gomory_hu_tree).
+    """
+    network_version = models.BigIntegerField(unique=True)
+    nodes = models.JSONField()
+    parent = models.JSONField()
+    weight = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Gomory-Hu tree (network v{self.network_version}, {len(self.nodes)} nodes)"
+
+
+class DistrictRegion(models.Model):
+    """
+    Region (e.g. division) a district belongs to. Used to contract the
+    route network for the hierarchical coarse-to-fine flow; districts
+    without a row form a region of their own.
+    """
+    district = models.CharField(max_length=100, unique=True)
+    region = models.CharField(max_length=100, db_index=True)
+
+    def __str__(self):
+        return f"{self.district} ({self.region})"
+
+
+class PlanningJob(models.Model):
+    """
+    A flow and/or knapsack run executed in the background by the local job
+    pool (see jobs.py). The row is the queue: workers claim queued jobs
+    and write progress and the result back here, so both survive restarts.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(s, s) for s in (QUEUED, RUNNING, SUCCEEDED, FAILED)]
+    KIND_CHOICES = [
+        ('plan', 'Max flow, then knapsack allocation'),
+        ('flow', 'Max flow (saves supply capacities)'),
+        ('optimize', 'Knapsack allocation, removed from inventory'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='plan')
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    progress = models.FloatField(default=0.0)
+    stage = models.CharField(max_length=100, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    # 'pid@host' of the process running the job; it refreshes heartbeat_at
+    # while the job runs, so a job whose process died can be requeued
+    worker = models.CharField(max_length=200, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Job #{self.id} {self.kind} ({self.status})"
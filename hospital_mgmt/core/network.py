@@ -0,0 +1,251 @@
+import copy
+from array import array
+from collections import defaultdict
+
+
+class NetworkBuilder:
+    """
+    Collects edges for a FlowNetwork.
+
+    District names are interned to ints once, here; everything after build()
+    works on ints and names only come back at output time.
+    """
+    def __init__(self):
+        self.index = {}              # name -> node id
+        self.names = []              # node id -> name
+        self.tails = array('q')
+        self.heads = array('q')
+        self.caps = array('q')
+        self.undirected = bytearray()
+        self.keys = array('q')      # caller's id per edge (route pk), -1 if none
+
+    def node(self, name):
+        node = self.index.get(name)
+        if node is None:
+            node = len(self.names)
+            self.index[name] = node
+            self.names.append(name)
+        return node
+
+    def add_edge(self, u, v, capacity, undirected=False, key=None):
+        """
+        Adds one edge. An undirected edge can carry up to 'capacity' in
+        either direction (one arc pair), a directed one only u→v.
+        Parallel edges are kept side by side, never overwritten.
+        'key' (e.g. the route's primary key) identifies the edge across
+        rebuilds of the network.
+        """
+        self.tails.append(self.node(u))
+        self.heads.append(self.node(v))
+        self.caps.append(capacity)
+        self.undirected.append(1 if undirected else 0)
+        self.keys.append(-1 if key is None else key)
+
+    def build(self):
+        return FlowNetwork(
+            self.names, self.index, self.tails, self.heads, self.caps, self.undirected, self.keys
+        )
+
+
+class FlowNetwork:
+    """
+    Read-only CSR (compressed sparse row) flow network.
+
+    Arcs leaving node u are arc ids offsets[u] .. offsets[u + 1] - 1. For each
+    arc: head[a] is the node it points to, cap[a] its capacity and rev[a]
+    the paired reverse arc. Every edge e owns the arc pair
+    (edge_arc[e], rev[edge_arc[e]]); the reverse arc has capacity 0 for a
+    directed edge and the same capacity for an undirected one.
+
+    Flows live outside the network (see new_flow), so one compiled network
+    can be shared by any number of solves.
+    """
+    def __init__(self, names, index, tails, heads, caps, undirected, keys=None):
+        self.names = list(names)
+        self.index = dict(index)
+        n = len(self.names)
+        m = len(tails)
+
+        self.edge_tail = array('q', tails)
+        self.edge_head = array('q', heads)
+        self.edge_cap = array('q', caps)
+        self.edge_undirected = bytes(undirected)
+        self.edge_key = array('q', keys) if keys is not None else array('q', [-1] * m)
+
+        # Counting sort of the 2m arcs by their tail node
+        degree = [0] * (n + 1)
+        for e in range(m):
+            degree[tails[e] + 1] += 1
+            degree[heads[e] + 1] += 1
+        for u in range(n):
+            degree[u + 1] += degree[u]
+        self.offsets = array('q', degree)
+
+        fill = list(degree[:n])
+        head = array('q', bytes(16 * m))
+        cap = array('q', bytes(16 * m))
+        rev = array('q', bytes(16 * m))
+        edge_arc = array('q', bytes(8 * m))
+        for e in range(m):
+            u, v, c = tails[e], heads[e], caps[e]
+            a = fill[u]
+            fill[u] += 1
+            b = fill[v]
+            fill[v] += 1
+            head[a] = v
+            cap[a] = c
+            head[b] = u
+            cap[b] = c if undirected[e] else 0
+            rev[a] = b
+            rev[b] = a
+            edge_arc[e] = a
+
+        self.head = head
+        self.cap = cap
+        self.rev = rev
+        self.edge_arc = edge_arc
+
+    @property
+    def node_count(self):
+        return len(self.names)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_tail)
+
+    def with_capacities(self, changes):
+        """
+        Copy of the network with some edge capacities replaced.
+        The arc layout is unchanged, so a flow of this network is also a
+        (possibly over-capacity) flow of the copy.
+
+        Args:
+            changes: { edge id: new capacity }
+        """
+        changed = copy.copy(self)
+        changed.edge_cap = array('q', self.edge_cap)
+        changed.cap = array('q', self.cap)
+        for e, capacity in changes.items():
+            a = self.edge_arc[e]
+            changed.edge_cap[e] = capacity
+            changed.cap[a] = capacity
+            if self.edge_undirected[e]:
+                changed.cap[self.rev[a]] = capacity
+        return changed
+
+    def new_flow(self):
+        """Zero flow for every arc."""
+        return array('q', bytes(8 * len(self.head)))
+
+    def flow_value(self, flow, s):
+        """Net flow leaving node s."""
+        return sum(flow[a] for a in range(self.offsets[s], self.offsets[s + 1]))
+
+    def net_flows(self, flow):
+        """
+        Positive net flow per district pair, on node ids: [(u, v, amount)].
+        Parallel edges are summed and opposite directions netted.
+        """
+        net = defaultdict(int)
+        for e in range(len(self.edge_tail)):
+            f = flow[self.edge_arc[e]]
+            if f:
+                u, v = self.edge_tail[e], self.edge_head[e]
+                if u < v:
+                    net[(u, v)] += f
+                else:
+                    net[(v, u)] -= f
+
+        flows = []
+        for (u, v), f in net.items():
+            if f > 0:
+                flows.append((u, v, f))
+            elif f < 0:
+                flows.append((v, u, -f))
+        return flows
+
+    def flow_assignments(self, flow):
+        """
+        Maps a flow back to names: { u: { v: flow_amount } }.
+        Only positive net flows are included (see net_flows).
+        """
+        assignments = defaultdict(dict)
+        for u, v, f in self.net_flows(flow):
+            assignments[self.names[u]][self.names[v]] = f
+        return assignments
+
+    def flow_edge_list(self, flow, paths=None):
+        """
+        Compact encoding of a flow: a name table of the districts involved
+        and integer rows instead of nested name dicts.
+
+        Returns:
+            { 'nodes': [name, ...],
+              'edges': [ [u, v, amount], ... ],
+              'paths': [ [amount, [u, ..., v]], ... ] (only if 'paths' given) }
+            with u, v indexes into 'nodes'.
+        """
+        table = {}
+
+        def local(u):
+            if u not in table:
+                table[u] = len(table)
+            return table[u]
+
+        edges = [[local(u), local(v), f] for u, v, f in self.net_flows(flow)]
+        encoded_paths = None
+        if paths is not None:
+            encoded_paths = [[amount, [local(u) for u in nodes]] for amount, nodes in paths]
+
+        encoded = {'nodes': [self.names[u] for u in table], 'edges': edges}
+        if encoded_paths is not None:
+            encoded['paths'] = encoded_paths
+        return encoded
+
+
+def with_super_terminals(network, supplies, demands):
+    """
+    Multi-source / multi-sink network: a copy of 'network' plus a virtual
+    super-source feeding every source and a super-sink fed by every sink.
+
+    Args:
+        network: Compiled FlowNetwork
+        supplies: { source name: supply cap or None (unlimited) }
+        demands: { sink name: demand cap or None (unlimited) }
+
+    Returns:
+        extended FlowNetwork, super-source name, super-sink name
+    """
+    # Larger than any cut of the real network, i.e. effectively unlimited
+    unlimited = sum(network.edge_cap) + 1
+
+    super_source = '__super_source__'
+    super_sink = '__super_sink__'
+    while super_source in network.index or super_sink in network.index:
+        super_source = '_' + super_source
+        super_sink = '_' + super_sink
+
+    names = network.names + [super_source, super_sink]
+    index = dict(network.index)
+    index[super_source] = len(names) - 2
+    index[super_sink] = len(names) - 1
+
+    tails = array('q', network.edge_tail)
+    heads = array('q', network.edge_head)
+    caps = array('q', network.edge_cap)
+    undirected = bytearray(network.edge_undirected)
+    keys = array('q', network.edge_key)
+    for name, cap in supplies.items():
+        tails.append(index[super_source])
+        heads.append(index[name])
+        caps.append(unlimited if cap is None else cap)
+        undirected.append(0)
+        keys.append(-1)
+    for name, cap in demands.items():
+        tails.append(index[name])
+        heads.append(index[super_sink])
+        caps.append(unlimited if cap is None else cap)
+        undirected.append(0)
+        keys.append(-1)
+
+    return FlowNetwork(names, index, tails, heads, caps, undirected, keys), super_source, super_sink
@@ -0,0 +1,52 @@
+import logging
+import threading
+
+from .models import DatasetVersion, District, TransportFlow
+from .network import NetworkBuilder
+
+NETWORK = 'network'
+
+logger = logging.getLogger(__name__)
+
+# Process-level cache of the compiled TransportFlow network
+_lock = threading.Lock()
+_cached = {'version': None, 'network': None}
+
+
+def bump_network_version():
+    """
+    Marks every compiled network as stale. Call after any TransportFlow
+    write that does not go through Model.save() (bulk_create, deletes).
+    """
+    DatasetVersion.bump(NETWORK)
+
+
+def build_network():
+    """
+    Compiles every TransportFlow route into an undirected FlowNetwork,
+    keyed by route id. Routes are read as integer district ids; each
+    district's name is looked up once.
+    """
+    builder = NetworkBuilder()
+    names = dict(District.objects.values_list('id', 'name'))
+    routes = TransportFlow.objects.values_list('id', 'A_id', 'to_id', 'max_capacity')
+    for route_id, a, to, capacity in routes.iterator(chunk_size=5000):
+        builder.add_edge(names[a], names[to], capacity, undirected=True, key=route_id)
+    return builder.build()
+
+
+def get_network():
+    """
+    Returns (version, FlowNetwork) for the current network version.
+
+    The network is only rebuilt from the database when the version counter
+    has moved since the last build; otherwise the cached, read-only network
+    is returned and the request costs one indexed lookup.
+    """
+    version = DatasetVersion.current(NETWORK)
+    with _lock:
+        if _cached['version'] != version:
+            logger.debug("Building network graph (version %s)", version)
+            _cached['network'] = build_network()
+            _cached['version'] = version
+        return version, _cached['network']
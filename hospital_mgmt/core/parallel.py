@@ -0,0 +1,51 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .maxflow import get_engine
+
+# Set once per worker process by _init_worker, so the network is shipped
+# to each worker a single time instead of once per pair
+_worker_network = None
+
+
+def _init_worker(network):
+    global _worker_network
+    _worker_network = network
+
+
+def _solve_pair(task):
+    source, sink, engine, include_details, preprocess = task
+    started = time.perf_counter()
+    mf = get_engine(engine, _worker_network, preprocess=preprocess)
+    max_val = mf.mflow(source, sink)
+    result = {'source': source, 'sink': sink, 'max_flow': max_val}
+    if include_details:
+        result['details'] = {u: dict(vs) for u, vs in mf.get_flow().items()}
+    result['seconds'] = round(time.perf_counter() - started, 6)
+    return result
+
+
+def solve_pairs(network, pairs, engine, include_details=True, max_workers=None, preprocess=False):
+    """
+    Solves many (source, sink) pairs on one compiled network.
+
+    The pairs are fanned out over a ProcessPoolExecutor (one worker per core
+    by default); each worker receives the network once at start-up. Small
+    batches are solved in-process.
+
+    Returns:
+        results: One dict per pair, in input order, with its own timing
+        workers: Number of processes used
+    """
+    tasks = [(source, sink, engine, include_details, preprocess) for source, sink in pairs]
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+
+    if workers <= 1:
+        _init_worker(network)
+        return [_solve_pair(task) for task in tasks], 1
+
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(network,)) as pool:
+        results = list(pool.map(_solve_pair, tasks, chunksize=chunksize))
+    return results, workers
@@ -0,0 +1,195 @@
+from collections import deque
+
+from .network import FlowNetwork
+
+
+def _reach(network, start, backward=False):
+    """
+    Nodes reachable from 'start' over arcs with capacity (or, backward,
+    nodes that can reach 'start').
+    """
+    offsets, head, cap, rev = network.offsets, network.head, network.cap, network.rev
+    seen = bytearray(network.node_count)
+    seen[start] = 1
+    queue = deque([start])
+    while queue:
+        u = queue.popleft()
+        for a in range(offsets[u], offsets[u + 1]):
+            v = head[a]
+            if not seen[v] and (cap[rev[a]] if backward else cap[a]) > 0:
+                seen[v] = 1
+                queue.append(v)
+    return seen
+
+
+class Reduction:
+    """
+    A smaller network with the same source→sink max-flow as the original,
+    and the bookkeeping to turn its flows back into flows of the original.
+
+    Every reduced edge is an "item" on original node ids: one original
+    route, a parallel group of items between the same two districts, or a
+    series chain of items through contracted degree-2 districts.
+    """
+    def __init__(self, network, s, t):
+        self.original = network
+        self.u = []
+        self.v = []
+        self.cap = []
+        self.undirected = []
+        self.parts = []             # ('edge', e) | ('parallel', [items]) | ('series', [items], [nodes])
+        self.adj = [set() for _ in range(network.node_count)]
+        self.group = {}             # (undirected, u, v) -> item between them
+
+        # 1. Keep districts that are reachable from s AND can reach t
+        keep = bytes(a & b for a, b in zip(_reach(network, s), _reach(network, t, backward=True)))
+        if keep[t]:
+            # 2. One item per usable route, parallel routes merged
+            for e in range(network.edge_count):
+                u, v = network.edge_tail[e], network.edge_head[e]
+                if network.edge_cap[e] > 0 and keep[u] and keep[v]:
+                    self._attach(self._item(u, v, network.edge_cap[e], network.edge_undirected[e], ('edge', e)))
+
+            # 3. Contract degree-2 chains (merging any parallels this creates)
+            stack = [u for u in range(network.node_count) if keep[u] and u != s and u != t]
+            while stack:
+                x = stack.pop()
+                if x != s and x != t and len(self.adj[x]) == 2:
+                    for y in self._contract(x):
+                        stack.append(y)
+
+        # 4. Compile what is left
+        nodes = [u for u in range(network.node_count) if self.adj[u] or u == s or u == t]
+        new_id = {u: i for i, u in enumerate(nodes)}
+        self.edge_items = sorted({r for u in nodes for r in self.adj[u]})
+        self.network = FlowNetwork(
+            [network.names[u] for u in nodes],
+            {network.names[u]: i for i, u in enumerate(nodes)},
+            [new_id[self.u[r]] for r in self.edge_items],
+            [new_id[self.v[r]] for r in self.edge_items],
+            [self.cap[r] for r in self.edge_items],
+            bytes(self.undirected[r] for r in self.edge_items),
+        )
+        self.source = new_id[s]
+        self.sink = new_id[t]
+
+    def _item(self, u, v, cap, undirected, parts):
+        self.u.append(u)
+        self.v.append(v)
+        self.cap.append(cap)
+        self.undirected.append(undirected)
+        self.parts.append(parts)
+        return len(self.u) - 1
+
+    def _key(self, r):
+        u, v = self.u[r], self.v[r]
+        if self.undirected[r]:
+            return (1, min(u, v), max(u, v))
+        return (0, u, v)
+
+    def _attach(self, r):
+        """Adds item r to the graph, or folds it into its parallel group."""
+        key = self._key(r)
+        q = self.group.get(key)
+        if q is None:
+            self.group[key] = r
+            self.adj[self.u[r]].add(r)
+            self.adj[self.v[r]].add(r)
+            return
+        if self.parts[q][0] == 'parallel':
+            self.parts[q][1].append(r)
+            self.cap[q] += self.cap[r]
+            return
+        p = self._item(self.u[q], self.v[q], self.cap[q] + self.cap[r], self.undirected[q], ('parallel', [q, r]))
+        self._detach(q)
+        self._attach(p)
+
+    def _detach(self, r):
+        self.adj[self.u[r]].discard(r)
+        self.adj[self.v[r]].discard(r)
+        if self.group.get(self._key(r)) == r:
+            del self.group[self._key(r)]
+
+    def _allows(self, r, x, y):
+        return self.undirected[r] or (self.u[r] == x and self.v[r] == y)
+
+    def _contract(self, x):
+        """
+        Replaces the two items a–x and x–b by one a–b item with the smaller
+        capacity, directed if only one way through x is open. Returns the
+        neighbors whose degree changed.
+        """
+        r1, r2 = self.adj[x]
+        a = self.u[r1] if self.v[r1] == x else self.v[r1]
+        b = self.u[r2] if self.v[r2] == x else self.v[r2]
+        if a == b:
+            return []
+
+        forward = self._allows(r1, a, x) and self._allows(r2, x, b)
+        backward = self._allows(r1, x, a) and self._allows(r2, b, x)
+        self._detach(r1)
+        self._detach(r2)
+        cap = min(self.cap[r1], self.cap[r2])
+        if forward:
+            self._attach(self._item(a, b, cap, 1 if backward else 0, ('series', [r1, r2], [a, x, b])))
+        elif backward:
+            self._attach(self._item(b, a, cap, 0, ('series', [r2, r1], [b, x, a])))
+        # Neither: x is a dead end, both items just go
+        return [a, b]
+
+    def expand(self, reduced_flow):
+        """
+        Maps a flow of the reduced network onto the original routes.
+
+        Returns:
+            Flow array for the original network
+        """
+        network = self.original
+        flow = network.new_flow()
+        stack = []
+        for i, r in enumerate(self.edge_items):
+            f = reduced_flow[self.network.edge_arc[i]]
+            if f > 0:
+                stack.append((r, f, self.u[r]))
+            elif f < 0:
+                stack.append((r, -f, self.v[r]))
+
+        # (item, amount, node the amount enters from)
+        while stack:
+            r, amount, x = stack.pop()
+            parts = self.parts[r]
+            if parts[0] == 'edge':
+                e = parts[1]
+                a = network.edge_arc[e]
+                d = amount if x == network.edge_tail[e] else -amount
+                flow[a] += d
+                flow[network.rev[a]] -= d
+            elif parts[0] == 'parallel':
+                left = amount
+                for m in parts[1]:
+                    take = min(self.cap[m], left)
+                    if take:
+                        stack.append((m, take, x))
+                        left -= take
+                    if not left:
+                        break
+            else:
+                items, nodes = parts[1], parts[2]
+                if x == nodes[0]:
+                    stack.extend((m, amount, nodes[i]) for i, m in enumerate(items))
+                else:
+                    stack.extend((m, amount, nodes[i + 1]) for i, m in enumerate(items))
+        return flow
+
+
+def reduce_network(network, s, t):
+    """
+    Preprocessing before a max-flow solve between node ids s and t:
+    districts that are not reachable from s or cannot reach t are dropped,
+    parallel routes are merged by summing capacities, and chains through
+    degree-2 districts are contracted into single edges.
+
+    Returns:
+        Reduction (.network, .source, .sink, .expand(flow))
+    """
+    return Reduction(network, s, t)
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+
+from django.db import connection
+
+# Not 'error': EventSource fires its own 'error' event on connection loss
+FINAL_EVENTS = ('result', 'cancelled', 'failed')
+
+logger = logging.getLogger(__name__)
+
+
+class SolveCancelled(Exception):
+    """Raised from a progress callback to abandon a solve."""
+
+
+def sse_event(event, data):
+    """One Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class ProgressRun:
+    """
+    One solve running in a background thread while its progress is
+    streamed to the client as Server-Sent Events.
+
+    'report' is the solvers' progress callback. It forwards at most one
+    event per 'interval' seconds and tells the solver whether to stop:
+    - accept(): stop at the next checkpoint and send the best result so
+      far (marked "complete": false)
+    - cancel(): abandon the solve, nothing is sent but 'cancelled'. Also
+      happens when the client disconnects.
+    """
+    def __init__(self, interval=0.25, keepalive=15, on_finish=None):
+        self.id = uuid.uuid4().hex
+        self.interval = interval
+        self.keepalive = keepalive
+        self.on_finish = on_finish
+        self.events = queue.Queue()
+        self.stopped = False
+        # (event loop, asyncio.Queue) once astream() is consuming
+        self._listener = None
+        self._listener_lock = threading.Lock()
+        self._accept = threading.Event()
+        self._cancel = threading.Event()
+        self._last = 0.0
+
+    def accept(self):
+        self._accept.set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def report(self, **fields):
+        if self._cancel.is_set():
+            raise SolveCancelled()
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            self._emit('progress', fields)
+        if self._accept.is_set():
+            self.stopped = True
+        return self.stopped
+
+    def start(self, solve):
+        """Runs solve(run) -> result dict in a new thread."""
+        threading.Thread(target=self._run, args=(solve,), name=f"progress-{self.id}", daemon=True).start()
+
+    def _run(self, solve):
+        try:
+            result = solve(self)
+            self._emit('result', result)
+        except SolveCancelled:
+            self._emit('cancelled', {'run_id': self.id})
+        except Exception as e:
+            logger.exception("Progress run %s failed", self.id)
+            self._emit('failed', {'error': f"{type(e).__name__}: {e}"})
+        finally:
+            _unregister(self)
+            if self.on_finish is not None:
+                self.on_finish()
+            connection.close()
+
+    def _emit(self, event, data):
+        with self._listener_lock:
+            if self._listener is None:
+                self.events.put((event, data))
+                return
+            loop, events = self._listener
+        try:
+            loop.call_soon_threadsafe(events.put_nowait, (event, data))
+        except RuntimeError:
+            # The event loop is gone, and with it the client
+            pass
+
+    def _next(self):
+        try:
+            return self.events.get(timeout=self.keepalive)
+        except queue.Empty:
+            return None
+
+    def stream(self, start_data):
+        """SSE messages for a WSGI (sync) response."""
+        finished = False
+        try:
+            yield sse_event('start', start_data)
+            while not finished:
+                item = self._next()
+                if item is None:
+                    yield ": keepalive\n\n"
+                    continue
+                finished = item[0] in FINAL_EVENTS
+                yield sse_event(*item)
+        finally:
+            if not finished:
+                self.cancel()
+
+    async def astream(self, start_data):
+        """
+        SSE messages for an ASGI response. The solver thread hands events
+        to the event loop (call_soon_threadsafe), so waiting for them holds
+        no thread.
+        """
+        events = asyncio.Queue()
+        with self._listener_lock:
+            # Events sent before the stream started come first
+            while not self.events.empty():
+                events.put_nowait(self.events.get_nowait())
+            self._listener = (asyncio.get_running_loop(), events)
+
+        finished = False
+        try:
+            yield sse_event('start', start_data)
+            while not finished:
+                try:
+                    item = await asyncio.wait_for(events.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                finished = item[0] in FINAL_EVENTS
+                yield sse_event(*item)
+        finally:
+            if not finished:
+                self.cancel()
+
+
+# Runs of this process, so a stop request can find them
+_runs = {}
+_runs_lock = threading.Lock()
+
+
+def register_run(run):
+    with _runs_lock:
+        _runs[run.id] = run
+    return run
+
+
+def _unregister(run):
+    with _runs_lock:
+        _runs.pop(run.id, None)
+
+
+def get_run(run_id):
+    with _runs_lock:
+        return _runs.get(run_id)
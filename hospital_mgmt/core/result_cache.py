@@ -0,0 +1,161 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import DatasetVersion
+
+# Dataset version counters (see DatasetVersion) next to NETWORK
+INVENTORY = 'inventory'     # Resource rows
+CAPACITY = 'capacity'       # supply_max_cap rows
+
+
+def bump_inventory_version():
+    """Call after any Resource write that does not go through Model.save()."""
+    DatasetVersion.bump(INVENTORY)
+
+
+def bump_capacity_version():
+    """Call after any supply_max_cap write that does not go through Model.save()."""
+    DatasetVersion.bump(CAPACITY)
+
+
+class ResultCache:
+    """
+    Two-tier cache of computed results.
+
+    - Memory: per-process LRU, bounded by the encoded size of the entries.
+    - Disk (optional): SQLite file shared by every worker process and kept
+      across restarts. Rows of older dataset versions are dropped as soon as
+      a newer result of the same kind is stored, since versions only grow.
+
+    Keys include the dataset versions a result was computed from, so a
+    write to the data makes old entries unreachable instead of needing
+    explicit invalidation.
+
+    Values are response bodies and are stored as the JSON they render to
+    (no pickle, so a shared cache file cannot run code when read): tuples
+    come back as lists and dict keys as strings.
+    """
+    def __init__(self, max_bytes, sqlite_path=None):
+        self.max_bytes = max_bytes
+        self.sqlite_path = sqlite_path
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> JSON bytes
+        self._bytes = 0
+        self._table_ready = False
+
+    @staticmethod
+    def make_key(kind, versions, params):
+        raw = json.dumps([kind, versions, params], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @staticmethod
+    def _encode(value):
+        return json.dumps(value, cls=JSONEncoder, separators=(',', ':')).encode()
+
+    @staticmethod
+    def _decode(blob):
+        try:
+            return json.loads(blob)
+        except ValueError:
+            # Rows written by older versions (pickled): treated as a miss
+            return None
+
+    @contextmanager
+    def _database(self):
+        """SQLite connection for one transaction; committed and closed after."""
+        connection = sqlite3.connect(str(self.sqlite_path), timeout=5)
+        try:
+            with connection:
+                if not self._table_ready:
+                    connection.execute(
+                        "CREATE TABLE IF NOT EXISTS result_cache ("
+                        " key TEXT PRIMARY KEY, kind TEXT, versions TEXT, value BLOB, created REAL)"
+                    )
+                    connection.execute("CREATE INDEX IF NOT EXISTS result_cache_kind ON result_cache (kind)")
+                    self._table_ready = True
+                yield connection
+        finally:
+            connection.close()
+
+    def _remember(self, key, blob):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            if len(blob) > self.max_bytes:
+                return
+            self._entries[key] = blob
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def get(self, kind, versions, params):
+        """
+        Returns (value, tier) with tier 'memory' or 'disk', or (None, None).
+        """
+        key = self.make_key(kind, versions, params)
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+                return json.loads(blob), 'memory'
+
+        if self.sqlite_path:
+            with self._database() as connection:
+                row = connection.execute("SELECT value FROM result_cache WHERE key = ?", (key,)).fetchone()
+            value = self._decode(row[0]) if row is not None else None
+            if value is not None:
+                self._remember(key, row[0])
+                return value, 'disk'
+        return None, None
+
+    def put(self, kind, versions, params, value):
+        key = self.make_key(kind, versions, params)
+        blob = self._encode(value)
+        self._remember(key, blob)
+
+        if self.sqlite_path:
+            stamp = json.dumps(versions, sort_keys=True)
+            with self._database() as connection:
+                connection.execute("DELETE FROM result_cache WHERE kind = ? AND versions != ?", (kind, stamp))
+                connection.execute(
+                    "INSERT OR REPLACE INTO result_cache (key, kind, versions, value, created) VALUES (?, ?, ?, ?, ?)",
+                    (key, kind, stamp, blob, time.time())
+                )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.sqlite_path:
+            with self._database() as connection:
+                connection.execute("DELETE FROM result_cache")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Process-wide ResultCache configured from settings."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(settings.RESULT_CACHE_MAX_BYTES, settings.RESULT_CACHE_SQLITE_PATH)
+        return _cache
+
+
+def dataset_versions(*names):
+    """{ name: current version } for the given datasets, in one query."""
+    versions = {name: 0 for name in names}
+    versions.update(DatasetVersion.objects.filter(name__in=names).values_list('name', 'version'))
+    return versions
@@ -0,0 +1,157 @@
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from .incremental import _repair
+from .maxflow import ENGINES, residual_reachable
+
+# Set once per worker process by _init_worker: the network, the baseline
+# flow and its min cut are shipped to each worker a single time
+_baseline = None
+
+
+def _init_worker(baseline):
+    global _baseline
+    _baseline = baseline
+
+
+def _evaluate(task):
+    """
+    Max-flow of one scenario, starting from the baseline flow.
+
+    If every changed route still fits its baseline flow, the baseline flow
+    stays feasible (so the value cannot drop), and if no raised route
+    crosses the min cut, the cut still bounds it (so it cannot rise): the
+    answer is the baseline value without any solve. Otherwise the baseline
+    flow is trimmed back within the new capacities (incremental._repair)
+    and only augmented.
+    """
+    name, changes = task
+    network = _baseline['network']
+    flow = _baseline['flow']
+    side = _baseline['side']
+    s, t = _baseline['source'], _baseline['sink']
+    started = time.perf_counter()
+
+    unaffected = True
+    for e, capacity in changes.items():
+        if abs(flow[network.edge_arc[e]]) > capacity:
+            unaffected = False
+            break
+        if capacity > network.edge_cap[e] and side[network.edge_tail[e]] != side[network.edge_head[e]]:
+            unaffected = False
+            break
+
+    if unaffected:
+        max_val = _baseline['value']
+    else:
+        changed = network.with_capacities(changes)
+        warm = array('q', flow)
+        _repair(changed, warm, s, t)
+        max_val = changed.flow_value(warm, s) + ENGINES[_baseline['engine']].solve(changed, warm, s, t)
+
+    return {
+        'name': name,
+        'max_flow': max_val,
+        'resolved': not unaffected,
+        'seconds': round(time.perf_counter() - started, 6),
+    }
+
+
+def _busy_routes(network, flow):
+    return [e for e in range(network.edge_count) if flow[network.edge_arc[e]]]
+
+
+def count_removals(network, flow, size):
+    """
+    Number of scenarios generate_removals would return, without building
+    them (the pair list grows quadratically with the flow-carrying routes).
+    """
+    b = len(_busy_routes(network, flow))
+    if size == 1:
+        return b
+    return b * (b - 1) // 2 + b * (network.edge_count - b)
+
+
+def generate_removals(network, flow, size):
+    """
+    Route-failure scenarios over the routes that carry baseline flow.
+
+    size 1: every flow-carrying route removed on its own.
+    size 2: every pair with at least one flow-carrying route; pairs of idle
+    routes are skipped, since removing them leaves the baseline flow intact.
+    Check count_removals first on large networks.
+
+    Returns:
+        List of lists of edge ids
+    """
+    busy = _busy_routes(network, flow)
+    if size == 1:
+        return [[e] for e in busy]
+    idle = [e for e in range(network.edge_count) if not flow[network.edge_arc[e]]]
+    pairs = [list(pair) for pair in combinations(busy, 2)]
+    pairs.extend([e, f] for e in busy for f in idle)
+    return pairs
+
+
+def run_scenarios(network, source, sink, scenarios, engine, max_workers=None, baseline_flow=None):
+    """
+    What-if analysis: the max-flow from source to sink under each scenario
+    of route removals or capacity changes, ranked by how much flow is lost.
+
+    The baseline is solved once (or taken from 'baseline_flow', a max-flow
+    the caller already solved); each scenario starts from its flow (see
+    _evaluate). Scenarios are fanned out over a ProcessPoolExecutor like
+    parallel.solve_pairs; small runs stay in-process.
+
+    Args:
+        network: Compiled FlowNetwork
+        scenarios: List of (name, { edge id: new capacity })
+        engine: Engine name used for the baseline and any re-solve
+        baseline_flow: Optional max-flow from source to sink on 'network'
+
+    Returns:
+        baseline: Baseline max-flow value
+        results: One dict per scenario, largest drop first
+        workers: Number of processes used
+    """
+    s, t = network.index[source], network.index[sink]
+    if baseline_flow is not None:
+        flow = baseline_flow
+        value = network.flow_value(flow, s)
+    else:
+        flow = network.new_flow()
+        value = ENGINES[engine].solve(network, flow, s, t)
+    baseline = {
+        'network': network, 'flow': flow, 'value': value,
+        'side': residual_reachable(network, flow, s),
+        'source': s, 'sink': t, 'engine': engine,
+    }
+
+    tasks = list(scenarios)
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks)) or 1
+    if workers <= 1:
+        _init_worker(baseline)
+        results = [_evaluate(task) for task in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(baseline,)) as pool:
+            results = list(pool.map(_evaluate, tasks, chunksize=chunksize))
+
+    for (_, changes), result in zip(tasks, results):
+        result['drop'] = value - result['max_flow']
+        result['drop_pct'] = round(100.0 * result['drop'] / value, 2) if value else 0.0
+        result['changes'] = [
+            {
+                'route_id': network.edge_key[e] if network.edge_key[e] >= 0 else None,
+                'from': network.names[network.edge_tail[e]],
+                'to': network.names[network.edge_head[e]],
+                'capacity': network.edge_cap[e],
+                'new_capacity': capacity,
+            }
+            for e, capacity in changes.items()
+        ]
+    results.sort(key=lambda r: -r['drop'])
+    return value, results, workers
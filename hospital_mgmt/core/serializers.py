@@ -1,10 +1,66 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
-from .models import TransportFlow, Resource
+from .models import District, PlanningJob, TransportFlow, Resource
+from .maxflow import ENGINES
+from .knapsack import KNAPSACK_BACKENDS, KNAPSACK_MODES, KNAPSACK_STRATEGIES
+
+class DistrictNameField(serializers.SlugRelatedField):
+    """
+    A District foreign key read and written as the district name. An
+    unknown name validates to an unsaved District; the serializer saving
+    it creates the district (see TransportFlowSerializer).
+    """
+    def __init__(self, **kwargs):
+        super().__init__(slug_field='name', queryset=District.objects.all(), **kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str) or not data.strip():
+            self.fail('invalid')
+        name = data.strip()
+        return District.objects.filter(name=name).first() or District(name=name)
 
 class TransportFlowSerializer(serializers.ModelSerializer):
+    A = DistrictNameField()
+    to = DistrictNameField()
+
     class Meta:
         model = TransportFlow
         fields = ['id', 'A', 'to', 'max_capacity']
+        # The unique (A, to) check is done in validate(): the generated
+        # validator cannot filter on districts that are not saved yet
+        validators = []
+
+    def validate(self, data):
+        a = data.get('A', getattr(self.instance, 'A', None))
+        to = data.get('to', getattr(self.instance, 'to', None))
+        if a.pk is not None and to.pk is not None:
+            routes = TransportFlow.objects.filter(A=a, to=to)
+            if self.instance is not None:
+                routes = routes.exclude(pk=self.instance.pk)
+            if routes.exists():
+                raise serializers.ValidationError(f"A route from '{a.name}' to '{to.name}' already exists.")
+        return data
+
+    def _with_districts(self, validated_data):
+        # Districts are created here, in the save's transaction, not
+        # while validating
+        new = {
+            field: validated_data[field] for field in ('A', 'to')
+            if field in validated_data and validated_data[field].pk is None
+        }
+        if not new:
+            return validated_data
+        ids = District.intern(district.name for district in new.values())
+        return {**validated_data, **{field: District(id=ids[d.name], name=d.name) for field, d in new.items()}}
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            return super().create(self._with_districts(validated_data))
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            return super().update(instance, self._with_districts(validated_data))
 
 class ResourceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,11 +70,140 @@ class ResourceSerializer(serializers.ModelSerializer):
 class FileUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
 
+class RouteUploadSerializer(FileUploadSerializer):
+    # 'replace': delete all routes and load the file; 'diff': only apply the
+    # inserts/updates/deletes needed to match the file, keyed on (A, to)
+    mode = serializers.ChoiceField(choices=['replace', 'diff'], required=False, default='replace')
+
 class MaxFlowInputSerializer(serializers.Serializer):
     source = serializers.CharField(max_length=100)
     sink = serializers.CharField(max_length=100)
+    # Optional: defaults to settings.MAXFLOW_ENGINE
+    engine = serializers.ChoiceField(choices=list(ENGINES), required=False)
+    # Optional: reuse the last flow for this pair (defaults to settings.FLOW_INCREMENTAL)
+    incremental = serializers.BooleanField(required=False)
+    # Optional: add the minimum cut / bottleneck routes to the response
+    include_cut = serializers.BooleanField(required=False, default=False)
+    # Optional: add the flow split into source→sink paths
+    include_paths = serializers.BooleanField(required=False, default=False)
+    # 'nested': details as { u: { v: flow } }; 'compact': name table + integer edge list
+    format = serializers.ChoiceField(choices=['nested', 'compact'], required=False, default='nested')
     
     def validate(self, data):
         if data['source'].lower() == data['sink'].lower():
             raise serializers.ValidationError("Source and Sink cannot be the same.")
-        return data
\ No newline at end of file
+        return data
+
+class CutTreeQuerySerializer(MaxFlowInputSerializer):
+    # Full flow assignments need a regular engine run; off by default
+    include_details = serializers.BooleanField(required=False, default=False)
+
+
+class FlowPairSerializer(serializers.Serializer):
+    source = serializers.CharField(max_length=100)
+    sink = serializers.CharField(max_length=100)
+
+    def validate(self, data):
+        if data['source'].lower() == data['sink'].lower():
+            raise serializers.ValidationError("Source and Sink cannot be the same.")
+        return data
+
+
+class BatchFlowInputSerializer(serializers.Serializer):
+    pairs = FlowPairSerializer(many=True, allow_empty=False)
+    engine = serializers.ChoiceField(choices=list(ENGINES), required=False)
+    include_details = serializers.BooleanField(required=False, default=True)
+
+    def validate_pairs(self, pairs):
+        limit = settings.FLOW_BATCH_MAX_PAIRS
+        if len(pairs) > limit:
+            raise serializers.ValidationError(f"At most {limit} pairs per batch.")
+        return pairs
+
+
+class TerminalSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100)
+    # Optional per-terminal cap: supply for sources, demand for sinks
+    limit = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+
+
+class MultiTerminalFlowSerializer(serializers.Serializer):
+    sources = TerminalSerializer(many=True, allow_empty=False)
+    sinks = TerminalSerializer(many=True, allow_empty=False)
+    engine = serializers.ChoiceField(choices=list(ENGINES), required=False)
+
+    def validate(self, data):
+        sources = [t['name'] for t in data['sources']]
+        sinks = [t['name'] for t in data['sinks']]
+        if len(set(sources)) != len(sources) or len(set(sinks)) != len(sinks):
+            raise serializers.ValidationError("Each district may be listed only once per side.")
+        if set(sources) & set(sinks):
+            raise serializers.ValidationError("A district cannot be both a source and a sink.")
+        return data
+
+
+class RouteChangeSerializer(serializers.Serializer):
+    route_id = serializers.IntegerField()
+    # New capacity as a fraction of the current one; 0 (default) removes the route
+    scale = serializers.FloatField(required=False, default=0.0, min_value=0.0)
+
+
+class ScenarioSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=200, required=False)
+    changes = RouteChangeSerializer(many=True, allow_empty=False)
+
+
+class ScenarioAnalysisSerializer(MaxFlowInputSerializer):
+    scenarios = ScenarioSerializer(many=True, required=False)
+    # Auto-generated route failures: every flow-carrying route, or pairs of routes
+    generate = serializers.ChoiceField(choices=['single', 'pair'], required=False)
+    # Only return the N scenarios with the largest drop
+    top = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, data):
+        data = super().validate(data)
+        if not data.get('scenarios') and not data.get('generate'):
+            raise serializers.ValidationError("Give 'scenarios', 'generate', or both.")
+        return data
+
+
+class HierarchicalFlowSerializer(MaxFlowInputSerializer):
+    # Optional { district: region } mapping; merged over the DistrictRegion table
+    regions = serializers.DictField(child=serializers.CharField(max_length=100), required=False)
+
+
+class PlanningJobInputSerializer(serializers.Serializer):
+    # 'plan': max flow then knapsack; 'flow': max flow only; 'optimize':
+    # knapsack over the saved capacities, removing the units from inventory
+    kind = serializers.ChoiceField(choices=[k for k, _ in PlanningJob.KIND_CHOICES], required=False, default='plan')
+    source = serializers.CharField(max_length=100, required=False)
+    sink = serializers.CharField(max_length=100, required=False)
+    engine = serializers.ChoiceField(choices=list(ENGINES), required=False)
+    # Knapsack options, as the /api/calculate-knapsack/ query parameters
+    backend = serializers.ChoiceField(choices=list(KNAPSACK_BACKENDS), required=False)
+    strategy = serializers.ChoiceField(choices=list(KNAPSACK_STRATEGIES), required=False)
+    mode = serializers.ChoiceField(choices=list(KNAPSACK_MODES), required=False)
+    time_budget_ms = serializers.IntegerField(required=False, min_value=1)
+    epsilon = serializers.FloatField(required=False)
+
+    def validate_epsilon(self, value):
+        if not 0 < value < 1:
+            raise serializers.ValidationError("epsilon must be between 0 and 1.")
+        return value
+
+    def validate(self, data):
+        if data['kind'] in ('plan', 'flow'):
+            if not data.get('source') or not data.get('sink'):
+                raise serializers.ValidationError("'source' and 'sink' are required for this kind of job.")
+            if data['source'].lower() == data['sink'].lower():
+                raise serializers.ValidationError("Source and Sink cannot be the same.")
+        return data
+
+
+class PlanningJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PlanningJob
+        fields = [
+            'id', 'kind', 'params', 'status', 'progress', 'stage', 'result', 'error',
+            'created_at', 'started_at', 'finished_at'
+        ]
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import District, Resource, TransportFlow, supply_max_cap
+from .network_cache import bump_network_version
+from .result_cache import bump_capacity_version, bump_inventory_version
+
+
+@receiver(post_save, sender=TransportFlow)
+def transport_flow_saved(sender, instance, **kwargs):
+    # No post_delete receiver on purpose: it would turn every queryset
+    # delete() into a row-by-row delete. Deletes bump explicitly instead.
+    bump_network_version()
+
+
+@receiver(post_save, sender=District)
+def district_saved(sender, instance, created, **kwargs):
+    # A renamed district renames a node of the compiled network
+    if not created:
+        bump_network_version()
+
+
+@receiver(post_save, sender=Resource)
+def resource_saved(sender, instance, **kwargs):
+    bump_inventory_version()
+
+
+@receiver(post_save, sender=supply_max_cap)
+def supply_max_cap_saved(sender, instance, **kwargs):
+    bump_capacity_version()
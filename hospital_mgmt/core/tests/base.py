@@ -0,0 +1,91 @@
+from itertools import product
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .. import concurrency, cut_tree, incremental, network_cache
+from ..models import Resource, TransportFlow
+from ..network import NetworkBuilder
+from ..result_cache import get_result_cache
+
+
+def make_resources(rng, n, max_volume=9, max_score=20, max_quantity=4):
+    return [
+        Resource(
+            name=f"item{i}", volume=rng.randint(1, max_volume),
+            priority_score=rng.randint(1, max_score), quantity=rng.randint(1, max_quantity)
+        )
+        for i in range(n)
+    ]
+
+
+def brute_force_knapsack(resources, capacity):
+    """Best total priority over every count combination (small inputs only)."""
+    best = 0
+    for counts in product(*(range(r.quantity + 1) for r in resources)):
+        volume = sum(r.volume * c for r, c in zip(resources, counts))
+        if volume <= capacity:
+            best = max(best, sum(r.priority_score * c for r, c in zip(resources, counts)))
+    return best
+
+
+def random_network(rng, nodes, edges, max_capacity=20):
+    builder = NetworkBuilder()
+    for i in range(nodes):
+        builder.node(f"n{i}")
+    for key in range(edges):
+        u, v = rng.sample(range(nodes), 2)
+        builder.add_edge(f"n{u}", f"n{v}", rng.randint(1, max_capacity), undirected=rng.random() < 0.5, key=key)
+    return builder.build()
+
+
+class KnapsackTestMixin:
+    def assertFeasible(self, resources, allocation, capacity, value):
+        by_id = {id(r): r for r in resources}
+        for r, count in allocation:
+            self.assertIn(id(r), by_id)
+            self.assertTrue(0 < count <= r.quantity)
+        self.assertLessEqual(sum(r.volume * c for r, c in allocation), capacity)
+        self.assertEqual(sum(r.priority_score * c for r, c in allocation), value)
+
+
+
+class FlowTestMixin:
+    def assertValidFlow(self, network, flow, s, t, value):
+        for e in range(network.edge_count):
+            a = network.edge_arc[e]
+            self.assertEqual(flow[a], -flow[network.rev[a]])
+            self.assertLessEqual(flow[a], network.cap[a])
+            self.assertLessEqual(-flow[a], network.cap[network.rev[a]])
+        for u in range(network.node_count):
+            if u not in (s, t):
+                self.assertEqual(network.flow_value(flow, u), 0)
+        self.assertEqual(network.flow_value(flow, s), value)
+
+
+class ApiTestMixin:
+    def setUp(self):
+        super().setUp()
+        # Process-level caches are keyed by dataset versions, which restart
+        # with every test's database
+        network_cache._cached.update(version=None, network=None)
+        cut_tree._cached.update(version=None, tree=None)
+        incremental._states.clear()
+        get_result_cache().clear()
+        # Rebuilt on first use, so override_settings applies to it
+        concurrency._limiter = None
+        self.client = APIClient()
+
+    def upload(self, text, **extra):
+        csv_file = SimpleUploadedFile('routes.csv', text.encode(), content_type='text/csv')
+        return self.client.post('/api/upload/', {'file': csv_file, **extra}, format='multipart')
+
+    def routes(self):
+        return dict(
+            ((a, to), c) for a, to, c in TransportFlow.objects.values_list('A__name', 'to__name', 'max_capacity')
+        )
+
+
+class ApiTestCase(ApiTestMixin, TestCase):
+    pass
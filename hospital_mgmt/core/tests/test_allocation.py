@@ -0,0 +1,26 @@
+from ..models import District, Resource, supply_max_cap
+from ..utils import run_supply_optimization
+from .base import ApiTestCase
+
+
+class AllocationTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        ids = District.intern(['Dhaka', 'Feni', 'Comilla'])
+        for source in ('Dhaka', 'Feni'):
+            supply_max_cap.objects.create(A_id=ids[source], to_id=ids['Comilla'], capacity=100)
+        Resource.objects.create(name='Oxygen', volume=100, priority_score=50, quantity=2)
+
+    def test_two_sources_feeding_one_destination(self):
+        response = self.client.get('/api/calculate-knapsack/?include_summary=true')
+        self.assertEqual(response.status_code, 200)
+        allocations = response.data['allocations']
+        self.assertEqual(set(allocations), {'Dhaka→Comilla', 'Feni→Comilla'})
+        self.assertEqual(sum(a['total_priority'] for a in allocations.values()), 100)
+        self.assertEqual(response.data['summary']['total_priority'], 100)
+
+    def test_optimization_reports_every_route_it_deducts(self):
+        selected, total_value = run_supply_optimization()
+        self.assertEqual(set(selected), {'Dhaka→Comilla', 'Feni→Comilla'})
+        self.assertEqual(total_value, 100)
+        self.assertEqual(Resource.objects.get().quantity, 0)
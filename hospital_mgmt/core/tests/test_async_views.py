@@ -0,0 +1,96 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TransactionTestCase, override_settings
+
+from ..concurrency import get_compute_limiter
+from ..models import District, Resource, TransportFlow, supply_max_cap
+from ..result_cache import get_result_cache
+from .base import ApiTestMixin
+
+ROUTES = "Source,Destination,Capacity\nDhaka,Comilla,5\nComilla,Feni,4\nDhaka,Feni,3\n"
+
+
+class AsyncViewTests(ApiTestMixin, TransactionTestCase):
+    """
+    The async views against their DRF counterparts. Solves run on the
+    solver pool's own connections, hence TransactionTestCase.
+    """
+    def setUp(self):
+        super().setUp()
+        self.upload(ROUTES)
+        ids = District.intern(['Dhaka', 'Feni', 'Comilla'])
+        for source in ('Dhaka', 'Feni'):
+            supply_max_cap.objects.create(A_id=ids[source], to_id=ids['Comilla'], capacity=100)
+        Resource.objects.create(name='Oxygen', volume=40, priority_score=50, quantity=3)
+        Resource.objects.create(name='Saline', volume=25, priority_score=20, quantity=4)
+        self.async_client = AsyncClient()
+
+    async def sync_json(self, method, url, data=None):
+        """JSON body of the DRF view, computed without the result cache."""
+        await sync_to_async(get_result_cache().clear)()
+        request = getattr(self.client, method)
+        response = await sync_to_async(request)(url, data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    async def test_reads(self):
+        status = await self.async_client.get('/api/async/status/')
+        self.assertEqual(status.json(), {'data_exists': True})
+
+        flow = await TransportFlow.objects.order_by('id').afirst()
+        flows = (await self.async_client.get('/api/async/flows/')).json()
+        self.assertEqual(flows, await self.sync_json('get', '/api/flows/'))
+        detail = await self.async_client.get(f'/api/async/flows/{flow.pk}/')
+        self.assertEqual(detail.json(), flows[0])
+
+        resource = await Resource.objects.order_by('id').afirst()
+        resources = (await self.async_client.get('/api/async/resources/')).json()
+        self.assertEqual([r['name'] for r in resources], ['Oxygen', 'Saline'])
+        detail = await self.async_client.get(f'/api/async/resources/{resource.pk}/')
+        self.assertEqual(detail.json(), resources[0])
+
+        missing = await self.async_client.get('/api/async/flows/999/')
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_calculate_flow_matches_sync_view(self):
+        options = {'source': 'Dhaka', 'sink': 'Feni', 'incremental': False}
+        response = await self.async_client.post(
+            '/api/async/calculate-flow/', options, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Result-Cache'], 'miss')
+        self.assertEqual(response.json()['max_flow'], 7)
+        self.assertEqual(response.json(), await self.sync_json('post', '/api/calculate-flow/', options))
+
+        invalid = await self.async_client.post(
+            '/api/async/calculate-flow/', {'source': 'Dhaka'}, content_type='application/json'
+        )
+        self.assertEqual(invalid.status_code, 400)
+
+    async def test_calculate_knapsack_matches_sync_view(self):
+        url = '/api/async/calculate-knapsack/?include_summary=true'
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['allocations']), {'Dhaka→Comilla', 'Feni→Comilla'})
+        self.assertEqual(response.json(), await self.sync_json('get', '/api/calculate-knapsack/?include_summary=true'))
+
+        again = await self.async_client.get(url)
+        self.assertEqual(again['X-Result-Cache'], 'memory')
+
+    @override_settings(COMPUTE_MAX_CONCURRENT=1, COMPUTE_QUEUE_TIMEOUT_SECONDS=0.1, COMPUTE_RETRY_AFTER_SECONDS=7)
+    async def test_busy_limiter_answers_503(self):
+        limiter = get_compute_limiter()
+        limiter.acquire()
+        try:
+            flow = await self.async_client.post(
+                '/api/async/calculate-flow/', {'source': 'Dhaka', 'sink': 'Feni'}, content_type='application/json'
+            )
+            knapsack = await self.async_client.get('/api/async/calculate-knapsack/')
+        finally:
+            limiter.release()
+        for response in (flow, knapsack):
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '7')
+        status = await self.async_client.get('/api/async/status/')
+        self.assertEqual(status.status_code, 200)
@@ -0,0 +1,115 @@
+import threading
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from .. import concurrency, views
+from ..concurrency import ComputeBusy, SingleFlight, get_compute_limiter, single_flight
+from ..views import calculate_max_flow
+from .base import ApiTestCase, ApiTestMixin
+
+ROUTES = "Source,Destination,Capacity\nDhaka,Comilla,5\nComilla,Feni,4\nDhaka,Feni,3\n"
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_error_is_raised_and_key_freed(self):
+        flight = SingleFlight()
+        with self.assertRaises(KeyError):
+            flight.do('k', lambda: {}['missing'])
+        self.assertEqual(flight.do('k', lambda: 1), (1, False))
+
+
+class SharedSolveTests(ApiTestMixin, TransactionTestCase):
+    """Identical calculate_max_flow calls made while one is solving."""
+    followers = 3
+
+    def setUp(self):
+        super().setUp()
+        self.upload(ROUTES)
+        self.options = {'source': 'Dhaka', 'sink': 'Feni', 'incremental': False, 'include_cut': False}
+        self.release = threading.Event()
+        self.entered = threading.Semaphore(0)
+        self.solves = 0
+        self.outcomes = []
+
+    def call(self):
+        try:
+            self.outcomes.append(calculate_max_flow(self.options))
+        except Exception as e:
+            self.outcomes.append(e)
+        finally:
+            connection.close()
+
+    def run_concurrently(self, engine):
+        real_do = single_flight.do
+
+        def do(key, fn):
+            self.entered.release()
+            return real_do(key, fn)
+
+        def slow_engine(*args, **kwargs):
+            self.solves += 1
+            self.release.wait(5)
+            return engine(*args, **kwargs)
+
+        with mock.patch.object(single_flight, 'do', side_effect=do), \
+                mock.patch.object(views, 'get_engine', side_effect=slow_engine):
+            threads = [threading.Thread(target=self.call) for _ in range(self.followers + 1)]
+            for thread in threads:
+                thread.start()
+            for _ in threads:
+                self.entered.acquire(timeout=5)
+            # Everyone is inside do(); give the followers time to start waiting
+            time.sleep(0.1)
+            self.release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(self.solves, 1)
+        self.assertEqual(len(self.outcomes), self.followers + 1)
+
+    def test_followers_share_the_leaders_result(self):
+        self.run_concurrently(views.get_engine)
+        headers = sorted(headers['X-Result-Cache'] for _, _, headers in self.outcomes)
+        self.assertEqual(headers, ['miss'] + ['shared'] * self.followers)
+        self.assertEqual(len({data['max_flow'] for data, _, _ in self.outcomes}), 1)
+
+    def test_leaders_exception_reaches_followers(self):
+        def broken(*args, **kwargs):
+            raise RuntimeError('solver crashed')
+        self.run_concurrently(broken)
+        self.assertTrue(all(isinstance(outcome, RuntimeError) for outcome in self.outcomes))
+
+
+@override_settings(COMPUTE_MAX_CONCURRENT=1, COMPUTE_QUEUE_TIMEOUT_SECONDS=0.2, COMPUTE_RETRY_AFTER_SECONDS=7)
+class ComputeLimiterTests(ApiTestCase):
+    def flow(self, **options):
+        return self.client.post('/api/calculate-flow/', {'source': 'Dhaka', 'sink': 'Feni', **options}, format='json')
+
+    def test_busy_slots_answer_503_but_cache_hits_still_work(self):
+        self.upload(ROUTES)
+        self.assertEqual(self.flow()['X-Result-Cache'], 'miss')
+
+        limiter = get_compute_limiter()
+        limiter.acquire()
+        try:
+            self.assertEqual(self.flow()['X-Result-Cache'], 'memory')
+            started = time.monotonic()
+            response = self.flow(include_cut=True)
+            waited = time.monotonic() - started
+        finally:
+            limiter.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertGreaterEqual(waited, 0.2)
+        self.assertEqual(self.flow(include_cut=True).status_code, 200)
+
+    def test_streaming_holds_slot_until_closed(self):
+        limiter = concurrency.ComputeLimiter(1, 0, 1)
+        content = limiter.streaming(iter(['a', 'b']))
+        with self.assertRaises(ComputeBusy):
+            limiter.acquire()
+        content.close()
+        with limiter.slot():
+            pass
@@ -0,0 +1,45 @@
+import random
+
+from django.test import SimpleTestCase
+
+from ..cut_tree import CutTree
+from ..maxflow import get_engine, gomory_hu_tree
+from ..network import NetworkBuilder
+
+
+class GomoryHuTreeTests(SimpleTestCase):
+    def side_of(self, tree, node, edge):
+        # Nodes left connected to 'node' once the tree edge is removed
+        u, v = (tree.index[name] for name in edge)
+        child = u if tree.parent[u] == v else v
+        below = set()
+        for i in range(len(tree.nodes)):
+            j = i
+            while j != -1 and j != child:
+                j = tree.parent[j]
+            if j == child:
+                below.add(i)
+        return below if tree.index[node] in below else set(range(len(tree.nodes))) - below
+
+    def test_tree_edges_are_minimum_cuts(self):
+        rng = random.Random(11)
+        for _ in range(5):
+            builder = NetworkBuilder()
+            for key in range(25):
+                u, v = rng.sample(range(9), 2)
+                builder.add_edge(f"n{u}", f"n{v}", rng.randint(1, 20), undirected=True, key=key)
+            network = builder.build()
+            tree = CutTree(1, network.names, *gomory_hu_tree(network))
+            for source in network.names:
+                for sink in network.names:
+                    if source == sink:
+                        continue
+                    value, edge = tree.max_flow(source, sink)
+                    self.assertEqual(value, get_engine('dinic', network).mflow(source, sink))
+                    side = self.side_of(tree, source, edge)
+                    self.assertNotIn(network.index[sink], side)
+                    crossing = sum(
+                        network.edge_cap[e] for e in range(network.edge_count)
+                        if (network.edge_tail[e] in side) != (network.edge_head[e] in side)
+                    )
+                    self.assertEqual(crossing, value)
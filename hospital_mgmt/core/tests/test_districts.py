@@ -0,0 +1,69 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+from ..models import District, TransportFlow
+from .base import ApiTestCase
+
+
+class DistrictTests(ApiTestCase):
+    def test_blank_district_names_are_rejected(self):
+        response = self.upload("Source,Destination,Capacity\n ,Feni,5\nDhaka,,5\nDhaka,Feni,5\n")
+        self.assertEqual(response.data['errors']['count'], 2)
+        self.assertEqual(self.routes(), {('Dhaka', 'Feni'): 5})
+        with self.assertRaises(ValueError):
+            District.intern(['Dhaka', '  '])
+
+    def test_invalid_route_creates_no_district(self):
+        response = self.client.post('/api/flows/', {'A': 'Feni', 'to': 'Sylhet', 'max_capacity': 'many'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(District.objects.exists())
+
+    def test_viewset_creates_and_reuses_districts(self):
+        response = self.client.post('/api/flows/', {'A': ' Feni ', 'to': 'Sylhet', 'max_capacity': 5}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['A'], response.data['to']), ('Feni', 'Sylhet'))
+
+        again = self.client.post('/api/flows/', {'A': 'Feni', 'to': 'Sylhet', 'max_capacity': 5}, format='json')
+        self.assertEqual(again.status_code, 400)
+
+        route = response.data['id']
+        response = self.client.patch(f'/api/flows/{route}/', {'to': 'Comilla'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(TransportFlow.objects.get(id=route).to.name, 'Comilla')
+        self.assertEqual(sorted(District.objects.values_list('name', flat=True)), ['Comilla', 'Feni', 'Sylhet'])
+
+
+class DistrictMigrationTests(TransactionTestCase):
+    before = [('core', '0017_districtregion')]
+    after = [('core', '0018_district')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_merged_and_blank_names_dropped(self):
+        apps = self.migrate(self.before)
+        Route = apps.get_model('core', 'TransportFlow')
+        first = Route.objects.create(A='Dhaka', to='Feni', max_capacity=300)
+        Route.objects.create(A='Dhaka', to='Feni', max_capacity=200)
+        Route.objects.create(A='Feni', to='Sylhet', max_capacity=50)
+        Route.objects.create(A=' ', to='Sylhet', max_capacity=10)
+
+        apps = self.migrate(self.after)
+        Route = apps.get_model('core', 'TransportFlow')
+        District = apps.get_model('core', 'District')
+        self.assertEqual(sorted(District.objects.values_list('name', flat=True)), ['Dhaka', 'Feni', 'Sylhet'])
+        routes = {(r.A.name, r.to.name): (r.id, r.max_capacity) for r in Route.objects.select_related('A', 'to')}
+        self.assertEqual(routes, {('Dhaka', 'Feni'): (first.id, 500), ('Feni', 'Sylhet'): (routes[('Feni', 'Sylhet')][0], 50)})
+
+        apps = self.migrate(self.before)
+        Route = apps.get_model('core', 'TransportFlow')
+        self.assertEqual(
+            sorted(Route.objects.values_list('A', 'to', 'max_capacity')), [('Dhaka', 'Feni', 500), ('Feni', 'Sylhet', 50)]
+        )
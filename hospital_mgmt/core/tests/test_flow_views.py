@@ -0,0 +1,158 @@
+import json
+
+from django.test import override_settings
+
+from ..concurrency import get_compute_limiter
+from ..models import DistrictRegion, supply_max_cap
+from .base import ApiTestCase
+
+ROUTES = (
+    "Source,Destination,Capacity\n"
+    "Dhaka,Comilla,5\nComilla,Feni,4\nDhaka,Feni,3\nFeni,Sylhet,6\nComilla,Sylhet,2\n"
+)
+
+
+class FlowViewTestCase(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload(ROUTES)
+
+    def single(self, source, sink, **options):
+        response = self.client.post(
+            '/api/calculate-flow/', {'source': source, 'sink': sink, **options}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+
+class FlowFormatTests(FlowViewTestCase):
+    def test_compact_rows_match_nested_details(self):
+        options = {'include_paths': True, 'incremental': False}
+        nested = self.single('Dhaka', 'Sylhet', **options)
+        compact = self.single('Dhaka', 'Sylhet', format='compact', **options)
+        self.assertEqual(compact['max_flow'], nested['max_flow'])
+        self.assertEqual(compact['format'], 'compact')
+
+        table = compact['details']
+        names = table['nodes']
+        self.assertEqual(len(set(names)), len(names))
+        rows = {(names[u], names[v]): amount for u, v, amount in table['edges']}
+        self.assertEqual(rows, {(u, v): amount for u, vs in nested['details'].items() for v, amount in vs.items()})
+        self.assertEqual(
+            [(amount, [names[u] for u in path]) for amount, path in table['paths']],
+            [(p['amount'], p['path']) for p in nested['paths']]
+        )
+        self.assertEqual(sum(p['amount'] for p in nested['paths']), nested['max_flow'])
+
+
+@override_settings(FLOW_BATCH_MAX_WORKERS=2)
+class BatchFlowTests(FlowViewTestCase):
+    pairs = [
+        {'source': 'Dhaka', 'sink': 'Sylhet'},
+        {'source': 'Comilla', 'sink': 'Sylhet'},
+        {'source': 'Dhaka', 'sink': 'Nowhere'},
+        {'source': 'Feni', 'sink': 'Dhaka'},
+    ]
+
+    def batch(self, pairs):
+        return self.client.post('/api/calculate-flow/batch/', {'pairs': pairs}, format='json')
+
+    def test_each_pair_matches_single_solve(self):
+        response = self.batch(self.pairs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['workers'], 2)
+        results = response.data['results']
+        self.assertEqual(len(results), len(self.pairs))
+        self.assertEqual(results[2], {'source': 'Dhaka', 'sink': 'Nowhere', 'error': "District 'Nowhere' not found."})
+        for pair, result in zip(self.pairs, results):
+            if 'error' not in result:
+                single = self.single(pair['source'], pair['sink'])
+                self.assertEqual((result['source'], result['sink']), (pair['source'], pair['sink']))
+                self.assertEqual(result['max_flow'], single['max_flow'])
+                self.assertEqual(result['details'], single['details'])
+
+    @override_settings(FLOW_BATCH_MAX_PAIRS=3)
+    def test_too_many_pairs_are_rejected(self):
+        response = self.batch(self.pairs)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('At most 3 pairs', str(response.data))
+
+    @override_settings(COMPUTE_MAX_CONCURRENT=2)
+    def test_workers_capped_at_free_compute_slots(self):
+        limiter = get_compute_limiter()
+        limiter.acquire()
+        try:
+            response = self.batch(self.pairs)
+        finally:
+            limiter.release()
+        self.assertEqual(response.data['workers'], 1)
+        # Every slot the batch took was given back
+        with limiter.slots(2) as taken:
+            self.assertEqual(taken, 2)
+
+
+class MultiTerminalFlowTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload(
+            "Source,Destination,Capacity\n"
+            "Dhaka,Hub,10\nChittagong,Hub,10\nHub,Sylhet,10\nHub,Barisal,10\n"
+        )
+
+    def test_limits_and_saved_capacities(self):
+        response = self.client.post('/api/calculate-flow/multi/', {
+            'sources': [{'name': 'Dhaka', 'limit': 4}, {'name': 'Chittagong'}],
+            'sinks': [{'name': 'Sylhet', 'limit': 6}, {'name': 'Barisal'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['max_flow'], 14)
+        self.assertEqual(response.data['sources'], {'Dhaka': 4, 'Chittagong': 10})
+        sinks = response.data['sinks']
+        self.assertEqual(sum(sinks.values()), 14)
+        self.assertLessEqual(sinks['Sylhet'], 6)
+        self.assertEqual(
+            sorted(supply_max_cap.objects.values_list('A__name', 'to__name', 'capacity')),
+            [('Chittagong', 'Hub', 10), ('Dhaka', 'Hub', 4)]
+        )
+
+
+class HierarchicalFlowTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload(
+            "Source,Destination,Capacity\n"
+            "Dhaka,Gazipur,1\nGazipur,Sylhet,10\nMoulvibazar,Sylhet,5\nDhaka,Moulvibazar,2\n"
+        )
+        DistrictRegion.objects.bulk_create([
+            DistrictRegion(district='Dhaka', region='Dhaka Division'),
+            DistrictRegion(district='Gazipur', region='Dhaka Division'),
+            DistrictRegion(district='Sylhet', region='Sylhet Division'),
+            DistrictRegion(district='Moulvibazar', region='Sylhet Division'),
+        ])
+
+    def stages(self, **data):
+        response = self.client.post(
+            '/api/calculate-flow/hierarchical/', {'source': 'Dhaka', 'sink': 'Sylhet', **data}, format='json'
+        )
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        stages = [json.loads(line) for line in lines]
+        self.assertEqual([stage['stage'] for stage in stages], ['coarse', 'refined'])
+        return stages
+
+    def test_coarse_bound_then_exact_flow(self):
+        coarse, refined = self.stages()
+        plain = self.client.post(
+            '/api/calculate-flow/', {'source': 'Dhaka', 'sink': 'Sylhet'}, format='json'
+        ).data['max_flow']
+        self.assertEqual((coarse['source_region'], coarse['sink_region']), ('Dhaka Division', 'Sylhet Division'))
+        self.assertEqual(coarse['upper_bound'], 12)
+        self.assertEqual(refined['max_flow'], plain)
+        self.assertEqual(plain, 3)
+        self.assertLessEqual(refined['lower_bound'], refined['max_flow'])
+
+    def test_request_regions_override_table(self):
+        coarse, refined = self.stages(regions={'Gazipur': 'Gazipur'})
+        self.assertEqual(coarse['regions'], 3)
+        self.assertEqual(coarse['upper_bound'], 3)
+        self.assertEqual(refined['max_flow'], 3)
@@ -0,0 +1,62 @@
+import random
+
+from django.test import SimpleTestCase
+
+from .. import incremental
+from ..incremental import incremental_max_flow
+from ..maxflow import get_engine
+from ..network import NetworkBuilder
+from .base import FlowTestMixin, random_network
+
+
+class IncrementalFlowTests(FlowTestMixin, SimpleTestCase):
+    def setUp(self):
+        incremental._states.clear()
+
+    def test_warm_start_after_capacity_edits(self):
+        rng = random.Random(8)
+        for _ in range(15):
+            incremental._states.clear()
+            network = random_network(rng, 10, 25)
+            source, sink = network.names[0], network.names[-1]
+            incremental_max_flow(1, network, source, sink, 'dinic')
+
+            changes = {e: rng.randint(0, 25) for e in rng.sample(range(network.edge_count), 6)}
+            edited = network.with_capacities(changes)
+            mf, value, stats = incremental_max_flow(2, edited, source, sink, 'dinic')
+            self.assertEqual(stats['mode'], 'warm')
+            self.assertEqual(value, get_engine('dinic', edited).mflow(source, sink))
+            self.assertValidFlow(edited, mf.flow, 0, edited.node_count - 1, value)
+
+            _, again, stats = incremental_max_flow(2, edited, source, sink, 'dinic')
+            self.assertEqual((again, stats['mode']), (value, 'cached'))
+
+    def test_removed_routes(self):
+        edges = [('s', 'a', 5), ('a', 't', 5), ('s', 'b', 3), ('b', 't', 3), ('s', 'c', 4)]
+
+        def build(skip):
+            builder = NetworkBuilder()
+            for key, (u, v, c) in enumerate(edges):
+                if key != skip:
+                    builder.add_edge(u, v, c, undirected=True, key=key)
+            return builder.build()
+
+        incremental_max_flow(1, build(None), 's', 't', 'dinic')
+        self.assertNotIn('network', incremental._states[('s', 't', 'dinic')])
+        # s-c carries nothing, so the stored flow still fits
+        _, value, stats = incremental_max_flow(2, build(4), 's', 't', 'dinic')
+        self.assertEqual((value, stats['mode']), (8, 'warm'))
+        _, value, stats = incremental_max_flow(3, build(2), 's', 't', 'dinic')
+        self.assertEqual((value, stats['mode']), (5, 'cold'))
+
+    def test_same_version_of_another_network_is_solved(self):
+        def build(via, capacity):
+            builder = NetworkBuilder()
+            builder.add_edge('s', via, capacity, undirected=True, key=0)
+            builder.add_edge(via, 't', capacity, undirected=True, key=1)
+            return builder.build()
+
+        incremental_max_flow(1, build('a', 5), 's', 't', 'dinic')
+        # A restarted version counter can repeat a version for other routes
+        _, value, stats = incremental_max_flow(1, build('b', 3), 's', 't', 'dinic')
+        self.assertEqual((value, stats['mode']), (3, 'cold'))
@@ -0,0 +1,54 @@
+from unittest import mock
+
+from django.core.files.base import File
+from django.test import override_settings
+
+from ..models import TransportFlow
+from .base import ApiTestCase
+
+
+class RouteUploadTests(ApiTestCase):
+    def test_replace_upload_sums_parallel_routes(self):
+        self.upload("Source,Destination,Capacity\nDhaka,Comilla,500\nDhaka,Comilla,100\nbad,row\n")
+        self.assertEqual(self.routes(), {('Dhaka', 'Comilla'): 600})
+
+    # Saved to a temporary file, so chunks() honours the chunk size
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_small_chunks(self):
+        # BOM, multi-byte characters, CRLF / CR / LF endings, and a line
+        # separator that must not end a line
+        text = (
+            "\ufeffSource,Destination,Capacity\r\n"
+            "ঢাকা,Cox’s Bazar,5\r\n"
+            "Cox’s Bazar,Rangpur\u2028Sadar,7\r\n"
+            "bad,row\r\n"
+            "\r\n"
+            "Rangpur\u2028Sadar,ঢাকা,3\r"
+            "Feni,Sylhet,x\n"
+        )
+        for chunk_size in (1, 2, 3, 5, 64):
+            with mock.patch.object(File, 'DEFAULT_CHUNK_SIZE', chunk_size):
+                response = self.upload(text)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(self.routes(), {
+                ('ঢাকা', 'Cox’s Bazar'): 5,
+                ('Cox’s Bazar', 'Rangpur\u2028Sadar'): 7,
+                ('Rangpur\u2028Sadar', 'ঢাকা'): 3,
+            })
+            self.assertEqual([row['row'] for row in response.data['errors']['rows']], [4, 7])
+
+    def test_diff_upload_counts(self):
+        response = self.upload("Source,Destination,Capacity\nDhaka,Comilla,500\nDhaka,Feni,300\nComilla,Feni,100\n")
+        self.assertEqual(response.status_code, 201)
+        kept = TransportFlow.objects.get(A__name='Dhaka', to__name='Comilla').id
+
+        response = self.upload(
+            "Source,Destination,Capacity\nDhaka,Comilla,450\nComilla,Feni,100\nFeni,Sylhet,50\nFeni,Sylhet,25\n",
+            mode='diff'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['changes'], {'created': 1, 'updated': 1, 'deleted': 1, 'unchanged': 1})
+        self.assertEqual(
+            self.routes(), {('Dhaka', 'Comilla'): 450, ('Comilla', 'Feni'): 100, ('Feni', 'Sylhet'): 75}
+        )
+        self.assertEqual(TransportFlow.objects.get(A__name='Dhaka', to__name='Comilla').id, kept)
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+
+from .. import jobs
+from ..jobs import JobPool, get_job_pool
+from ..models import PlanningJob, Resource
+from .base import ApiTestCase
+
+
+class PlanningJobTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload("Source,Destination,Capacity\nDhaka,Comilla,5\nComilla,Feni,5\nDhaka,Feni,2\n")
+        Resource.objects.create(name='Oxygen', volume=2, priority_score=10, quantity=3)
+        # Jobs are run in the test thread (see run_job()), never on pool threads
+        self.pool = JobPool(1, heartbeat_seconds=3600)
+        patcher = mock.patch.object(jobs, '_pool', self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.pool._executor.shutdown)
+        self.statuses = []
+
+    def enqueue(self, **data):
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.client.post('/api/jobs/', {'kind': 'plan', **data}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Location'], f"/api/jobs/{response.data['id']}/")
+        self.assertEqual(response.data['status'], PlanningJob.QUEUED)
+        return response.data['id']
+
+    def run_job(self, job_id):
+        real = jobs.JOB_RUNNERS['plan']
+
+        def observed(params, report):
+            self.statuses.append(PlanningJob.objects.get(id=job_id).status)
+            return real(params, report)
+
+        # _run closes its thread's connection, which here is the test's
+        with mock.patch.dict(jobs.JOB_RUNNERS, {'plan': observed}), mock.patch.object(jobs, 'connection'):
+            self.pool._run(job_id)
+        return self.client.get(f'/api/jobs/{job_id}/').data
+
+    def test_job_runs_to_a_result(self):
+        job_id = self.enqueue(source='Dhaka', sink='Feni')
+        job = self.run_job(job_id)
+        self.assertEqual(self.statuses, [PlanningJob.RUNNING])
+        self.assertEqual((job['status'], job['progress'], job['stage']), (PlanningJob.SUCCEEDED, 1.0, 'done'))
+        self.assertEqual(job['result']['flow']['max_flow'], 7)
+        self.assertEqual(set(job['result']['allocations']), {'Dhaka→Comilla', 'Dhaka→Feni'})
+
+    def test_failure_stores_the_error(self):
+        job_id = self.enqueue(source='Dhaka', sink='Nowhere')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            job = self.run_job(job_id)
+        self.assertEqual(job['status'], PlanningJob.FAILED)
+        self.assertEqual(job['error'], "ValueError: District 'Nowhere' not found.")
+
+    def test_a_claimed_job_is_not_run_again(self):
+        job_id = self.enqueue(source='Dhaka', sink='Feni')
+        self.run_job(job_id)
+        self.run_job(job_id)
+        self.assertEqual(len(self.statuses), 1)
+
+        other = self.enqueue(source='Dhaka', sink='Comilla')
+        PlanningJob.objects.filter(id=other).update(status=PlanningJob.RUNNING, worker='another process')
+        job = self.run_job(other)
+        self.assertEqual(len(self.statuses), 1)
+        self.assertEqual(job['status'], PlanningJob.RUNNING)
+
+
+@override_settings(JOB_STALE_SECONDS=60)
+class JobPoolStartTests(ApiTestCase):
+    def test_stale_jobs_are_requeued(self):
+        now = timezone.now()
+        stale = PlanningJob.objects.create(status=PlanningJob.RUNNING, heartbeat_at=now - timedelta(seconds=120))
+        alive = PlanningJob.objects.create(status=PlanningJob.RUNNING, heartbeat_at=now)
+        queued = PlanningJob.objects.create()
+
+        with mock.patch.object(jobs, '_pool', None), mock.patch.object(JobPool, 'submit') as submit:
+            pool = get_job_pool()
+            pool._executor.shutdown()
+        self.assertEqual([call.args[0] for call in submit.call_args_list], [stale.id, queued.id])
+        stale.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual((stale.status, stale.stage), (PlanningJob.QUEUED, 'requeued'))
+        self.assertEqual(alive.status, PlanningJob.RUNNING)
@@ -0,0 +1,75 @@
+import random
+
+from django.test import SimpleTestCase
+
+from ..knapsack import allocate_multi_knapsack, np, solve_approx_knapsack, solve_bounded_knapsack
+from .base import KnapsackTestMixin, brute_force_knapsack, make_resources
+
+
+class BoundedKnapsackTests(KnapsackTestMixin, SimpleTestCase):
+    def check(self, **options):
+        rng = random.Random(1)
+        for _ in range(25):
+            resources = make_resources(rng, rng.randint(1, 5))
+            capacity = rng.randint(0, 30)
+            allocation, value = solve_bounded_knapsack(resources, capacity, **options)
+            self.assertEqual(value, brute_force_knapsack(resources, capacity))
+            self.assertFeasible(resources, allocation, capacity, value)
+
+    def test_table_matches_brute_force(self):
+        self.check(reconstruction='table')
+
+    def test_hirschberg_matches_brute_force(self):
+        self.check(reconstruction='hirschberg', memory_cap=0)
+
+    def test_auto_switches_to_hirschberg_under_memory_cap(self):
+        self.check(reconstruction='auto', memory_cap=16)
+
+    def test_numpy_matches_brute_force(self):
+        if np is None:
+            self.skipTest("NumPy is not installed")
+        self.check(backend='numpy')
+        self.check(backend='numpy', reconstruction='hirschberg', memory_cap=0)
+
+    def test_explicit_quantities_override_resource_quantity(self):
+        resources = make_resources(random.Random(2), 3)
+        allocation, _ = solve_bounded_knapsack(resources, 100, quantities=[1, 0, 1])
+        self.assertEqual({id(r): c for r, c in allocation}, {id(resources[0]): 1, id(resources[2]): 1})
+
+
+class ApproxKnapsackTests(KnapsackTestMixin, SimpleTestCase):
+    def test_fptas_bound(self):
+        rng = random.Random(3)
+        for epsilon in (0.5, 0.2, 0.05):
+            for _ in range(15):
+                resources = make_resources(rng, rng.randint(1, 5))
+                capacity = rng.randint(1, 30)
+                optimum = brute_force_knapsack(resources, capacity)
+                result = solve_approx_knapsack(resources, capacity, epsilon=epsilon)
+                self.assertTrue(result['complete'])
+                self.assertFeasible(resources, result['allocation'], capacity, result['total_value'])
+                self.assertGreaterEqual(result['total_value'], (1 - epsilon) * optimum)
+                self.assertGreaterEqual(result['upper_bound'] + 1e-9, optimum)
+
+    def test_expired_deadline_keeps_greedy_answer(self):
+        resources = make_resources(random.Random(4), 5)
+        result = solve_approx_knapsack(resources, 25, epsilon=0.01, deadline=0)
+        self.assertFeasible(resources, result['allocation'], 25, result['total_value'])
+        self.assertGreaterEqual(result['upper_bound'], result['total_value'])
+
+
+class MultiKnapsackTests(SimpleTestCase):
+    def test_destinations_share_one_inventory(self):
+        rng = random.Random(5)
+        for strategy in ('heuristic', 'exact'):
+            resources = make_resources(rng, 4)
+            plan = allocate_multi_knapsack(resources, [('a', 12), ('b', 7)], strategy=strategy)
+            used = {}
+            for key, capacity in (('a', 12), ('b', 7)):
+                selected = plan['allocations'][key]
+                self.assertLessEqual(sum(r.volume * c for r, c in selected), capacity)
+                for r, c in selected:
+                    used[id(r)] = used.get(id(r), 0) + c
+            for r in resources:
+                self.assertLessEqual(used.get(id(r), 0), r.quantity)
+            self.assertLessEqual(plan['total_value'], brute_force_knapsack(resources, 19))
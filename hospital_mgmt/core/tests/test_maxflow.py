@@ -0,0 +1,92 @@
+import random
+
+from django.test import SimpleTestCase
+
+from ..maxflow import ENGINES, decompose_paths, get_engine, min_cut
+from ..network import NetworkBuilder
+from .base import FlowTestMixin, random_network
+
+
+class MaxFlowEngineTests(FlowTestMixin, SimpleTestCase):
+    def test_engines_agree(self):
+        rng = random.Random(6)
+        for _ in range(20):
+            network = random_network(rng, rng.randint(2, 12), rng.randint(1, 30))
+            s, t = 0, network.node_count - 1
+            values = set()
+            for name in ENGINES:
+                mf = get_engine(name, network)
+                value = mf.mflow(network.names[s], network.names[t])
+                self.assertValidFlow(network, mf.flow, s, t, value)
+                values.add(value)
+            self.assertEqual(len(values), 1)
+
+    def test_min_cut_equals_flow(self):
+        rng = random.Random(12)
+        for _ in range(20):
+            network = random_network(rng, rng.randint(2, 12), rng.randint(1, 30))
+            mf = get_engine('dinic', network)
+            value = mf.mflow(network.names[0], network.names[-1])
+            cut = min_cut(network, mf.flow, 0)
+            self.assertEqual(sum(network.edge_cap[e] for e, _, _ in cut), value)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            get_engine('simplex')
+
+
+class PreprocessTests(FlowTestMixin, SimpleTestCase):
+    def test_expanded_flow_is_valid_and_optimal(self):
+        rng = random.Random(7)
+        for _ in range(20):
+            network = random_network(rng, rng.randint(2, 12), rng.randint(1, 30))
+            s, t = 0, network.node_count - 1
+            expected = get_engine('edmonds_karp', network).mflow(network.names[s], network.names[t])
+            for name in ENGINES:
+                mf = get_engine(name, network, preprocess=True)
+                value = mf.mflow(network.names[s], network.names[t])
+                self.assertEqual(value, expected)
+                self.assertValidFlow(network, mf.flow, s, t, value)
+
+
+class PathDecompositionTests(SimpleTestCase):
+    def test_paths_add_up_to_flow_within_capacity(self):
+        rng = random.Random(13)
+        for _ in range(20):
+            network = random_network(rng, rng.randint(2, 12), rng.randint(1, 30))
+            s, t = 0, network.node_count - 1
+            mf = get_engine('dinic', network)
+            value = mf.mflow(network.names[s], network.names[t])
+            paths = decompose_paths(network, mf.flow, s, t)
+            self.assertEqual(sum(amount for amount, _ in paths), value)
+            self.assertEqual([amount for amount, _ in paths], sorted((amount for amount, _ in paths), reverse=True))
+
+            capacity = {}
+            for u in range(network.node_count):
+                for a in range(network.offsets[u], network.offsets[u + 1]):
+                    capacity[(u, network.head[a])] = capacity.get((u, network.head[a]), 0) + network.cap[a]
+            used = {}
+            for amount, nodes in paths:
+                self.assertGreater(amount, 0)
+                self.assertEqual((nodes[0], nodes[-1]), (s, t))
+                self.assertEqual(len(set(nodes)), len(nodes))
+                for u, v in zip(nodes, nodes[1:]):
+                    used[(u, v)] = used.get((u, v), 0) + amount
+            for pair, amount in used.items():
+                self.assertLessEqual(amount, capacity[pair])
+
+    def test_cycles_are_cancelled(self):
+        builder = NetworkBuilder()
+        for u, v, c in [('s', 'a', 5), ('a', 't', 5), ('a', 'b', 3), ('b', 'c', 3), ('c', 'a', 3)]:
+            builder.add_edge(u, v, c)
+        network = builder.build()
+        flow = network.new_flow()
+        for e, amount in enumerate([5, 5, 3, 3, 3]):
+            a = network.edge_arc[e]
+            flow[a] = amount
+            flow[network.rev[a]] = -amount
+        s, t = network.index['s'], network.index['t']
+        paths = decompose_paths(network, flow, s, t)
+        self.assertEqual(paths, [(5, [s, network.index['a'], t])])
+        # The caller's flow is left as it was
+        self.assertEqual(flow[network.edge_arc[2]], 3)
@@ -0,0 +1,59 @@
+from django.contrib import admin
+from django.test import RequestFactory
+
+from ..models import DatasetVersion, District, TransportFlow
+from ..network_cache import NETWORK, get_network
+from .base import ApiTestCase
+
+
+class NetworkInvalidationTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload("Source,Destination,Capacity\nDhaka,Comilla,5\nComilla,Feni,5\n")
+
+    def assertRebuilt(self, change):
+        version, network = get_network()
+        change()
+        self.assertNotEqual(DatasetVersion.current(NETWORK), version)
+        _, rebuilt = get_network()
+        self.assertIsNot(rebuilt, network)
+        return rebuilt
+
+    def test_unchanged_network_is_reused(self):
+        _, network = get_network()
+        self.assertIs(get_network()[1], network)
+
+    def test_viewset_writes(self):
+        def create():
+            response = self.client.post('/api/flows/', {'A': 'Feni', 'to': 'Sylhet', 'max_capacity': 7}, format='json')
+            self.assertEqual(response.status_code, 201)
+        network = self.assertRebuilt(create)
+        self.assertIn('Sylhet', network.index)
+
+        route = TransportFlow.objects.get(A__name='Feni', to__name='Sylhet')
+
+        def update():
+            response = self.client.patch(f'/api/flows/{route.id}/', {'max_capacity': 9}, format='json')
+            self.assertEqual(response.status_code, 200)
+        network = self.assertRebuilt(update)
+        self.assertEqual(network.edge_cap[list(network.edge_key).index(route.id)], 9)
+
+        def delete():
+            self.assertEqual(self.client.delete(f'/api/flows/{route.id}/').status_code, 204)
+        network = self.assertRebuilt(delete)
+        self.assertNotIn(route.id, network.edge_key)
+
+    def test_district_rename(self):
+        district = District.objects.get(name='Feni')
+        district.name = 'Feni Sadar'
+        network = self.assertRebuilt(district.save)
+        self.assertIn('Feni Sadar', network.index)
+        self.assertNotIn('Feni', network.index)
+
+    def test_admin_deletes(self):
+        model_admin = admin.site._registry[TransportFlow]
+        request = RequestFactory().post('/admin/core/transportflow/')
+        network = self.assertRebuilt(lambda: model_admin.delete_model(request, TransportFlow.objects.first()))
+        self.assertEqual(network.edge_count, 1)
+        network = self.assertRebuilt(lambda: model_admin.delete_queryset(request, TransportFlow.objects.all()))
+        self.assertEqual(network.edge_count, 0)
@@ -0,0 +1,142 @@
+import json
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from .. import views
+from ..models import District, Resource, supply_max_cap
+from ..progress import ProgressRun
+from .base import ApiTestCase
+
+
+def parse_events(messages):
+    """(event, data) pairs of SSE messages, skipping keepalive comments."""
+    events = []
+    for message in messages:
+        if isinstance(message, bytes):
+            message = message.decode()
+        if message.startswith(':'):
+            continue
+        fields = dict(line.split(': ', 1) for line in message.strip().splitlines())
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class ProgressRunTests(SimpleTestCase):
+    def test_failed_solve_is_sent_as_event(self):
+        run = ProgressRun(keepalive=5)
+
+        def solve(run):
+            raise ValueError("no route")
+
+        with self.assertLogs('core.progress', 'ERROR'):
+            run.start(solve)
+            events = parse_events(run.stream({}))
+        self.assertEqual([event for event, _ in events], ['start', 'failed'])
+        self.assertEqual(events[1][1], {'error': "ValueError: no route"})
+
+    async def test_async_stream_receives_events_from_solver_thread(self):
+        run = ProgressRun(interval=0, keepalive=5)
+
+        def solve(run):
+            for rows in range(1, 4):
+                run.report(rows=rows)
+            return {'rows': 3}
+
+        run.start(solve)
+        events = parse_events([message async for message in run.astream({'run_id': run.id})])
+        self.assertEqual([event for event, _ in events], ['start', 'progress', 'progress', 'progress', 'result'])
+        self.assertEqual(events[-1][1], {'rows': 3})
+
+    async def test_async_stream_sends_keepalives_while_waiting(self):
+        run = ProgressRun(keepalive=0.01)
+        release = threading.Event()
+
+        def solve(run):
+            release.wait(5)
+            return {}
+
+        run.start(solve)
+        messages = []
+        async for message in run.astream({}):
+            messages.append(message)
+            if message.startswith(':'):
+                release.set()
+        self.assertIn(": keepalive\n\n", messages)
+        self.assertEqual([event for event, _ in parse_events(messages)], ['start', 'result'])
+
+
+@override_settings(PROGRESS_EVENT_INTERVAL_SECONDS=0)
+class KnapsackStreamTests(ApiTestCase):
+    url = '/api/calculate-knapsack/stream/'
+
+    def setUp(self):
+        super().setUp()
+        ids = District.intern(['Dhaka', 'Feni', 'Comilla'])
+        for source in ('Dhaka', 'Feni'):
+            supply_max_cap.objects.create(A_id=ids[source], to_id=ids['Comilla'], capacity=100)
+        Resource.objects.create(name='Oxygen', volume=40, priority_score=50, quantity=3)
+        Resource.objects.create(name='Saline', volume=25, priority_score=20, quantity=4)
+
+    def stream(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response
+
+    def stopped_stream(self, **stop):
+        """Stream whose solve only starts once the stop URL was posted."""
+        posted = threading.Event()
+        allocate = views.allocate_multi_knapsack
+
+        def gated(*args, **kwargs):
+            posted.wait(5)
+            return allocate(*args, **kwargs)
+
+        with mock.patch.object(views, 'allocate_multi_knapsack', side_effect=gated):
+            messages = iter(self.stream().streaming_content)
+            (_, start), = parse_events([next(messages)])
+            stopping = self.client.post(start['stop_url'], stop, format='json')
+            posted.set()
+            self.assertEqual(stopping.status_code, 202)
+            return parse_events(messages)
+
+    def test_progress_then_result(self):
+        events = parse_events(self.stream().streaming_content)
+        names = [event for event, _ in events]
+        self.assertEqual((names[0], names[-1]), ('start', 'result'))
+        self.assertIn('progress', names)
+        self.assertEqual(set(names[1:-1]), {'progress'})
+
+        start, result = events[0][1], events[-1][1]
+        self.assertEqual(start['destinations'], 2)
+        self.assertEqual(start['stop_url'], f"/api/runs/{start['run_id']}/stop/")
+        self.assertTrue(result['summary']['complete'])
+        self.assertEqual(set(result['allocations']), {'Dhaka→Comilla', 'Feni→Comilla'})
+
+    async def test_asgi_stream(self):
+        response = await self.async_client.get(self.url)
+        events = parse_events([message async for message in response.streaming_content])
+        self.assertEqual((events[0][0], events[-1][0]), ('start', 'result'))
+        self.assertTrue(events[-1][1]['summary']['complete'])
+
+    def test_stream_reuses_cached_result(self):
+        first = parse_events(self.stream().streaming_content)
+        again = self.stream()
+        self.assertEqual(again['X-Result-Cache'], 'memory')
+        self.assertEqual(parse_events([again.content]), [first[-1]])
+
+    def test_accepting_stop_sends_incomplete_result(self):
+        events = self.stopped_stream()
+        self.assertEqual(events[-1][0], 'result')
+        self.assertFalse(events[-1][1]['summary']['complete'])
+        # An incomplete plan is not cached
+        self.assertEqual(parse_events(self.stream().streaming_content)[0][0], 'start')
+
+    def test_discarding_cancels(self):
+        events = self.stopped_stream(discard=True)
+        self.assertEqual([event for event, _ in events], ['cancelled'])
+
+    def test_stop_of_unknown_run(self):
+        response = self.client.post('/api/runs/nope/stop/', {}, format='json')
+        self.assertEqual(response.status_code, 404)
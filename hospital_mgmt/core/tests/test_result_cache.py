@@ -0,0 +1,70 @@
+import json
+import os
+import pickle
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..models import District, Resource, supply_max_cap
+from ..result_cache import ResultCache
+from .base import ApiTestCase
+
+
+class ResultCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'results.sqlite3')
+
+    def test_disk_tier_stores_json(self):
+        value = {'max_flow': 7, 'min_cut': [(1, 'Dhaka', 'Feni')], 'by_id': {3: 'x'}}
+        ResultCache(1 << 20, self.path).put('flow', {'network': 2}, {'source': 'Dhaka'}, value)
+
+        with sqlite3.connect(self.path) as connection:
+            (blob,), = connection.execute("SELECT value FROM result_cache").fetchall()
+        expected = {'max_flow': 7, 'min_cut': [[1, 'Dhaka', 'Feni']], 'by_id': {'3': 'x'}}
+        self.assertEqual(json.loads(blob), expected)
+
+        # A new process only has the disk tier
+        cached, tier = ResultCache(1 << 20, self.path).get('flow', {'network': 2}, {'source': 'Dhaka'})
+        self.assertEqual((cached, tier), (expected, 'disk'))
+
+    def test_pickled_rows_are_misses(self):
+        cache = ResultCache(1 << 20, self.path)
+        cache.put('flow', {'network': 2}, {}, {'max_flow': 1})
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("UPDATE result_cache SET value = ?", (pickle.dumps({'max_flow': 1}),))
+        self.assertEqual(ResultCache(1 << 20, self.path).get('flow', {'network': 2}, {}), (None, None))
+
+    def test_memory_tier_is_bounded(self):
+        cache = ResultCache(40)
+        cache.put('flow', {}, {'n': 1}, {'value': 'a' * 10})
+        cache.put('flow', {}, {'n': 2}, {'value': 'b' * 10})
+        self.assertEqual(cache.get('flow', {}, {'n': 1}), (None, None))
+        self.assertEqual(cache.get('flow', {}, {'n': 2}), ({'value': 'b' * 10}, 'memory'))
+
+
+class CachedResultTests(ApiTestCase):
+    def test_cached_flow_has_no_solver_stats(self):
+        self.upload("Source,Destination,Capacity\nDhaka,Comilla,5\nComilla,Feni,5\n")
+        first = self.client.post('/api/calculate-flow/', {'source': 'Dhaka', 'sink': 'Feni'}, format='json')
+        again = self.client.post('/api/calculate-flow/', {'source': 'Dhaka', 'sink': 'Feni'}, format='json')
+        self.assertEqual((first['X-Result-Cache'], first.data['cached']), ('miss', False))
+        self.assertEqual((again['X-Result-Cache'], again.data['cached']), ('memory', True))
+        self.assertIsNone(again.data['incremental'])
+        self.assertEqual(again.data['max_flow'], first.data['max_flow'])
+
+    def test_incomplete_knapsack_is_not_cached(self):
+        ids = District.intern(['Dhaka', 'Comilla'])
+        supply_max_cap.objects.create(A_id=ids['Dhaka'], to_id=ids['Comilla'], capacity=100)
+        Resource.objects.create(name='Oxygen', volume=7, priority_score=50, quantity=20)
+        url = '/api/calculate-knapsack/?include_summary=true&mode=approx&epsilon=0.01'
+        with mock.patch('core.knapsack._fptas_pass', return_value=None):
+            partial = self.client.get(url)
+        self.assertFalse(partial.data['summary']['complete'])
+        full = self.client.get(url)
+        self.assertEqual(full['X-Result-Cache'], 'miss')
+        self.assertTrue(full.data['summary']['complete'])
+        self.assertEqual(self.client.get(url)['X-Result-Cache'], 'memory')
@@ -0,0 +1,72 @@
+import random
+
+from django.test import SimpleTestCase, override_settings
+
+from ..maxflow import get_engine
+from ..models import TransportFlow
+from ..scenarios import count_removals, generate_removals, run_scenarios
+from .base import ApiTestCase, random_network
+
+
+class ScenarioTests(SimpleTestCase):
+    def test_removal_count_matches_generated_list(self):
+        rng = random.Random(9)
+        for _ in range(10):
+            network = random_network(rng, 8, 20)
+            mf = get_engine('dinic', network)
+            mf.mflow(network.names[0], network.names[-1])
+            for size in (1, 2):
+                self.assertEqual(count_removals(network, mf.flow, size), len(generate_removals(network, mf.flow, size)))
+
+    def test_scenarios_match_fresh_solves(self):
+        network = random_network(random.Random(10), 8, 20)
+        source, sink = network.names[0], network.names[-1]
+        scenarios = [(str(e), {e: 0}) for e in range(network.edge_count)]
+        baseline, results, _ = run_scenarios(network, source, sink, scenarios, 'dinic', max_workers=1)
+        self.assertEqual(baseline, get_engine('dinic', network).mflow(source, sink))
+        for result in results:
+            edited = network.with_capacities({int(result['name']): 0})
+            self.assertEqual(result['max_flow'], get_engine('dinic', edited).mflow(source, sink))
+        drops = [result['drop'] for result in results]
+        self.assertEqual(drops, sorted(drops, reverse=True))
+
+    def test_given_baseline_matches_own_solve(self):
+        network = random_network(random.Random(10), 8, 20)
+        source, sink = network.names[0], network.names[-1]
+        mf = get_engine('dinic', network)
+        mf.mflow(source, sink)
+        scenarios = [(str(e), {e: 0}) for e in range(network.edge_count)]
+        own = run_scenarios(network, source, sink, scenarios, 'dinic', max_workers=1)
+        given = run_scenarios(network, source, sink, scenarios, 'dinic', max_workers=1, baseline_flow=mf.flow)
+        self.assertEqual(own[0], given[0])
+        self.assertEqual(
+            sorted((r['name'], r['max_flow']) for r in own[1]), sorted((r['name'], r['max_flow']) for r in given[1])
+        )
+
+
+class ScenarioViewTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload("Source,Destination,Capacity\nDhaka,Comilla,5\nComilla,Feni,5\nDhaka,Feni,5\nFeni,Sylhet,5\n")
+
+    def analyse(self, **data):
+        return self.client.post('/api/calculate-flow/scenarios/', {'source': 'Dhaka', 'sink': 'Sylhet', **data}, format='json')
+
+    def test_requested_and_generated_scenarios(self):
+        bridge = TransportFlow.objects.get(A__name='Feni', to__name='Sylhet')
+        response = self.analyse(
+            scenarios=[{'name': 'Bridge halved', 'changes': [{'route_id': bridge.id, 'scale': 0.5}]}],
+            generate='single'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['baseline_max_flow'], 5)
+        results = {r['name']: r['max_flow'] for r in response.data['results']}
+        self.assertEqual(results['Bridge halved'], 2)
+        self.assertEqual(results['cut Feni-Sylhet'], 0)
+        self.assertEqual(response.data['results'][0]['max_flow'], 0)
+
+    @override_settings(FLOW_SCENARIO_MAX=3)
+    def test_generated_scenarios_over_limit_are_rejected(self):
+        response = self.analyse(generate='pair')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 3', response.data['error'])
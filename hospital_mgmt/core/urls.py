@@ -2,7 +2,14 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     SystemStatusView, BatchUploadView, MaxFlowCalculationView, 
-    KnapsackCalculationView, TransportFlowViewSet, ResourceViewSet,ResourceUploadView
+    KnapsackCalculationView, TransportFlowViewSet, ResourceViewSet,ResourceUploadView,
+    CutTreeFlowView, BatchFlowCalculationView, MultiTerminalFlowView,
+    ScenarioAnalysisView, HierarchicalFlowView, PlanningJobListView, PlanningJobDetailView,
+    ProgressStopView, flow_progress_stream, knapsack_progress_stream
+)
+from .async_views import (
+    async_status, async_flow_list, async_flow_detail, async_resource_list, async_resource_detail,
+    async_calculate_flow, async_calculate_knapsack
 )
 
 router = DefaultRouter()
@@ -14,6 +21,23 @@ urlpatterns = [
     path('api/upload/', BatchUploadView.as_view()),
     path('api/upload/resources/', ResourceUploadView.as_view(), name='api_upload_resources'),
     path('api/calculate-flow/', MaxFlowCalculationView.as_view()),
+    path('api/calculate-flow/cut-tree/', CutTreeFlowView.as_view()),
+    path('api/calculate-flow/batch/', BatchFlowCalculationView.as_view()),
+    path('api/calculate-flow/multi/', MultiTerminalFlowView.as_view()),
+    path('api/calculate-flow/scenarios/', ScenarioAnalysisView.as_view()),
+    path('api/calculate-flow/hierarchical/', HierarchicalFlowView.as_view()),
     path('api/calculate-knapsack/', KnapsackCalculationView.as_view()),
+    path('api/calculate-flow/stream/', flow_progress_stream),
+    path('api/calculate-knapsack/stream/', knapsack_progress_stream),
+    path('api/runs/<str:run_id>/stop/', ProgressStopView.as_view()),
+    path('api/jobs/', PlanningJobListView.as_view()),
+    path('api/jobs/<int:job_id>/', PlanningJobDetailView.as_view()),
+    path('api/async/status/', async_status),
+    path('api/async/flows/', async_flow_list),
+    path('api/async/flows/<int:pk>/', async_flow_detail),
+    path('api/async/resources/', async_resource_list),
+    path('api/async/resources/<int:pk>/', async_resource_detail),
+    path('api/async/calculate-flow/', async_calculate_flow),
+    path('api/async/calculate-knapsack/', async_calculate_knapsack),
     path('api/', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,27 +1,92 @@
-from .maxflow import maxflow
-from .knapsack import solve_knapsack
-from .models import (
-    Resource, TransportFlow, supply_max_cap
-)
+from .maxflow import get_engine
+from .network_cache import get_network
+from .result_cache import CAPACITY, bump_capacity_version, bump_inventory_version
+from .knapsack import allocate_multi_knapsack
+from .models import DatasetVersion, District, Resource, supply_max_cap
+from django.conf import settings
 from django.db import transaction
-from django.db.models import F
-from collections import defaultdict
 
-def calculate_single_pair_flow(source_name, sink_name):
+def save_supply_caps(flow_details, sources):
+    """
+    Replaces the 'supply_max_cap' table with the flow leaving each source
+    towards its immediate neighbors, in one transaction and one bulk insert.
+    Leaves the table alone when no source sends anything or the rows would
+    not change (so the capacity version, and cached knapsack results, stay).
+    """
+    flows = [
+        (source, neighbor, amount)
+        for source in sources
+        for neighbor, amount in flow_details.get(source, {}).items()
+        if amount > 0
+    ]
+    if not flows:
+        return []
+    ids = District.intern(name for source, neighbor, _ in flows for name in (source, neighbor))
+    new_caps = [
+        supply_max_cap(A_id=ids[source], to_id=ids[neighbor], capacity=amount)
+        for source, neighbor, amount in flows
+    ]
+    with transaction.atomic():
+        # Concurrent calculations would otherwise interleave their delete
+        # and insert and leave both sets of rows behind
+        DatasetVersion.lock(CAPACITY)
+        current = sorted(supply_max_cap.objects.values_list('A_id', 'to_id', 'capacity'))
+        if current == sorted((cap.A_id, cap.to_id, cap.capacity) for cap in new_caps):
+            return new_caps
+        supply_max_cap.objects.all().delete()
+        supply_max_cap.objects.bulk_create(new_caps)
+        bump_capacity_version()
+    return new_caps
+
+def route_label(node):
+    """
+    "source→destination" of a supply_max_cap row. Several sources can feed
+    the same district, so the destination alone is not unique.
+    """
+    return f"{node.A.name}→{node.to.name}"
+
+def allocation_results(supply_nodes, plan):
+    """
+    { "source→destination": route, capacity, total priority and items }
+    for an allocate_multi_knapsack plan keyed by supply_max_cap id.
+    """
+    results = {}
+    for node in supply_nodes:
+        selected = plan['allocations'][node.id]
+        results[route_label(node)] = {
+            'source': node.A.name,
+            'destination': node.to.name,
+            'capacity': node.capacity,
+            'total_priority': sum(item.priority_score * count for item, count in selected),
+            'items': [
+                {'name': item.name, 'volume': item.volume, 'score': item.priority_score, 'quantity': count}
+                for item, count in selected
+            ]
+        }
+    return results
+
+def allocation_summary(plan, strategy, mode):
+    return {
+        'strategy': strategy,
+        'mode': mode,
+        'complete': plan['complete'],
+        'total_priority': plan['total_value'],
+        'upper_bound': plan['upper_bound'],
+        'gap': plan['gap'],
+        'optimal': plan['optimal'],
+    }
+
+def calculate_single_pair_flow(source_name, sink_name, engine=None):
     """
     STAGE 1:
     Calculates max-flow and saves the flow from the source to its 
     immediate neighbors into the 'supply_max_cap' table.
+    'engine' names a max-flow engine (defaults to settings.MAXFLOW_ENGINE).
     """
-    mf = maxflow()
-    all_routes = TransportFlow.objects.all()
-
-    print("Building undirected graph...")
-    for route in all_routes:
-        mf.add_edge(route.A, route.to, route.max_capacity)
-        mf.add_edge(route.to, route.A, route.max_capacity)
+    _, network = get_network()
+    mf = get_engine(engine or settings.MAXFLOW_ENGINE, network, preprocess=settings.FLOW_PREPROCESS)
     
-    print(f"Graph built. Calculating max-flow from {source_name} to {sink_name}...")
+    print(f"Graph ready. Calculating max-flow from {source_name} to {sink_name}...")
     total_flow = mf.mflow(source_name, sink_name)
     print(f"Calculation complete. Total flow: {total_flow}")
     print(f"Saving immediate flows from source '{source_name}'...")
@@ -29,23 +94,9 @@ def calculate_single_pair_flow(source_name, sink_name):
         assignments = mf.get_flow() 
         
         if source_name in assignments:
-            immediate_flows = assignments[source_name]
-
-            with transaction.atomic():
-                supply_max_cap.objects.all().delete()
-                
-                new_caps = []
-                for neighbor_node, flow_amount in immediate_flows.items():
-                    if flow_amount > 0:
-                        new_caps.append(
-                            supply_max_cap(
-                                name=neighbor_node,
-                                capacity=flow_amount
-                            )
-                        )
-                        print(f"  Saving: {source_name} → {neighbor_node} = {flow_amount} units")
-                
-                supply_max_cap.objects.bulk_create(new_caps)
+            for neighbor_node, flow_amount in assignments[source_name].items():
+                print(f"  Saving: {source_name} → {neighbor_node} = {flow_amount} units")
+            save_supply_caps(assignments, [source_name])
         else:
             print(f"Warning: Source node '{source_name}' not found in flow results.")
             
@@ -57,61 +108,61 @@ def calculate_single_pair_flow(source_name, sink_name):
 def run_supply_optimization():
     """
     STAGE 2:
-    Runs knapsack optimization for *each* flow capacity saved in
-    the 'supply_max_cap' table.
+    Shares the inventory between *all* flow capacities saved in
+    the 'supply_max_cap' table with one multiple-knapsack allocation.
     """
-    print("Running Knapsack optimization for each supply node...")
+    print("Running Knapsack optimization over all supply nodes...")
     
-    node_capacities = list(supply_max_cap.objects.all())
+    node_capacities = list(supply_max_cap.objects.select_related('A', 'to'))
     
     if not node_capacities:
         print("No capacities found in 'supply_max_cap' table. Run flow calculation first.")
         return {}, 0.0
 
     available_resources = list(Resource.objects.filter(
-        route_name__isnull=True, 
+        quantity__gt=0,
         volume__gt=0
     ))
     
-    all_allocated_item_ids = set()
-    
-    items_to_update = []
+    if not available_resources:
+        print("No resources with remaining quantity found.")
+        return {}, 0.0
+
+    plan = allocate_multi_knapsack(
+        available_resources,
+        [(entry.id, entry.capacity) for entry in node_capacities],
+        strategy=settings.KNAPSACK_ALLOCATION_STRATEGY,
+        backend=settings.KNAPSACK_BACKEND,
+        memory_cap=settings.KNAPSACK_MEMORY_CAP_BYTES
+    )
     
+    # Remaining units per resource id
+    remaining = {item.id: item.quantity for item in available_resources}
     selections_summary = {}
-    total_value_all_nodes = 0.0
 
     for entry in node_capacities:
-        node_name = entry.name
-        knapsack_capacity = entry.capacity
+        selected = plan['allocations'][entry.id]
+        selections_summary[route_label(entry)] = selected
         
-        print(f"Running Knapsack for '{node_name}' with capacity: {knapsack_capacity}")
+        for item, count in selected:
+            remaining[item.id] -= count
+            
+        selected_names = ", ".join([f"{item.name} x{count}" for item, count in selected])
+        print(f"  '{route_label(entry)}' (capacity {entry.capacity}) will send: {selected_names}")
 
-        current_available_items = [
-            item for item in available_resources 
-            if item.id not in all_allocated_item_ids
-        ]
-        
-        if not current_available_items:
-            print(f"  No available resources left for '{node_name}'.")
-            continue
+    total_value_all_nodes = plan['total_value']
+    print(f"Total value: {total_value_all_nodes} (upper bound {plan['upper_bound']:.1f}, gap {plan['gap']:.1f})")
 
-        selected_items, total_value = solve_knapsack(knapsack_capacity, current_available_items)
-        
-        selections_summary[node_name] = selected_items
-        total_value_all_nodes += total_value
-        
-        for item in selected_items:
-            all_allocated_item_ids.add(item.id)
-            
-            item.route_name = node_name 
-            item.volume = 0
+    # Allocated units leave the inventory
+    items_to_update = []
+    for item in available_resources:
+        if remaining[item.id] != item.quantity:
+            item.quantity = remaining[item.id]
             items_to_update.append(item)
-            
-        selected_names = ", ".join([item.name for item in selected_items])
-        print(f"  '{node_name}' will send: {selected_names} (Value: {total_value})")
 
     with transaction.atomic():
-        Resource.objects.bulk_update(items_to_update, ['route_name', 'volume'])
+        Resource.objects.bulk_update(items_to_update, ['quantity'])
+        bump_inventory_version()
 
-    print("Optimization complete! Resources have been assigned and volume set to 0.")
-    return selections_summary, total_value_all_nodes
\ No newline at end of file
+    print("Optimization complete! Allocated units have been removed from inventory.")
+    return selections_summary, total_value_all_nodes
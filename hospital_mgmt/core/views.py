@@ -1,6 +1,12 @@
-import csv
-import io
+import json
+import logging
+import os
 import sys
+import time
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework import viewsets
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -8,10 +14,228 @@ from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser
 
 # Ensure these imports match your models.py
-from .models import TransportFlow, supply_max_cap,Resource
-from .serializers import FileUploadSerializer, MaxFlowInputSerializer, TransportFlowSerializer , ResourceSerializer
-from .maxflow import maxflow
-from .knapsack import solve_knapsack
+from .models import TransportFlow, supply_max_cap,Resource, DistrictRegion, PlanningJob
+from .serializers import (
+    FileUploadSerializer, RouteUploadSerializer, MaxFlowInputSerializer, TransportFlowSerializer , ResourceSerializer,
+    CutTreeQuerySerializer, BatchFlowInputSerializer, MultiTerminalFlowSerializer,
+    ScenarioAnalysisSerializer, HierarchicalFlowSerializer, PlanningJobInputSerializer, PlanningJobSerializer
+)
+from .maxflow import get_engine, bottleneck_routes, decompose_paths, residual_reachable
+from .network_cache import NETWORK, bump_network_version, get_network
+from .result_cache import (
+    CAPACITY, INVENTORY, bump_inventory_version, dataset_versions, get_result_cache
+)
+from .concurrency import ComputeBusy, get_compute_limiter, single_flight
+from .progress import ProgressRun, SolveCancelled, get_run, register_run, sse_event
+from .cut_tree import get_cut_tree
+from .incremental import incremental_max_flow
+from .parallel import solve_pairs
+from .scenarios import count_removals, generate_removals, run_scenarios
+from .hierarchy import hierarchical_max_flow
+from .jobs import enqueue_job, get_job_pool
+from .network import with_super_terminals
+from .utils import allocation_results, allocation_summary, save_supply_caps
+from .ingest import add_routes, ingest_csv, parse_resource_row, parse_route_row, sync_routes_csv
+from .knapsack import KNAPSACK_BACKENDS, KNAPSACK_MODES, KNAPSACK_STRATEGIES, allocate_multi_knapsack
+
+logger = logging.getLogger(__name__)
+
+
+def flow_output(network, flow, source, sink, options):
+    """
+    'details' (and 'paths' if asked for) of a solved flow, nested by
+    district name or, with format 'compact', as a name table plus integer
+    edge and path lists.
+    """
+    s, t = network.index[source], network.index[sink]
+    paths = decompose_paths(network, flow, s, t) if options.get('include_paths') else None
+    if options.get('format') == 'compact':
+        return {'format': 'compact', 'details': network.flow_edge_list(flow, paths)}
+
+    output = {'details': dict(network.flow_assignments(flow))}
+    if paths is not None:
+        output['paths'] = [
+            {'amount': amount, 'path': [network.names[u] for u in nodes]} for amount, nodes in paths
+        ]
+    return output
+
+
+def knapsack_options(query):
+    """
+    Knapsack query parameters with their settings defaults.
+
+    Returns:
+        options: { backend, strategy, mode, time_budget_ms, epsilon, include_summary }
+        error: Message for the first invalid parameter, or None
+    """
+    backend = query.get('backend', settings.KNAPSACK_BACKEND)
+    if backend not in KNAPSACK_BACKENDS:
+        return None, f"Unknown backend '{backend}'. Choose from {list(KNAPSACK_BACKENDS)}."
+    strategy = query.get('strategy', settings.KNAPSACK_ALLOCATION_STRATEGY)
+    if strategy not in KNAPSACK_STRATEGIES:
+        return None, f"Unknown strategy '{strategy}'. Choose from {list(KNAPSACK_STRATEGIES)}."
+    mode = query.get('mode', 'exact')
+    if mode not in KNAPSACK_MODES:
+        return None, f"Unknown mode '{mode}'. Choose from {list(KNAPSACK_MODES)}."
+    try:
+        time_budget_ms = int(query.get('time_budget_ms', settings.KNAPSACK_TIME_BUDGET_MS))
+        epsilon = float(query.get('epsilon', settings.KNAPSACK_APPROX_EPSILON))
+    except ValueError:
+        return None, 'time_budget_ms must be an integer and epsilon a number.'
+    if time_budget_ms <= 0 or not 0 < epsilon < 1:
+        return None, 'time_budget_ms must be positive and epsilon between 0 and 1.'
+    return {
+        'backend': backend, 'strategy': strategy, 'mode': mode, 'time_budget_ms': time_budget_ms,
+        'epsilon': epsilon, 'include_summary': query.get('include_summary', '').lower() in ('1', 'true', 'yes')
+    }, None
+
+
+def calculate_max_flow(options):
+    """
+    Body of /api/calculate-flow/ for validated MaxFlowInputSerializer data,
+    shared by the sync view and its async twin (async_views.py).
+
+    Returns:
+        (response data, status code, headers)
+    """
+    source = options['source']
+    sink = options['sink']
+    engine = options.get('engine', settings.MAXFLOW_ENGINE)
+
+    # Compiled graph is cached until the network version changes
+    version, network = get_network()
+
+    if network.edge_count == 0:
+        return {'error': 'No network data found in database.'}, status.HTTP_404_NOT_FOUND, None
+
+    valid_nodes = network.index
+
+    if source not in valid_nodes:
+        return (
+            {'error': f"Source '{source}' not found. Available: {network.names[:5]}..."},
+            status.HTTP_404_NOT_FOUND, None
+        )
+    if sink not in valid_nodes:
+        return {'error': f"Destination '{sink}' not found."}, status.HTTP_404_NOT_FOUND, None
+
+    # 0. Same network version and parameters: reuse the last result
+    cache = get_result_cache()
+    versions = {NETWORK: version}
+    params = dict(options, engine=engine)
+    cached, tier = cache.get('flow', versions, params)
+    if cached is not None:
+        save_supply_caps(cached['source_flows'], [source])
+        # No solve ran for this request, so there are no solver stats
+        result = dict(cached['result'], incremental=None, cached=True)
+        return result, status.HTTP_200_OK, {'X-Result-Cache': tier}
+
+    def solve():
+        # 1. Calculate Max Flow (warm-started from the last run for
+        #    this pair when only capacities changed since)
+        with get_compute_limiter().slot():
+            stats = None
+            if options.get('incremental', settings.FLOW_INCREMENTAL):
+                mf, max_val, stats = incremental_max_flow(
+                    version, network, source, sink, engine, preprocess=settings.FLOW_PREPROCESS
+                )
+            else:
+                mf = get_engine(engine, network, preprocess=settings.FLOW_PREPROCESS)
+                max_val = mf.mflow(source, sink)
+        s = network.index[source]
+        source_flows = {
+            source: {network.names[v]: f for u, v, f in network.net_flows(mf.flow) if u == s}
+        }
+
+        # 2. Save the flow to the immediate neighbors for Knapsack (supply_max_cap)
+        new_entries = save_supply_caps(source_flows, [source])
+        if new_entries:
+            logger.debug("Saved %s supply nodes for next stage", len(new_entries))
+
+        # 3. Return the FLOW RESULT to the Frontend
+        # CRITICAL: Do NOT return the "Saved supply nodes" message here,
+        # or the frontend won't know how to display the graph.
+        result = {
+            'max_flow': max_val,
+            'source': source,
+            'sink': sink,
+            'engine': engine,
+            'incremental': stats,
+            'cached': False
+        }
+        result.update(flow_output(network, mf.flow, source, sink, options))
+        if options['include_cut']:
+            # The residual graph of the final flow holds the min cut
+            result['min_cut'] = bottleneck_routes(network, mf.flow, network.index[source])
+        value = {'result': result, 'source_flows': source_flows}
+        cache.put('flow', versions, params, value)
+        return value
+
+    # Identical requests arriving meanwhile wait for this one solve
+    value, shared = single_flight.do(cache.make_key('flow', versions, params), solve)
+    return value['result'], status.HTTP_200_OK, {'X-Result-Cache': 'shared' if shared else 'miss'}
+
+
+def calculate_knapsack(params):
+    """
+    Body of /api/calculate-knapsack/ for knapsack_options() output, shared
+    by the sync view and its async twin (async_views.py).
+
+    Returns:
+        (response data, status code, headers)
+    """
+    backend, strategy, mode = params['backend'], params['strategy'], params['mode']
+    time_budget_ms, epsilon = params['time_budget_ms'], params['epsilon']
+    include_summary = params['include_summary']
+
+    # 0. Same inputs (network, inventory, capacities) and parameters: reuse
+    cache = get_result_cache()
+    versions = dataset_versions(NETWORK, INVENTORY, CAPACITY)
+    cached, tier = cache.get('knapsack', versions, params)
+    if cached is not None:
+        return cached, 200, {'X-Result-Cache': tier}
+    deadline = time.monotonic() + time_budget_ms / 1000
+
+    # 1. Get capacities calculated in Stage 1
+    supply_nodes = list(supply_max_cap.objects.select_related('A', 'to'))
+    if not supply_nodes:
+        return {'error': 'No capacity data found. Run MaxFlow (Stage 1) first.'}, 400, None
+
+    # 2. Get all available resources
+    all_resources = list(Resource.objects.all())
+    if not all_resources:
+         return {'error': 'No resources found in database. Add items first.'}, 400, None
+
+    def solve():
+        # 3. Allocate over all destinations at once
+        with get_compute_limiter().slot():
+            plan = allocate_multi_knapsack(
+                all_resources,
+                [(node.id, node.capacity) for node in supply_nodes],
+                strategy=strategy,
+                backend=backend,
+                memory_cap=settings.KNAPSACK_MEMORY_CAP_BYTES,
+                mode=mode,
+                epsilon=epsilon,
+                deadline=deadline
+            )
+
+        results = allocation_results(supply_nodes, plan)
+        if include_summary:
+            results = {
+                'allocations': results,
+                'summary': allocation_summary(plan, strategy, mode)
+            }
+
+        # A result cut short by the time budget would otherwise stay pinned
+        # for this dataset version, even for requests with a larger budget
+        if plan['complete']:
+            cache.put('knapsack', versions, params, results)
+        return results
+
+    # Identical requests arriving meanwhile wait for this one solve
+    results, shared = single_flight.do(cache.make_key('knapsack', versions, params), solve)
+    return results, 200, {'X-Result-Cache': 'shared' if shared else 'miss'}
+
 
 class SystemStatusView(APIView):
     """
@@ -26,135 +250,444 @@ class BatchUploadView(APIView):
     """
     POST /api/upload/
     Uploads a CSV file, parses it, and populates the database.
+    Optional form field mode=diff updates the routes in place (see
+    ingest.sync_routes_csv) and returns the change counts.
     """
     parser_classes = (MultiPartParser, FormParser)
 
     def post(self, request, *args, **kwargs):
-        print(f"DEBUG: Received Upload Request. Files: {request.FILES.keys()}")
+        logger.debug("Received upload request, files: %s", list(request.FILES))
 
-        serializer = FileUploadSerializer(data=request.data)
+        serializer = RouteUploadSerializer(data=request.data)
         
         if serializer.is_valid():
             csv_file = serializer.validated_data['file']
             
             try:
-                # Attempt to read and decode
-                file_data = csv_file.read()
-                decoded_file = file_data.decode('utf-8')
-                io_string = io.StringIO(decoded_file)
-                reader = csv.reader(io_string)
-                
-                # Skip header row
-                next(reader, None)
-                
-                new_entries = []
-                for row_idx, row in enumerate(reader):
-                    if len(row) >= 3:
-                        try:
-                            new_entries.append(TransportFlow(
-                                A=row[0].strip(),
-                                to=row[1].strip(),
-                                max_capacity=int(row[2].strip())
-                            ))
-                        except ValueError as ve:
-                            print(f"DEBUG: Row {row_idx} Error: {ve}")
+                if serializer.validated_data['mode'] == 'diff':
+                    changes, errors = sync_routes_csv(
+                        csv_file, batch_size=settings.UPLOAD_BATCH_SIZE,
+                        max_errors=settings.UPLOAD_MAX_REPORTED_ERRORS,
+                        on_change=bump_network_version
+                    )
+                    if not any(changes.values()):
+                        return Response(
+                            {'success': False, 'message': 'CSV file was empty or had no valid rows (Source,Dest,Cap).', 'errors': errors}, 
+                            status=status.HTTP_400_BAD_REQUEST
+                        )
+                    logger.debug("Route diff applied: %s", changes)
+                    return Response(
+                        {'success': True,
+                         'message': f"Routes updated: {changes['created']} added, {changes['updated']} changed, {changes['deleted']} removed.",
+                         'changes': changes, 'errors': errors}, 
+                        status=status.HTTP_200_OK
+                    )
+
+                # Stream the file: decode per chunk, insert in batches, one transaction
+                created, errors = ingest_csv(
+                    csv_file, TransportFlow, parse_route_row,
+                    batch_size=settings.UPLOAD_BATCH_SIZE, replace=True,
+                    max_errors=settings.UPLOAD_MAX_REPORTED_ERRORS,
+                    on_success=bump_network_version, save_batch=add_routes
+                )
+                if errors['count']:
+                    logger.info("Route upload skipped %s rows, first: %s", errors['count'], errors['rows'][0])
                 
-                if new_entries:
-                    TransportFlow.objects.all().delete()
-                    TransportFlow.objects.bulk_create(new_entries)
-                    print(f"DEBUG: Successfully created {len(new_entries)} rows.")
+                if created:
+                    logger.debug("Loaded %s routes", created)
                     return Response(
-                        {'success': True, 'message': f'Successfully loaded {len(new_entries)} routes.'}, 
+                        {'success': True, 'message': f'Successfully loaded {created} routes.', 'errors': errors}, 
                         status=status.HTTP_201_CREATED
                     )
                 else:
                      return Response(
-                        {'success': False, 'message': 'CSV file was empty or had no valid rows (Source,Dest,Cap).'}, 
+                        {'success': False, 'message': 'CSV file was empty or had no valid rows (Source,Dest,Cap).', 'errors': errors}, 
                         status=status.HTTP_400_BAD_REQUEST
                     )
 
             except UnicodeDecodeError:
-                print(">>> UPLOAD ERROR: File is not UTF-8. Is it an Excel (.xlsx) file?")
+                logger.warning("Route upload is not UTF-8 (an Excel file?)")
                 return Response(
                     {'success': False, 'message': 'File encoding error. Please ensure it is a valid .CSV (text) file, not Excel.'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
             except Exception as e:
-                print(f">>> UPLOAD ERROR: {str(e)}")
+                logger.warning("Route upload failed: %s", e)
                 return Response(
                     {'success': False, 'message': f'Error parsing file: {str(e)}'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
         
-        print(f">>> UPLOAD ERROR (Serializer): {serializer.errors}")
+        logger.warning("Route upload rejected: %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class MaxFlowCalculationView(APIView):
     """
     POST /api/calculate/
-    Input: { "source": "Dhaka", "sink": "Chittagong" }
-    Output: Max Flow value, path details, AND saves supply_max_cap data.
+    Input: { "source": "Dhaka", "sink": "Chittagong",
+             "engine": "dinic" (optional), "incremental": true (optional),
+             "include_cut": true (optional), "include_paths": true (optional),
+             "format": "nested" | "compact" (optional) }
+    Output: Max Flow value, path details (plus the flow split into ranked
+    source→sink paths and the bottleneck routes of the minimum cut, if
+    asked for), AND saves supply_max_cap data.
+    Results are cached per network version and parameters (see
+    result_cache); the X-Result-Cache header says memory, disk, shared
+    (joined an identical request in progress) or miss. Cached answers have
+    "cached": true and no "incremental" stats.
+    Answers 503 with Retry-After when every compute slot stays busy.
     """
     def post(self, request):
         serializer = MaxFlowInputSerializer(data=request.data)
         
         if serializer.is_valid():
-            source = serializer.validated_data['source']
-            sink = serializer.validated_data['sink']
-            
-            mf = maxflow()
-            routes = TransportFlow.objects.all()
-            
-            if not routes.exists():
-                return Response({'error': 'No network data found in database.'}, status=status.HTTP_404_NOT_FOUND)
-
-            valid_nodes = set()
-            for route in routes:
-                mf.add_edge(route.A, route.to, route.max_capacity)
-                mf.add_edge(route.to, route.A, route.max_capacity)
-                valid_nodes.add(route.A)
-                valid_nodes.add(route.to)
-            
-            if source not in valid_nodes:
+            data, code, headers = calculate_max_flow(serializer.validated_data)
+            return Response(data, status=code, headers=headers)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class MultiTerminalFlowView(APIView):
+    """
+    POST /api/calculate-flow/multi/
+    Input: { "sources": [ { "name": "Dhaka", "limit": 800 }, { "name": "Chittagong" } ],
+             "sinks": [ { "name": "Sylhet", "limit": 500 }, { "name": "Sunamganj" } ],
+             "engine": "dinic" (optional) }
+    'limit' is an optional supply (sources) or demand (sinks) cap.
+    Output: One max-flow over all terminals through a virtual super-source
+    and super-sink, per-terminal totals, AND saves supply_max_cap data for
+    every warehouse.
+    """
+    def post(self, request):
+        serializer = MultiTerminalFlowSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        engine = serializer.validated_data.get('engine', settings.MAXFLOW_ENGINE)
+        supplies = {t['name']: t.get('limit') for t in serializer.validated_data['sources']}
+        demands = {t['name']: t.get('limit') for t in serializer.validated_data['sinks']}
+
+        _, network = get_network()
+        if network.edge_count == 0:
+            return Response({'error': 'No network data found in database.'}, status=status.HTTP_404_NOT_FOUND)
+        for name in list(supplies) + list(demands):
+            if name not in network.index:
+                return Response({'error': f"District '{name}' not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        # 1. One max-flow run from the super-source to the super-sink
+        extended, super_source, super_sink = with_super_terminals(network, supplies, demands)
+        with get_compute_limiter().slot():
+            mf = get_engine(engine, extended, preprocess=settings.FLOW_PREPROCESS)
+            max_val = mf.mflow(super_source, super_sink)
+
+        flow_details = dict(mf.get_flow())
+        sent = flow_details.pop(super_source, {})
+        received = {}
+        for u in list(flow_details):
+            amount = flow_details[u].pop(super_sink, 0)
+            if amount:
+                received[u] = amount
+            if not flow_details[u]:
+                del flow_details[u]
+
+        # 2. Per-warehouse outgoing capacities, saved in one bulk operation
+        new_entries = save_supply_caps(flow_details, list(supplies))
+        logger.debug("Saved %s supply nodes for next stage", len(new_entries))
+
+        return Response({
+            'max_flow': max_val,
+            'details': flow_details,
+            'sources': {name: sent.get(name, 0) for name in supplies},
+            'sinks': {name: received.get(name, 0) for name in demands},
+            'engine': engine
+        }, status=status.HTTP_200_OK)
+
+
+class BatchFlowCalculationView(APIView):
+    """
+    POST /api/calculate-flow/batch/
+    Input: { "pairs": [ { "source": "Dhaka", "sink": "Sylhet" }, ... ],
+             "engine": "dinic" (optional), "include_details": true (optional) }
+    Output: One result per pair (max_flow, details, seconds), solved in
+    parallel worker processes on a single load of the network. Each
+    process takes a compute slot: the batch uses as many as are free (up
+    to FLOW_BATCH_MAX_WORKERS), and waits like other solves for the first.
+    Does not touch supply_max_cap.
+    """
+    def post(self, request):
+        serializer = BatchFlowInputSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        engine = serializer.validated_data.get('engine', settings.MAXFLOW_ENGINE)
+        include_details = serializer.validated_data['include_details']
+        version, network = get_network()
+        if network.edge_count == 0:
+            return Response({'error': 'No network data found in database.'}, status=status.HTTP_404_NOT_FOUND)
+
+        started = time.perf_counter()
+        results = [None] * len(serializer.validated_data['pairs'])
+        valid = []
+        for i, pair in enumerate(serializer.validated_data['pairs']):
+            missing = [name for name in (pair['source'], pair['sink']) if name not in network.index]
+            if missing:
+                results[i] = {**pair, 'error': f"District '{missing[0]}' not found."}
+            else:
+                valid.append((i, pair['source'], pair['sink']))
+
+        # Each worker process is a solve, so it needs its own compute slot
+        wanted = min(settings.FLOW_BATCH_MAX_WORKERS or os.cpu_count() or 1, max(len(valid), 1))
+        with get_compute_limiter().slots(wanted) as slots:
+            solved, workers = solve_pairs(
+                network, [(source, sink) for _, source, sink in valid], engine,
+                include_details=include_details, max_workers=slots,
+                preprocess=settings.FLOW_PREPROCESS
+            )
+        for (i, _, _), result in zip(valid, solved):
+            results[i] = result
+
+        return Response({
+            'network_version': version,
+            'engine': engine,
+            'workers': workers,
+            'total_seconds': round(time.perf_counter() - started, 6),
+            'results': results
+        }, status=status.HTTP_200_OK)
+
+
+class ScenarioAnalysisView(APIView):
+    """
+    POST /api/calculate-flow/scenarios/
+    Input: { "source": "Dhaka", "sink": "Sylhet", "engine": "dinic" (optional),
+             "scenarios": [ { "name": "Bridge out", "changes": [ { "route_id": 12, "scale": 0 } ] } ],
+             "generate": "single" | "pair" (optional), "top": 20 (optional) }
+    'scale' multiplies the route capacity (0 = route cut). "generate" adds
+    one scenario per failing flow-carrying route, or per pair of routes.
+    Output: Baseline max flow and the scenarios ranked by flow lost,
+    evaluated in parallel worker processes from the baseline flow (one
+    per free compute slot, as for the batch endpoint).
+    Does not touch supply_max_cap.
+    """
+    def post(self, request):
+        serializer = ScenarioAnalysisSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        source = serializer.validated_data['source']
+        sink = serializer.validated_data['sink']
+        engine = serializer.validated_data.get('engine', settings.MAXFLOW_ENGINE)
+        version, network = get_network()
+        if network.edge_count == 0:
+            return Response({'error': 'No network data found in database.'}, status=status.HTTP_404_NOT_FOUND)
+        for name in (source, sink):
+            if name not in network.index:
+                return Response({'error': f"District '{name}' not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        # 1. Requested scenarios, with route ids mapped to edges
+        edge_of_route = {network.edge_key[e]: e for e in range(network.edge_count)}
+        scenarios = []
+        for i, scenario in enumerate(serializer.validated_data.get('scenarios', [])):
+            changes = {}
+            for change in scenario['changes']:
+                e = edge_of_route.get(change['route_id'])
+                if e is None:
+                    return Response({'error': f"Route {change['route_id']} not found."}, status=status.HTTP_404_NOT_FOUND)
+                changes[e] = int(network.edge_cap[e] * change['scale'])
+            scenarios.append((scenario.get('name', f"scenario {i + 1}"), changes))
+
+        # Scenarios fan out over worker processes, one per compute slot
+        wanted = settings.FLOW_BATCH_MAX_WORKERS or os.cpu_count() or 1
+        with get_compute_limiter().slots(wanted) as slots:
+            # 2. Generated route failures need the baseline flow to pick
+            #    routes; it is counted before any scenario is built
+            generate = serializer.validated_data.get('generate')
+            flow = None
+            count = len(scenarios)
+            if generate:
+                size = 1 if generate == 'single' else 2
+                mf = get_engine(engine, network)
+                mf.mflow(source, sink)
+                flow = mf.flow
+                count += count_removals(network, flow, size)
+
+            if count > settings.FLOW_SCENARIO_MAX:
                 return Response(
-                    {'error': f"Source '{source}' not found. Available: {list(valid_nodes)[:5]}..."}, 
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            if sink not in valid_nodes:
-                 return Response(
-                    {'error': f"Destination '{sink}' not found."}, 
-                    status=status.HTTP_404_NOT_FOUND
+                    {'error': f"{count} scenarios; at most {settings.FLOW_SCENARIO_MAX} per request."},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # 1. Calculate Max Flow
-            max_val = mf.mflow(source, sink)
-            flow_details = dict(mf.get_flow())
-            
-            # 2. Extract Immediate Neighbors for Knapsack (supply_max_cap)
-            new_entries = []
-            for u in flow_details:
-                for v, f in flow_details[u].items():
-                    if u == source and f > 0:
-                        # FIX: We must save the 'name' and 'capacity'
-                        new_entries.append(supply_max_cap(to=v, capacity=f))
-            
-            # 3. Save to Database (Silently)
-            if new_entries:
-                supply_max_cap.objects.all().delete()
-                supply_max_cap.objects.bulk_create(new_entries)
-                print(f"DEBUG: Saved {len(new_entries)} supply nodes for next stage.")
-            
-            # 4. Return the FLOW RESULT to the Frontend
-            # CRITICAL: Do NOT return the "Saved supply nodes" message here, 
-            # or the frontend won't know how to display the graph.
-            return Response({
-                'max_flow': max_val,
-                'details': flow_details,
-                'source': source,
-                'sink': sink
-            }, status=status.HTTP_200_OK)
+            if generate:
+                for edges in generate_removals(network, flow, size):
+                    name = ' + '.join(f"{network.names[network.edge_tail[e]]}-{network.names[network.edge_head[e]]}" for e in edges)
+                    scenarios.append((f"cut {name}", {e: 0 for e in edges}))
+
+            started = time.perf_counter()
+            baseline, results, workers = run_scenarios(
+                network, source, sink, scenarios, engine, max_workers=slots, baseline_flow=flow
+            )
+        top = serializer.validated_data.get('top')
+
+        return Response({
+            'source': source,
+            'sink': sink,
+            'network_version': version,
+            'engine': engine,
+            'baseline_max_flow': baseline,
+            'scenario_count': len(results),
+            'resolved_count': sum(1 for r in results if r['resolved']),
+            'workers': workers,
+            'total_seconds': round(time.perf_counter() - started, 6),
+            'results': results[:top] if top else results
+        }, status=status.HTTP_200_OK)
+
+
+class HierarchicalFlowView(APIView):
+    """
+    POST /api/calculate-flow/hierarchical/
+    Input: { "source": "Dhaka", "sink": "Sylhet", "engine": "dinic" (optional),
+             "regions": { "Gazipur": "Dhaka Division", ... } (optional),
+             "include_cut" / "include_paths" / "format" as for /api/calculate-flow/ }
+    Output: Newline-delimited JSON, streamed as soon as each stage is done:
+    first the coarse region-level result (an upper bound and routing),
+    then the refined exact max flow with its details.
+    The refined stage still solves the full network (warm-started from a
+    flow inside the regions the coarse routing uses), so it costs about as
+    much as /api/calculate-flow/; clients wanting only the cheap bound can
+    close the stream after the first line.
+    Regions come from the DistrictRegion table, overridden by "regions".
+    Does not touch supply_max_cap.
+    """
+    def post(self, request):
+        serializer = HierarchicalFlowSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        options = serializer.validated_data
+        source = options['source']
+        sink = options['sink']
+        engine = options.get('engine', settings.MAXFLOW_ENGINE)
+        version, network = get_network()
+        if network.edge_count == 0:
+            return Response({'error': 'No network data found in database.'}, status=status.HTTP_404_NOT_FOUND)
+        for name in (source, sink):
+            if name not in network.index:
+                return Response({'error': f"District '{name}' not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        regions = dict(DistrictRegion.objects.values_list('district', 'region'))
+        regions.update(options.get('regions', {}))
+
+        def stream():
+            stages = hierarchical_max_flow(
+                network, regions, source, sink, engine, preprocess=settings.FLOW_PREPROCESS
+            )
+            for stage, result in stages:
+                line = {'stage': stage, 'source': source, 'sink': sink,
+                        'network_version': version, 'engine': engine}
+                if stage == 'refined':
+                    mf = result.pop('mf')
+                    result.update(flow_output(network, mf.flow, source, sink, options))
+                    if options['include_cut']:
+                        result['min_cut'] = bottleneck_routes(network, mf.flow, network.index[source])
+                line.update(result)
+                yield json.dumps(line) + '\n'
+
+        # The compute slot is held until the last line is sent
+        return StreamingHttpResponse(get_compute_limiter().streaming(stream()), content_type='application/x-ndjson')
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class CutTreeFlowView(APIView):
+    """
+    POST /api/calculate-flow/cut-tree/
+    Input: { "source": "Dhaka", "sink": "Sylhet", "include_details": false,
+             "include_cut": false }
+    Output: Max Flow value read from the Gomory-Hu tree of the current
+    network (built once per network version), with the tree edge whose
+    removal gives the minimum cut ('min_cut_tree_edge'), plus the flow
+    assignment and/or min-cut routes from the regular engine only when
+    asked for.
+    Does not touch supply_max_cap.
+    """
+    def post(self, request):
+        serializer = CutTreeQuerySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        source = serializer.validated_data['source']
+        sink = serializer.validated_data['sink']
+
+        with get_compute_limiter().slot():
+            # Building the tree on a new network version is n - 1 max-flows
+            tree = get_cut_tree()
+        for name in (source, sink):
+            if name not in tree.index:
+                return Response({'error': f"District '{name}' not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        max_val, min_cut_edge = tree.max_flow(source, sink)
+        result = {
+            'max_flow': max_val,
+            'source': source,
+            'sink': sink,
+            'network_version': tree.network_version,
+            'min_cut_tree_edge': min_cut_edge,
+        }
+
+        if serializer.validated_data['include_details'] or serializer.validated_data['include_cut']:
+            engine = serializer.validated_data.get('engine', settings.MAXFLOW_ENGINE)
+            _, network = get_network()
+            with get_compute_limiter().slot():
+                mf = get_engine(engine, network, preprocess=settings.FLOW_PREPROCESS)
+                mf.mflow(source, sink)
+            result['engine'] = engine
+            if serializer.validated_data['include_details']:
+                result.update(flow_output(network, mf.flow, source, sink, serializer.validated_data))
+            if serializer.validated_data['include_cut']:
+                result['min_cut'] = bottleneck_routes(network, mf.flow, network.index[source])
+
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class PlanningJobListView(APIView):
+    """
+    POST /api/jobs/
+    Input: { "kind": "plan" | "flow" | "optimize" (default "plan"),
+             "source": "Dhaka", "sink": "Feni" (plan/flow), "engine" (optional),
+             "backend", "strategy", "mode", "time_budget_ms", "epsilon" (optional, knapsack) }
+    Output: 202 with the queued job; poll GET /api/jobs/<id>/ for status,
+    progress and result. Runs on the local job pool (see jobs.py).
+    GET /api/jobs/: the latest jobs, newest first.
+    """
+    def get(self, request):
+        get_job_pool()
+        jobs = PlanningJob.objects.order_by('-id')[:settings.JOB_LIST_LIMIT]
+        return Response(PlanningJobSerializer(jobs, many=True).data, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        serializer = PlanningJobInputSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        params = dict(serializer.validated_data)
+        kind = params.pop('kind')
+        job = enqueue_job(kind, params)
+        return Response(
+            PlanningJobSerializer(job).data, status=status.HTTP_202_ACCEPTED,
+            headers={'Location': f"/api/jobs/{job.id}/"}
+        )
+
+
+class PlanningJobDetailView(APIView):
+    """
+    GET /api/jobs/<id>/
+    Output: status (queued, running, succeeded, failed), progress (0-1)
+    and stage, then the result or the error once finished.
+    """
+    def get(self, request, job_id):
+        # Starting the pool here resumes jobs left over by a restart
+        get_job_pool()
+        job = PlanningJob.objects.filter(id=job_id).first()
+        if job is None:
+            return Response({'error': f"Job {job_id} not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(PlanningJobSerializer(job).data, status=status.HTTP_200_OK)
 
 
 class ResourceUploadView(APIView):
@@ -172,39 +705,22 @@ class ResourceUploadView(APIView):
             csv_file = serializer.validated_data['file']
             
             try:
-                file_data = csv_file.read()
-                decoded_file = file_data.decode('utf-8')
-                io_string = io.StringIO(decoded_file)
-                reader = csv.reader(io_string)
-                
-                # Skip header
-                next(reader, None)
-                
-                new_resources = []
-                for row in reader:
-                    # Check if row has at least 4 columns
-                    if len(row) >= 4:
-                        try:
-                            new_resources.append(Resource(
-                                name=row[0].strip(),
-                                volume=int(row[1].strip()),
-                                priority_score=int(row[2].strip()),
-                                quantity=int(row[3].strip())
-                            ))
-                        except ValueError:
-                            continue # Skip malformed rows
+                created, errors = ingest_csv(
+                    csv_file, Resource, parse_resource_row,
+                    batch_size=settings.UPLOAD_BATCH_SIZE,
+                    max_errors=settings.UPLOAD_MAX_REPORTED_ERRORS,
+                    on_success=bump_inventory_version
+                )
                 
-                if new_resources:
-                    # Optional: Clear old resources? 
-                    # Resource.objects.all().delete() 
-                    Resource.objects.bulk_create(new_resources)
+                if created:
+                    # Optional: Clear old resources? (replace=True)
                     return Response(
-                        {'success': True, 'message': f'Added {len(new_resources)} items to inventory.'}, 
+                        {'success': True, 'message': f'Added {created} items to inventory.', 'errors': errors}, 
                         status=status.HTTP_201_CREATED
                     )
                 else:
                      return Response(
-                        {'success': False, 'message': 'CSV was empty or invalid.'}, 
+                        {'success': False, 'message': 'CSV was empty or invalid.', 'errors': errors}, 
                         status=status.HTTP_400_BAD_REQUEST
                     )
 
@@ -218,52 +734,221 @@ class ResourceUploadView(APIView):
 
 
 class KnapsackCalculationView(APIView):
+    """
+    GET /api/calculate-knapsack/
+    Optional: ?backend=python|numpy (defaults to settings.KNAPSACK_BACKEND)
+              ?strategy=heuristic|exact (defaults to settings.KNAPSACK_ALLOCATION_STRATEGY)
+              ?mode=exact|approx, ?time_budget_ms=N, ?epsilon=0.1
+                  'approx' returns the best allocation found within the budget
+              ?include_summary=true wraps the result as
+                  { "allocations": {...}, "summary": {total, upper bound, gap} }
+    Complete results are cached per network/inventory/capacity version and
+    parameters; the X-Result-Cache header says memory, disk, shared or miss.
+    Answers 503 with Retry-After when every compute slot stays busy.
+    """
     def get(self, request):
-        # 1. Get capacities calculated in Stage 1
-        supply_nodes = supply_max_cap.objects.all()
-        if not supply_nodes.exists():
-            return Response({'error': 'No capacity data found. Run MaxFlow (Stage 1) first.'}, status=400)
-
-        # 2. Get all available resources
-        all_resources = list(Resource.objects.all())
-        if not all_resources:
-             return Response({'error': 'No resources found in database. Add items first.'}, status=400)
-
-        results = {}
-        available_pool = []
-        for r in all_resources:
-            count = r.quantity if r.quantity else 1
-            for _ in range(count):
-                available_pool.append(r)
-
-        for node in supply_nodes:
-            # UPDATED: Use 'node.to' as the identifier for the route destination
-            destination_name = node.to 
-            
-            selected, val = solve_knapsack(available_pool, node.capacity)
-            
-            results[destination_name] = {
-                'source': node.A,
-                'destination': node.to,
-                'capacity': node.capacity,
-                'total_priority': val,
-                'items': [
-                    {'name': item.name, 'volume': item.volume, 'score': item.priority_score}
-                    for item in selected
-                ]
-            }
+        params, error = knapsack_options(request.query_params)
+        if error:
+            return Response({'error': error}, status=400)
+        data, code, headers = calculate_knapsack(params)
+        return Response(data, status=code, headers=headers)
+
+def _progress_response(request, run, solve, start_data):
+    """
+    Starts 'solve' on a compute slot and streams its ProgressRun as
+    text/event-stream: an async iterator under ASGI (asgi.py), so waiting
+    for events never holds a worker thread, a plain one under WSGI.
+    """
+    limiter = get_compute_limiter()
+    try:
+        limiter.acquire()
+    except ComputeBusy as e:
+        return JsonResponse({'error': str(e.detail)}, status=503, headers={'Retry-After': str(e.wait)})
+    run.on_finish = limiter.release
+    register_run(run)
+    run.start(solve)
+
+    start_data = {'run_id': run.id, 'stop_url': f"/api/runs/{run.id}/stop/", **start_data}
+    if isinstance(request, ASGIRequest):
+        events = run.astream(start_data)
+    else:
+        events = run.stream(start_data)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+def flow_progress_stream(request):
+    """
+    GET /api/calculate-flow/stream/?source=Dhaka&sink=Feni
+    Optional: engine, include_cut, include_paths, format (as for
+    /api/calculate-flow/)
+    Output: Server-Sent Events
+        start     { run_id, stop_url }
+        progress  { paths, flow }: augmenting paths found and flow so far
+        result    the /api/calculate-flow/ result plus "complete"
+        cancelled / failed
+    POST the stop_url to take the flow found so far (it is a valid flow,
+    saved to supply_max_cap like a full one), or with {"discard": true} to
+    cancel. Closing the connection cancels too.
+    """
+    serializer = MaxFlowInputSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    options = serializer.validated_data
+    source, sink = options['source'], options['sink']
+    engine = options.get('engine', settings.MAXFLOW_ENGINE)
+
+    version, network = get_network()
+    if network.edge_count == 0:
+        return JsonResponse({'error': 'No network data found in database.'}, status=404)
+    for name in (source, sink):
+        if name not in network.index:
+            return JsonResponse({'error': f"District '{name}' not found."}, status=404)
 
-            for item in selected:
-                if item in available_pool:
-                    available_pool.remove(item)
+    def solve(run):
+        mf = get_engine(engine, network, preprocess=settings.FLOW_PREPROCESS, progress=run.report)
+        max_val = mf.mflow(source, sink)
+        s = network.index[source]
+        save_supply_caps(
+            {source: {network.names[v]: f for u, v, f in network.net_flows(mf.flow) if u == s}}, [source]
+        )
+        result = {
+            'max_flow': max_val,
+            'source': source,
+            'sink': sink,
+            'engine': engine,
+            'network_version': version,
+            # A stop request may have come after the last augmenting path
+            'complete': not run.stopped or not residual_reachable(network, mf.flow, s)[network.index[sink]]
+        }
+        result.update(flow_output(network, mf.flow, source, sink, options))
+        if options['include_cut']:
+            result['min_cut'] = bottleneck_routes(network, mf.flow, s)
+        return result
+
+    run = ProgressRun(settings.PROGRESS_EVENT_INTERVAL_SECONDS, settings.PROGRESS_KEEPALIVE_SECONDS)
+    return _progress_response(request, run, solve, {'source': source, 'sink': sink, 'engine': engine})
+
+
+@require_GET
+def knapsack_progress_stream(request):
+    """
+    GET /api/calculate-knapsack/stream/
+    Optional: backend, strategy, mode, time_budget_ms, epsilon (as for
+    /api/calculate-knapsack/)
+    Output: Server-Sent Events
+        start     { run_id, stop_url, destinations }
+        progress  { stage, destination, destinations, rows, total_rows, best }
+                  (stage 'search': nodes instead of rows)
+        result    { "allocations": {...}, "summary": {...} }
+        cancelled / failed
+    POST the stop_url to take the best allocation so far (summary
+    "complete": false), or with {"discard": true} to cancel.
+    Shares the result cache of /api/calculate-knapsack/?include_summary=true:
+    a cached result is sent as the only event. Identical streams running
+    at the same time share one solve (without progress for the later ones).
+    """
+    options, error = knapsack_options(request.GET)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+    params = dict(options, include_summary=True)
+
+    cache = get_result_cache()
+    versions = dataset_versions(NETWORK, INVENTORY, CAPACITY)
+    cached, tier = cache.get('knapsack', versions, params)
+    if cached is not None:
+        response = HttpResponse(sse_event('result', cached), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Result-Cache'] = tier
+        return response
+
+    supply_nodes = list(supply_max_cap.objects.select_related('A', 'to'))
+    if not supply_nodes:
+        return JsonResponse({'error': 'No capacity data found. Run MaxFlow (Stage 1) first.'}, status=400)
+    all_resources = list(Resource.objects.all())
+    if not all_resources:
+        return JsonResponse({'error': 'No resources found in database. Add items first.'}, status=400)
+
+    def allocate(run):
+        plan = allocate_multi_knapsack(
+            all_resources,
+            [(node.id, node.capacity) for node in supply_nodes],
+            strategy=options['strategy'],
+            backend=options['backend'],
+            memory_cap=settings.KNAPSACK_MEMORY_CAP_BYTES,
+            mode=options['mode'],
+            epsilon=options['epsilon'],
+            deadline=time.monotonic() + options['time_budget_ms'] / 1000,
+            progress=run.report
+        )
+        results = {
+            'allocations': allocation_results(supply_nodes, plan),
+            'summary': allocation_summary(plan, options['strategy'], options['mode'])
+        }
+        if plan['complete']:
+            cache.put('knapsack', versions, params, results)
+        return results
+
+    def solve(run):
+        key = cache.make_key('knapsack', versions, params)
+        while True:
+            try:
+                results, _ = single_flight.do(key, lambda: allocate(run))
+                return results
+            except SolveCancelled:
+                # Only give up if this client cancelled, not the one whose
+                # solve was shared
+                if run.cancelled:
+                    raise
+
+    run = ProgressRun(settings.PROGRESS_EVENT_INTERVAL_SECONDS, settings.PROGRESS_KEEPALIVE_SECONDS)
+    return _progress_response(request, run, solve, {'destinations': len(supply_nodes)})
+
+
+class ProgressStopView(APIView):
+    """
+    POST /api/runs/<run_id>/stop/
+    Input: { "discard": false } (optional)
+    Stops a streamed solve (see flow_progress_stream): by default its best
+    result so far is sent as the 'result' event; with "discard": true it
+    is cancelled. Runs live in the process that streams them.
+    """
+    def post(self, request, run_id):
+        run = get_run(run_id)
+        if run is None:
+            return Response({'error': f"Run '{run_id}' not found or already finished."}, status=status.HTTP_404_NOT_FOUND)
+        discard = str(request.data.get('discard', '')).lower() in ('1', 'true', 'yes')
+        if discard:
+            run.cancel()
+        else:
+            run.accept()
+        return Response({'run_id': run_id, 'stopping': 'cancel' if discard else 'accept'}, status=status.HTTP_202_ACCEPTED)
 
-        return Response(results, status=200)
 
 class TransportFlowViewSet(viewsets.ModelViewSet):
-    queryset = TransportFlow.objects.all().order_by('id')
+    """
+    Creates and updates bump the network version through the post_save
+    signal; deletes bump it here.
+    """
+    queryset = TransportFlow.objects.select_related('A', 'to').order_by('id')
     serializer_class = TransportFlowSerializer
 
+    def perform_destroy(self, instance):
+        instance.delete()
+        bump_network_version()
+
 class ResourceViewSet(viewsets.ModelViewSet):
+    """
+    Creates and updates bump the inventory version through the post_save
+    signal; deletes bump it here.
+    """
     queryset = Resource.objects.all().order_by('id')
     serializer_class = ResourceSerializer
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        bump_inventory_version()
     
\ No newline at end of file
@@ -2,6 +2,8 @@
 ASGI config for hospital_mgmt project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn hospital_mgmt.asgi:application``)
+to use the async endpoints under /api/async/ and non-blocking progress streams.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
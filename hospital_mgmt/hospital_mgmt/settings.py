@@ -98,9 +98,6 @@ STATIC_URL = 'static/'
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800
-FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800
-
 # --- CORS CONFIGURATION ---
 # This tells Django to accept requests from ANY domain (useful for development)
 CORS_ALLOW_ALL_ORIGINS = True
@@ -150,4 +147,83 @@ LOGGING = {
             'propagate': True,
         },
     },
-}
\ No newline at end of file
+}
+# --- SOLVER CONFIGURATION ---
+# Default knapsack backend: 'python' or 'numpy' (requires NumPy).
+# Can be overridden per request with ?backend=...
+KNAPSACK_BACKEND = 'python'
+
+# Largest knapsack decision table (bytes) kept in memory. Bigger problems
+# switch to the rolling-row (Hirschberg) reconstruction automatically.
+KNAPSACK_MEMORY_CAP_BYTES = 256 * 1024 * 1024
+
+# How stored capacities share the inventory: 'heuristic' (largest
+# destination first, reports an optimality gap) or 'exact' (branch and
+# bound, for small instances).
+KNAPSACK_ALLOCATION_STRATEGY = 'heuristic'
+
+# Defaults for ?mode=approx on /api/calculate-knapsack/
+KNAPSACK_TIME_BUDGET_MS = 5000
+KNAPSACK_APPROX_EPSILON = 0.1
+
+# Default max-flow engine: 'edmonds_karp', 'dinic' or 'push_relabel'.
+# Can be overridden per request with "engine" on /api/calculate-flow/.
+MAXFLOW_ENGINE = 'dinic'
+
+# Reuse the last flow of a (source, sink) pair after capacity edits instead
+# of solving from zero. Can be overridden per request with "incremental".
+FLOW_INCREMENTAL = True
+
+# /api/calculate-flow/batch/: worker processes (None = one per core) and
+# the largest accepted batch.
+FLOW_BATCH_MAX_WORKERS = None
+FLOW_BATCH_MAX_PAIRS = 500
+
+# /api/calculate-flow/scenarios/: the most what-if scenarios evaluated per
+# request (generated ones included). Uses FLOW_BATCH_MAX_WORKERS processes.
+FLOW_SCENARIO_MAX = 5000
+
+# Shrink the network before each cold max-flow solve: drop districts off
+# every source→sink path, merge parallel routes, contract degree-2 chains.
+# Flows are mapped back to the original routes, so responses are unchanged.
+FLOW_PREPROCESS = True
+
+# CSV uploads are streamed: rows are inserted in batches of this size (one
+# transaction per upload) and at most this many bad rows are reported back.
+UPLOAD_BATCH_SIZE = 2000
+UPLOAD_MAX_REPORTED_ERRORS = 50
+
+# Result cache for /api/calculate-flow/ and /api/calculate-knapsack/, keyed
+# by dataset versions and request parameters. The in-memory LRU tier is
+# per process and bounded in bytes; set a file path (e.g. BASE_DIR /
+# 'result_cache.sqlite3') to add a disk tier shared by all workers.
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+RESULT_CACHE_SQLITE_PATH = None
+
+# Heavy calculation endpoints (flow, knapsack, batch, scenarios, ...): at
+# most this many solves run at once per process. A request waits up to the
+# queue timeout for a slot, then gets 503 with Retry-After. Identical
+# concurrent flow/knapsack requests share one solve instead.
+COMPUTE_MAX_CONCURRENT = 4
+COMPUTE_QUEUE_TIMEOUT_SECONDS = 10
+COMPUTE_RETRY_AFTER_SECONDS = 5
+
+# Background planning jobs (/api/jobs/, admin actions): worker threads per
+# process, how often running jobs refresh their heartbeat, and after how
+# long without one a running job counts as interrupted and is requeued.
+JOB_WORKERS = 2
+JOB_HEARTBEAT_SECONDS = 15
+JOB_STALE_SECONDS = 120
+JOB_LIST_LIMIT = 50
+
+# Server-Sent Events progress streams (/api/calculate-flow/stream/,
+# /api/calculate-knapsack/stream/): at most one progress event per interval,
+# and a keep-alive comment when nothing was sent for this long.
+PROGRESS_EVENT_INTERVAL_SECONDS = 0.25
+PROGRESS_KEEPALIVE_SECONDS = 15
+
+# /api/async/ endpoints under an ASGI server: threads running the solves
+# (and their database work) off the event loop. Solves still wait for a
+# compute slot (COMPUTE_MAX_CONCURRENT); the extra threads keep cache hits
+# answering while every slot is busy.
+ASYNC_SOLVER_WORKERS = 8
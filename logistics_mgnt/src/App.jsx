@@ -752,6 +752,36 @@ function FlowCalculator({ notify, result, setResult, allocation, setAllocation }
   const [source, setSource] = useState('');
   const [sink, setSink] = useState('');
   const [loading, setLoading] = useState(false);
+  const [progress, setProgress] = useState(null);
+  const [runId, setRunId] = useState(null);
+
+  // Knapsack over Server-Sent Events: shows progress and can stop early
+  const streamAllocation = () => new Promise((resolve) => {
+    const events = new EventSource(`${API_BASE}/calculate-knapsack/stream/`);
+    const done = () => { events.close(); setRunId(null); setProgress(null); resolve(); };
+    events.addEventListener('start', (e) => setRunId(JSON.parse(e.data).run_id));
+    events.addEventListener('progress', (e) => setProgress(JSON.parse(e.data)));
+    events.addEventListener('result', (e) => {
+      const data = JSON.parse(e.data);
+      setAllocation(data.allocations);
+      if (!data.summary.complete) notify("Stopped early: showing the best allocation found so far.");
+      done();
+    });
+    events.addEventListener('cancelled', done);
+    events.addEventListener('failed', (e) => {
+      notify(JSON.parse(e.data).error, 'error');
+      done();
+    });
+    // EventSource's own 'error': the connection dropped before a result
+    events.onerror = () => {
+      notify("Lost connection to the allocation stream", 'error');
+      done();
+    };
+  });
+
+  const stopAllocation = async () => {
+    if (runId) await fetch(`${API_BASE}/runs/${runId}/stop/`, { method: 'POST' });
+  };
 
   const handleCalculate = async (e) => {
     e.preventDefault();
@@ -765,8 +795,7 @@ function FlowCalculator({ notify, result, setResult, allocation, setAllocation }
       const data = await res.json();
       if (res.ok) {
         setResult(data);
-        const allocRes = await fetch(`${API_BASE}/calculate-knapsack/`);
-        if (allocRes.ok) setAllocation(await allocRes.json());
+        await streamAllocation();
       } else { notify(data.error || "Error", 'error'); }
     } catch (err) { notify("Connection failed", 'error'); } 
     finally { setLoading(false); }
@@ -784,6 +813,19 @@ function FlowCalculator({ notify, result, setResult, allocation, setAllocation }
               {loading ? 'Calculating...' : 'Run Optimization'}
             </button>
           </form>
+          {progress && (
+             <div className="mt-4 p-4 bg-indigo-50 rounded-xl text-sm text-indigo-900">
+               <div className="font-bold mb-1">
+                 {progress.stage === 'search'
+                   ? `Searching: ${progress.nodes} nodes`
+                   : `Destination ${progress.destination}/${progress.destinations}: row ${progress.rows}/${progress.total_rows}`}
+               </div>
+               <div>Best priority so far: {progress.best}</div>
+               <button type="button" onClick={stopAllocation} className="mt-2 px-3 py-1 bg-indigo-600 text-white rounded-lg text-xs font-bold">
+                 Use current best
+               </button>
+             </div>
+          )}
           {result && (
              <div className="mt-8 bg-slate-900 text-white p-6 rounded-2xl text-center">
                <div className="text-xs uppercase font-bold text-emerald-400 mb-2">Max Throughput</div>
@@ -812,9 +854,9 @@ function FlowCalculator({ notify, result, setResult, allocation, setAllocation }
              <div className="p-6 grid gap-4">
                 {Object.entries(allocation).map(([k, d]) => (
                   <div key={k} className="border p-4 rounded-xl">
-                    <div className="flex justify-between font-bold mb-2"><span>{d.source} → {d.destination}</span><span className="text-xs bg-slate-100 px-2 py-1 rounded">Cap: {d.capacity}</span></div>
+                    <div className="flex justify-between font-bold mb-2"><span>{k}</span><span className="text-xs bg-slate-100 px-2 py-1 rounded">Cap: {d.capacity}</span></div>
                     <div className="flex flex-wrap gap-2">
-                      {d.items.length ? d.items.map((i,x)=><span key={x} className="bg-indigo-50 text-indigo-700 px-2 py-1 rounded text-xs font-bold">{i.name}</span>) : <span className="text-slate-400 italic text-sm">No items fit</span>}
+                      {d.items.length ? d.items.map((i,x)=><span key={x} className="bg-indigo-50 text-indigo-700 px-2 py-1 rounded text-xs font-bold">{i.name}{i.quantity > 1 ? ` ×${i.quantity}` : ""}</span>) : <span className="text-slate-400 italic text-sm">No items fit</span>}
                     </div>
                   </div>
                 ))}